@@ -0,0 +1,249 @@
+# Filename: analysis_cache.py
+import hashlib
+import os
+import re
+import shutil
+import subprocess
+from pathlib import Path
+
+# This allows the script to find the project root, even when imported by another script
+PROJECT_ROOT = Path(__file__).resolve().parent
+CACHE_DIR = PROJECT_ROOT / "cache"
+TSHARK_CACHE_DIR = CACHE_DIR / "tshark"
+MAT_CACHE_DIR = CACHE_DIR / "mat"
+# Cached MAT index files are stored under a fixed prefix and renamed to match the hprof on restore
+MAT_INDEX_PREFIX = "dump"
+# The launcher jar sits in the install's plugins folder; this plugin's version is MAT's own
+MAT_API_PLUGIN_PREFIX = "org.eclipse.mat.api_"
+
+HASH_CHUNK_SIZE = 1024 * 1024
+UNKNOWN_VERSION = "unknown"
+
+_tshark_version_memo = {}
+
+
+def content_hasher():
+    """New hash object for input content; ingest.py hashes while copying with the same algorithm."""
+    return hashlib.blake2b(digest_size=16)
+
+
+def hash_file(path, chunk_size=HASH_CHUNK_SIZE, progress=None):
+    """Return the content hash used to key cached results for an input file.
+
+    progress, when given, is called with the number of bytes hashed so far after each chunk.
+    """
+    digest = content_hasher()
+    done = 0
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+            if progress: done += len(chunk); progress(done)
+    return digest.hexdigest()
+
+
+def _safe_component(value):
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", str(value)) or "_"
+
+
+def get_tshark_version(tshark_path, timeout=30):
+    """Return the version string reported by `tshark --version`, or 'unknown'."""
+    try:
+        memo_key = (str(tshark_path), os.path.getmtime(tshark_path))
+    except OSError:
+        return UNKNOWN_VERSION
+    if memo_key in _tshark_version_memo:
+        return _tshark_version_memo[memo_key]
+
+    version = UNKNOWN_VERSION
+    try:
+        process = subprocess.run([str(tshark_path), "--version"], capture_output=True, text=True,
+                                 encoding="utf-8", errors="replace", timeout=timeout)
+        first_line = (process.stdout or "").strip().splitlines()[:1]
+        match = re.search(r"(\d+\.\d+\.\d+)", first_line[0]) if first_line else None
+        if process.returncode == 0 and match:
+            version = match.group(1)
+    except (OSError, subprocess.SubprocessError):
+        pass
+    _tshark_version_memo[memo_key] = version
+    return version
+
+
+def tshark_cache_path(pcap_hash, task_id, tshark_version):
+    return TSHARK_CACHE_DIR / _safe_component(pcap_hash) / f"{_safe_component(task_id)}@{_safe_component(tshark_version)}.txt"
+
+
+def load_tshark_task(pcap_hash, task_id, tshark_version):
+    """Return the cached output of a tshark task, or None if it has not been run before."""
+    if tshark_version == UNKNOWN_VERSION:
+        return None
+    cache_path = tshark_cache_path(pcap_hash, task_id, tshark_version)
+    try:
+        with open(cache_path, "r", encoding="utf-8") as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def store_tshark_task(pcap_hash, task_id, tshark_version, output):
+    """Persist a successful tshark task output. Returns True if it was written."""
+    if tshark_version == UNKNOWN_VERSION:
+        return False
+    cache_path = tshark_cache_path(pcap_hash, task_id, tshark_version)
+    tmp_path = cache_path.with_name(cache_path.name + f".{os.getpid()}.tmp")
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(output)
+        os.replace(tmp_path, cache_path)
+        return True
+    except OSError:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        return False
+
+
+def _link_or_copy(src, dst):
+    # Heap dump indexes can be several GB, so hardlink when the cache and run dir share a volume
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copyfile(src, dst)
+
+
+def mat_install_key(mat_launcher):
+    """Identify the MAT install a launcher belongs to: its org.eclipse.mat.api version, else a hash of its path.
+
+    The equinox launcher jar keeps its version across MAT releases, so it cannot tell installs apart.
+    """
+    mat_home = Path(mat_launcher).resolve().parent.parent
+    try:
+        versions = sorted(re.sub(r"\.jar$", "", p.name[len(MAT_API_PLUGIN_PREFIX):])
+                          for p in (mat_home / "plugins").iterdir() if p.name.startswith(MAT_API_PLUGIN_PREFIX))
+    except OSError:
+        versions = []
+    if versions:
+        return f"mat-{versions[-1]}"
+    return "path-" + hashlib.blake2b(str(mat_home).encode("utf-8"), digest_size=8).hexdigest()
+
+
+def mat_cache_dir(hprof_hash, mat_launcher):
+    """Cache folder for one hprof, keyed by MAT install so an upgrade does not reuse old indexes."""
+    return MAT_CACHE_DIR / _safe_component(hprof_hash) / _safe_component(mat_install_key(mat_launcher))
+
+
+def mat_index_files(hprof_path):
+    """Return {suffix: path} for the .index/.threads files MAT wrote next to hprof_path."""
+    hprof_path = Path(hprof_path)
+    prefix = hprof_path.stem + "."
+    files = {}
+    for path in hprof_path.parent.iterdir():
+        if path.is_file() and path.name.startswith(prefix) and path.name.endswith((".index", ".threads")):
+            files[path.name[len(hprof_path.stem):]] = path
+    return files
+
+
+def restore_mat_index(hprof_hash, mat_launcher, hprof_path):
+    """Place cached MAT index files next to hprof_path so MAT skips parsing. Returns True on success."""
+    index_dir = mat_cache_dir(hprof_hash, mat_launcher) / "index"
+    if not (index_dir / f"{MAT_INDEX_PREFIX}.index").is_file():
+        return False
+    target_prefix = str(Path(hprof_path).with_suffix(""))
+    restored = []
+    try:
+        for cached in index_dir.iterdir():
+            if cached.name.endswith(".tmp"):
+                continue
+            target = Path(target_prefix + cached.name[len(MAT_INDEX_PREFIX):])
+            # Copied, not linked: MAT updates index files in place, which must not reach the cache
+            shutil.copyfile(cached, target)
+            restored.append(target)
+            # MAT re-parses when the dump is newer than its index
+            os.utime(target)
+        return True
+    except OSError:
+        for target in restored:
+            try:
+                os.remove(target)
+            except OSError:
+                pass
+        return False
+
+
+def store_mat_index(hprof_hash, mat_launcher, hprof_path):
+    """Copy the index files MAT produced for hprof_path into the cache. Returns True if any were stored.
+
+    When the index is already cached, only files not cached yet are added, e.g. the dominator tree
+    indexes MAT builds for a report that was not requested on the first run.
+    """
+    files = mat_index_files(hprof_path)
+    index_dir = mat_cache_dir(hprof_hash, mat_launcher) / "index"
+    if ".index" not in files:
+        return False
+    if index_dir.is_dir():
+        return _add_mat_index_files(index_dir, files)
+    tmp_dir = index_dir.with_name(f"index.{os.getpid()}.tmp")
+    try:
+        tmp_dir.mkdir(parents=True, exist_ok=True)
+        for suffix, path in files.items():
+            shutil.copyfile(path, tmp_dir / f"{MAT_INDEX_PREFIX}{suffix}")
+        os.rename(tmp_dir, index_dir)
+        return True
+    except OSError:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        # Another run stored the index first; add whatever it lacks
+        return index_dir.is_dir() and _add_mat_index_files(index_dir, files)
+
+
+def _add_mat_index_files(index_dir, files):
+    added = False
+    for suffix, path in files.items():
+        target = index_dir / f"{MAT_INDEX_PREFIX}{suffix}"
+        if target.exists():
+            continue
+        tmp_path = target.with_name(target.name + f".{os.getpid()}.tmp")
+        try:
+            shutil.copyfile(path, tmp_path)
+            # Each file appears complete or not at all, so a concurrent restore never copies half of one
+            os.replace(tmp_path, target)
+            added = True
+        except OSError:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+    return added
+
+
+def mat_report_cache_path(hprof_hash, mat_launcher, report_arg):
+    return mat_cache_dir(hprof_hash, mat_launcher) / "reports" / f"{_safe_component(report_arg)}.zip"
+
+
+def load_mat_report(hprof_hash, mat_launcher, report_arg, dest_path):
+    """Place a cached MAT report zip at dest_path. Returns True if it was in the cache."""
+    cache_path = mat_report_cache_path(hprof_hash, mat_launcher, report_arg)
+    if not cache_path.is_file():
+        return False
+    try:
+        _link_or_copy(cache_path, dest_path)
+        return True
+    except OSError:
+        return False
+
+
+def store_mat_report(hprof_hash, mat_launcher, report_arg, zip_path):
+    """Persist a finished MAT report zip. Returns True if it was written."""
+    cache_path = mat_report_cache_path(hprof_hash, mat_launcher, report_arg)
+    tmp_path = cache_path.with_name(cache_path.name + f".{os.getpid()}.tmp")
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        _link_or_copy(zip_path, tmp_path)
+        os.replace(tmp_path, cache_path)
+        return True
+    except OSError:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        return False
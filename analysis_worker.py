@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# Filename: analysis_worker.py
+"""Long-lived analysis process: imports the pipeline once and runs monitor jobs sent over stdin.
+
+Protocol, one JSON object per line:
+  in:  {"id": "...", "argv": [...monitor.py arguments...]}  |  {"command": "shutdown"}
+  out: {"event": "ready", "pid": ...}
+       {"event": "output", "id": ..., "line": "..."}
+       {"event": "progress", "id": ..., "kind": ..., ...progress_events fields...}
+       {"event": "finished", "id": ..., "exit_code": ...}
+       {"event": "error", "message": "..."}
+"""
+import gc
+import io
+import json
+import os
+import sys
+import threading
+import traceback
+from contextlib import redirect_stderr, redirect_stdout
+
+import monitor
+
+
+class _EventWriter:
+    """Serialises events onto the protocol stream; safe to use from the pipeline's helper threads."""
+
+    def __init__(self, stream):
+        self._stream = stream
+        self._lock = threading.Lock()
+
+    def emit(self, event, **fields):
+        with self._lock:
+            self._stream.write(json.dumps({"event": event, **fields}) + "\n")
+            self._stream.flush()
+
+
+class _JobOutput(io.TextIOBase):
+    """Text stream that turns everything the pipeline prints into output events, line by line."""
+
+    def __init__(self, events, job_id):
+        self._events, self._job_id, self._pending = events, job_id, ""
+
+    def writable(self):
+        return True
+
+    def write(self, text):
+        self._pending += text
+        *lines, self._pending = self._pending.split("\n")
+        for line in lines: self._events.emit("output", id=self._job_id, line=line.rstrip("\r"))
+        return len(text)
+
+    def flush(self):
+        pass
+
+    def close_job(self):
+        if self._pending: self._events.emit("output", id=self._job_id, line=self._pending.rstrip("\r")); self._pending = ""
+
+
+def run_job(job_id, argv, events):
+    output = _JobOutput(events, job_id)
+    try:
+        with redirect_stdout(output), redirect_stderr(output):
+            exit_code = monitor.run_analysis(argv, progress_sink=lambda event: events.emit("progress", id=job_id, **event))
+    except SystemExit as e:  # argparse errors
+        exit_code = e.code if isinstance(e.code, int) else 1
+    except Exception:
+        tb_str = traceback.format_exc()
+        output.write(f"UNHANDLED MONITOR ERR:\n{tb_str}"); monitor.log_monitor_error(f"UNHANDLED MONITOR ERR:\n{tb_str}")
+        exit_code = 2
+    output.close_job()
+    # Drop the previous job's dump text and parse structures before idling
+    gc.collect()
+    return exit_code
+
+
+def serve(in_stream, out_stream):
+    events = _EventWriter(out_stream)
+    events.emit("ready", pid=os.getpid())
+    for raw_line in in_stream:
+        if not raw_line.strip(): continue
+        try:
+            request = json.loads(raw_line)
+        except ValueError as e:
+            events.emit("error", message=f"Invalid job request: {e}"); continue
+        if request.get("command") == "shutdown": break
+        job_id = request.get("id")
+        exit_code = run_job(job_id, list(request.get("argv", [])), events)
+        events.emit("finished", id=job_id, exit_code=exit_code)
+
+
+def main():
+    # Child processes (MAT, tshark, ollama) inherit fd 1; point it at stderr so only events reach the protocol pipe
+    protocol_stream = os.fdopen(os.dup(sys.stdout.fileno()), "w", encoding="utf-8", newline="\n")
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+    stdin = io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8")
+    serve(stdin, protocol_stream)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+# Filename: background_task.py
+import threading
+
+from PySide6.QtCore import QObject, Signal
+
+
+class BackgroundTask(QObject):
+    """Runs one function call on a daemon thread, for work too slow for the GUI thread (hashing, index scans).
+
+    done carries the task itself, delivered to slots on the GUI thread; the call's return value is in
+    result, or the exception it raised in error. The thread is a daemon so closing the window never
+    waits for a long hash to finish.
+    """
+    done = Signal(object)
+
+    def __init__(self, function, *args, name="background-task"):
+        super().__init__()
+        self.function = function
+        self.args = args
+        self.name = name
+        self.result = None
+        self.error = None
+
+    def start(self):
+        threading.Thread(target=self._run, name=self.name, daemon=True).start()
+
+    def _run(self):
+        try:
+            self.result = self.function(*self.args)
+        except Exception as e:
+            self.error = e
+        self.done.emit(self)
@@ -8,6 +8,8 @@ import pyshark
 from pathlib import Path
 from pyshark.tshark.tshark import get_tshark_interfaces
 
+import tool_resolver
+
 from PySide6.QtCore import QObject, Signal, QThread
 from PySide6.QtWidgets import (
     QDialog, QVBoxLayout, QFormLayout, QComboBox, QSpinBox,
@@ -99,10 +101,10 @@ class CaptureWorker(QObject):
 class LiveCaptureDialog(QDialog):
     captureFinished = Signal(str)
 
-    def __init__(self, tshark_path, parent=None):
+    def __init__(self, tshark_path=None, parent=None):
         super().__init__(parent)
         self.setWindowTitle("Live Network Capture")
-        self.tshark_path = tshark_path
+        self.tshark_path = tshark_path or tool_resolver.resolve_path(tool_resolver.TOOL_WIRESHARK)
         self.setMinimumWidth(500)
         self.layout = QVBoxLayout(self)
 
@@ -9,8 +9,10 @@ PROJECT_ROOT = Path(__file__).resolve().parent
 CONFIG_FILE_PATH = PROJECT_ROOT / "config.json"
 
 DEFAULT_SETTINGS = {
-    "default_ollama_model": "gemma3:1b", "ollama_dashboard_port": 5000, "mat_memory_mb": 4096,
+    "default_ollama_model": "gemma3:1b", "ollama_dashboard_port": 5000, "mat_memory_mb": 4096, "mat_memory_auto": True,
     "guard_mode_folder": "", "guard_mode_enabled": False, "guard_mode_interval_minutes": 1,
+    "scheduler_slots": {"heavy": 1, "medium": 2, "light": 4},
+    "ingest_strategy": "auto", "guard_mode_ingest_strategy": "auto", "reuse_resolved_analyses": False,
     "saved_prompts": [
         {"name": "HPROF Comprehensive Analysis", "template": """You are an expert Java performance analyst.
 Analyze the following diagnostic information from a Java application's heap dump.
@@ -64,8 +66,10 @@ Your response:
         {"name": "Leak Suspects", "id": "leak_suspects", "mat_arg": "org.eclipse.mat.api:suspects"},
         {"name": "Dominator Tree", "id": "dominator_tree", "mat_arg": "org.eclipse.mat.api:dominator_tree"},
         {"name": "Top Consumers (Retained Size)", "id": "top_consumers", "mat_arg": "org.eclipse.mat.api:top_consumers_html"},
-        {"name": "System Overview (Basic Parse + Threads)", "id": "system_overview", "mat_arg": "org.eclipse.mat.api.parse"}
+        {"name": "System Overview (Basic Parse + Threads)", "id": "system_overview", "mat_arg": "org.eclipse.mat.api.parse"},
+        {"name": "Fast Triage (no MAT: histogram, stacks, duplicate strings)", "id": "triage", "mat_arg": "triage"}
     ],
+    "mat_generate_all_reports": False,
     "llm_parameters": { 
         "temperature": 0.7, "num_ctx": 4096, "top_k": 40, "top_p": 0.9, "seed": 0, "stop": [],
         "num_predict": 1024 
@@ -101,6 +105,11 @@ def load_settings():
         for default_prompt in DEFAULT_SETTINGS['saved_prompts']:
             if default_prompt['name'] not in existing_prompt_names:
                 loaded_settings['saved_prompts'].append(default_prompt)
+    if 'mat_report_options' in loaded_settings:
+        existing_report_ids = {r['id'] for r in loaded_settings['mat_report_options']}
+        for default_report in DEFAULT_SETTINGS['mat_report_options']:
+            if default_report['id'] not in existing_report_ids:
+                loaded_settings['mat_report_options'].append(default_report)
     
     final_settings.update(loaded_settings)
     return final_settings
@@ -13,10 +13,17 @@ from datetime import datetime, timezone
 import sys
 import json 
 import shutil 
+import subprocess
 import requests
 from pathlib import Path
 
 import ollama_client 
+import thread_dump_parser
+import lock_graph
+import stage_timing
+import stage_checkpoint
+import run_manifest
+import job_queue
 
 app = Flask(__name__)
 app.secret_key = os.getenv("DASHBOARD_SECRET_KEY", "change_me")
@@ -148,13 +155,16 @@ def get_runs_api():
 
 def _load_run_data_common(run_dir_path, run_name_for_log):
     data = { "name": run_name_for_log, "model_used": OLLAMA_MODEL_DISPLAY_FALLBACK, "timestamp": "N/A", 
-        "hprof_source": "N/A", "mat_memory_setting": "N/A", "mat_report_type": "N/A", 
+        "hprof_source": "N/A", "mat_memory_setting": "N/A", "mat_peak_rss_mb": None, "mat_memory_mode": None, "mat_report_type": "N/A", 
         "llm_analysis_html": "<p><em>Analysis N/A</em></p>", "metadata_error": None, "md_error": None, 
         "raw_md_snippet_on_load": "N/A", "md_filename_processed": None, "user_status": USER_STATUS_PENDING,
         "raw_llm_analysis_text": None, "raw_diagnostic_text": None,
         "llm_generated_tags": [], "llm_params_json": "{}",
-        "user_notes": ""
+        "user_notes": "", "thread_dump_summary": None, "thread_dump_json": None, "lock_analysis": None, "mat_report_dirs": {},
+        "timings": {}, "analysis_type": None, "status": None, "stage_status": {}, "resumable": False,
+        "similar_resolved_runs": [], "llm_analysis_reused_from": None
     }
+    manifest = run_manifest.RunManifest.load(run_dir_path)
     metadata_path = os.path.join(run_dir_path, "run_metadata.json")
     if os.path.isfile(metadata_path):
         try:
@@ -167,25 +177,50 @@ def _load_run_data_common(run_dir_path, run_name_for_log):
                  except ValueError: data["timestamp"] = ts_iso 
             data["hprof_source"] = metadata.get("input_file", "N/A")
             data["mat_memory_setting"] = metadata.get("mat_memory_mb_used", "N/A") 
+            data["mat_peak_rss_mb"] = metadata.get("mat_peak_rss_mb")
+            data["mat_memory_mode"] = metadata.get("mat_memory_mode")
             data["mat_report_type"] = metadata.get("mat_report_arg_used", "N/A")
             data["user_status"] = metadata.get("user_status", USER_STATUS_PENDING)
             data["llm_generated_tags"] = metadata.get("llm_generated_tags", [])
             data["llm_params_json"] = json.dumps(metadata.get("llm_parameters_used", {}), indent=4)
             data["user_notes"] = metadata.get("user_notes", "")
+            data["thread_dump_summary"] = metadata.get("thread_dump_summary")
+            data["thread_dump_json"] = metadata.get("thread_dump_json")
+            data["lock_analysis"] = metadata.get("lock_analysis")
+            data["mat_report_dirs"] = metadata.get("mat_report_dirs", {})
+            data["timings"] = metadata.get("timings", {})
+            data["analysis_type"] = metadata.get("analysis_type")
+            data["status"] = metadata.get("status")
+            data["stage_status"] = metadata.get("stage_status", {})
+            data["similar_resolved_runs"] = metadata.get("similar_resolved_runs", [])
+            data["llm_analysis_reused_from"] = metadata.get("llm_analysis_reused_from")
         except Exception as e: log_dashboard_error(f"Err parsing metadata.json for {run_name_for_log}: {e}"); data["metadata_error"] = f"Error parsing: {e}"
     else: data["metadata_error"] = "run_metadata.json not found"
+    data["resumable"] = stage_checkpoint.is_resumable(run_dir_path)
+
+    # The text given to the LLM has its own file; older runs embedded it in the markdown instead
+    raw_entry = manifest.get(run_manifest.ROLE_RAW_DIAGNOSTIC) if manifest else None
+    if raw_entry:
+        try:
+            with open(os.path.join(run_dir_path, raw_entry["path"]), "r", encoding="utf-8", errors="ignore") as f_raw:
+                data["raw_diagnostic_text"] = f_raw.read().strip()
+        except Exception as e_raw:
+            log_dashboard_error(f"Error reading {raw_entry['path']} for {run_name_for_log}: {e_raw}")
 
     temp_md_fn = None
     try: 
-        files_in_run_dir = os.listdir(run_dir_path)
-        # Prioritize .md files that contain 'analysis'
-        md_files = [f for f in files_in_run_dir if f.lower().endswith(".md")]
-        analysis_md_files = [f for f in md_files if 'analysis' in f.lower()]
-        
-        if analysis_md_files:
-            temp_md_fn = sorted(analysis_md_files)[0]
-        elif md_files:
-            temp_md_fn = sorted(md_files)[0]
+        md_entry = manifest.get(run_manifest.ROLE_ANALYSIS_MD) if manifest else None
+        if md_entry:
+            temp_md_fn = md_entry["path"]
+        elif not manifest:
+            # Runs without a manifest: prioritize .md files that contain 'analysis'
+            md_files = [f for f in os.listdir(run_dir_path) if f.lower().endswith(".md")]
+            analysis_md_files = [f for f in md_files if 'analysis' in f.lower()]
+            
+            if analysis_md_files:
+                temp_md_fn = sorted(analysis_md_files)[0]
+            elif md_files:
+                temp_md_fn = sorted(md_files)[0]
             
         if temp_md_fn:
             data["md_filename_processed"] = temp_md_fn
@@ -194,24 +229,43 @@ def _load_run_data_common(run_dir_path, run_name_for_log):
                 with open(md_file_path, "r", encoding="utf-8") as f_md: md_content = f_md.read()
                 
                 main_analysis_content = md_content
-                analysis_section_match = re.search(r"(### LLM Analysis:.*)", md_content, re.DOTALL)
-                if analysis_section_match:
-                    analysis_text = analysis_section_match.group(1).split("### LLM Analysis:",1)[1].strip()
+                _, analysis_marker, analysis_section = md_content.partition("### LLM Analysis:")
+                if analysis_marker:
+                    analysis_text = analysis_section.strip()
                     data["raw_llm_analysis_text"] = analysis_text
                     data["llm_analysis_html"] = markdown.markdown(analysis_text, extensions=['fenced_code','tables', 'nl2br'])
                 else:
                     data["raw_llm_analysis_text"] = main_analysis_content
                     data["llm_analysis_html"] = markdown.markdown(main_analysis_content, extensions=['fenced_code','tables', 'nl2br'])
 
-                diag_data_match = re.search(r"### (?:Full Thread Dump|Thread Dump Details from HPROF|tshark Analysis Output):\n```text\n(.*?)\n```", md_content, re.DOTALL)
-                if diag_data_match:
-                    data["raw_diagnostic_text"] = diag_data_match.group(1).strip()
+                if not data["raw_diagnostic_text"]:
+                    # Compatibility with runs whose markdown embeds the raw diagnostic data
+                    diag_data_match = re.search(r"### (?:Full Thread Dump|Thread Dump Details from HPROF|tshark Analysis Output):\n```text\n(.*?)\n```", md_content, re.DOTALL)
+                    if diag_data_match:
+                        data["raw_diagnostic_text"] = diag_data_match.group(1).strip()
             else: data["llm_analysis_html"] = "<p><em>MD file path invalid.</em></p>"
         else: data["llm_analysis_html"] = "<p><em>No analysis MD file found.</em></p>"
     except Exception as e: log_dashboard_error(f"Err processing MD for {run_name_for_log}: {e}"); data["md_error"] = f"Err MD: {e}"; data["llm_analysis_html"] = f"<p><em>Err loading MD: {e}</em></p>"
     
+    # Prefer the parsed thread records over re-reading the raw dump
+    if not data["raw_diagnostic_text"] and data["thread_dump_json"]:
+        try:
+            threads_doc = thread_dump_parser.load_threads_json(os.path.join(run_dir_path, os.path.basename(data["thread_dump_json"])))
+            data["raw_diagnostic_text"] = thread_dump_parser.render_grouped_thread_dump(threads_doc.get("threads", []))
+        except Exception as e_threads:
+            log_dashboard_error(f"Error reading parsed threads for {run_name_for_log}: {e_threads}")
+
     # Fallback to find raw data if not in markdown
-    if not data["raw_diagnostic_text"]:
+    if not data["raw_diagnostic_text"] and manifest:
+        raw_entry = next((manifest.get(role) for role in (run_manifest.ROLE_TSHARK_SUMMARY, run_manifest.ROLE_THREADS) if manifest.get(role)), None)
+        if not raw_entry and data["analysis_type"] == "threaddump": raw_entry = manifest.get(run_manifest.ROLE_INPUT)
+        if raw_entry:
+            try:
+                with open(os.path.join(run_dir_path, raw_entry["path"]), "r", encoding="utf-8", errors="ignore") as f_trace:
+                    data["raw_diagnostic_text"] = f_trace.read().strip()
+            except Exception as e_trace:
+                log_dashboard_error(f"Error reading {raw_entry['path']} for {run_name_for_log}: {e_trace}")
+    elif not data["raw_diagnostic_text"]:
         try:
             # Check for explicitly generated summary files
             trace_fn = next((f for f in os.listdir(run_dir_path) if f.lower().endswith(("_tshark_summary.txt", ".threads"))), None) \
@@ -236,11 +290,24 @@ def view_run(run):
     mat_suspect_html, mat_pie_src = "<p><em>MAT report not available or not applicable.</em></p>", None
     mat_report_entry_file = None
 
-    # Find MAT report entry point, searching subdirectories
-    for root, _, files in os.walk(run_dir_path):
-        if 'index.html' in files:
-            mat_report_entry_file = os.path.relpath(os.path.join(root, 'index.html'), run_dir_path).replace('\\', '/')
-            break
+    # Runs with several MAT reports record one folder per report; show the primary (first requested) one
+    report_dirs = run_info.get("mat_report_dirs") or {}
+    manifest = run_manifest.RunManifest.load(run_dir_path)
+    if manifest:
+        report_entries = manifest.entries(run_manifest.ROLE_MAT_REPORT)
+        primary_entry = manifest.get(run_manifest.ROLE_MAT_REPORT, next(iter(report_dirs), None)) or next(iter(report_entries), None)
+        if primary_entry: mat_report_entry_file = primary_entry["path"]
+    else:
+        primary_dir = next(iter(report_dirs.values()), None)
+        if primary_dir and os.path.isfile(os.path.join(run_dir_path, primary_dir, 'index.html')):
+            mat_report_entry_file = f"{primary_dir}/index.html"
+
+        # Runs without a manifest: find MAT report entry point, searching subdirectories
+        for root, _, files in os.walk(run_dir_path):
+            if mat_report_entry_file: break
+            if 'index.html' in files:
+                mat_report_entry_file = os.path.relpath(os.path.join(root, 'index.html'), run_dir_path).replace('\\', '/')
+                break
 
     mat_idx_link_txt = "MAT Report (Not Found)"
     mat_toc_link_txt = "MAT TOC (Not Found)"
@@ -257,7 +324,7 @@ def view_run(run):
             with open(mat_report_full_path, "r", encoding="utf-8", errors="ignore") as f_mat_idx:
                 soup = BeautifulSoup(f_mat_idx.read(), "lxml")
             
-            report_type = run_info.get("mat_report_type", "").lower()
+            report_type = (next(iter(report_dirs), None) or run_info.get("mat_report_type", "")).lower()
             if "suspects" in report_type:
                 h_suspect = soup.find(lambda t: t.name in ("h2", "h3") and "Problem Suspect 1" in t.get_text())
                 if h_suspect:
@@ -287,7 +354,8 @@ def view_run(run):
             
     other_files = []
     try:
-        all_files_in_dir = os.listdir(run_dir_path)
+        # Top-level artifacts only, as the folder listing used for runs without a manifest
+        all_files_in_dir = [e["path"] for e in manifest.entries() if "/" not in e["path"]] if manifest else os.listdir(run_dir_path)
         md_name_only = os.path.basename(run_info["md_filename_processed"]) if run_info.get("md_filename_processed") else ""
         
         # General exclusion list
@@ -319,6 +387,8 @@ def view_run(run):
         hprof_source=run_info.get("hprof_source"),
         run_time=run_info.get("timestamp"), 
         mat_memory_setting=run_info.get("mat_memory_setting"),
+        mat_peak_rss_mb=run_info.get("mat_peak_rss_mb"),
+        mat_memory_mode=run_info.get("mat_memory_mode"),
         model_used=run_info.get("model_used"), 
         llm_analysis_html=run_info.get("llm_analysis_html"), 
         thread_dump_details=run_info.get("raw_diagnostic_text", "N/A"),
@@ -333,6 +403,14 @@ def view_run(run):
         llm_tags=run_info.get("llm_generated_tags", []),
         llm_params_json=run_info.get("llm_params_json", "{}"),
         user_notes=run_info.get("user_notes", ""),
+        thread_dump_summary=run_info.get("thread_dump_summary"),
+        lock_analysis=run_info.get("lock_analysis"),
+        timings=run_info.get("timings", {}),
+        run_status=run_info.get("status"),
+        stage_status=run_info.get("stage_status", {}),
+        similar_resolved_runs=run_info.get("similar_resolved_runs", []),
+        llm_analysis_reused_from=run_info.get("llm_analysis_reused_from"),
+        can_retry=run_info.get("resumable") and (run_info.get("status") or "").startswith("failed"),
         default_llm_params=get_llm_parameters_from_config(),
         initial_llm_analysis_text_for_chat=run_info.get("raw_llm_analysis_text", None),
         initial_diagnostic_text_for_chat=run_info.get("raw_diagnostic_text", None),
@@ -405,6 +483,72 @@ def compare_runs():
         runs_data.append(current_run_details)
     return render_template("compare_runs.html", runs_to_compare=runs_data)
 
+@app.route("/timings")
+def stage_timings():
+    """Stage latency across all runs that recorded timings, optionally for one analysis type."""
+    ensure_resultat_dir(); analysis_type = request.args.get("type") or None
+    timings_list, analysis_types = [], set()
+    try:
+        for run_name in os.listdir(RESULTAT_DIR_DASHBOARD):
+            metadata_path = os.path.join(RESULTAT_DIR_DASHBOARD, run_name, "run_metadata.json")
+            if not os.path.isfile(metadata_path): continue
+            try:
+                with open(metadata_path, "r", encoding="utf-8") as f_meta: metadata = json.load(f_meta)
+            except Exception: continue
+            if not metadata.get("timings"): continue
+            analysis_types.add(metadata.get("analysis_type", "unknown"))
+            if analysis_type and metadata.get("analysis_type") != analysis_type: continue
+            timings_list.append(metadata["timings"])
+    except Exception as e: log_dashboard_error(f"Timings: Error reading Resultat dir or metadata: {e}")
+    return render_template("stage_timings.html", stage_rows=stage_timing.aggregate_stage_timings(timings_list), run_count=len(timings_list),
+                           analysis_types=sorted(analysis_types), selected_type=analysis_type)
+
+@app.route("/queue")
+def job_queue_view():
+    """Analyses queued, running and recently finished in the GUI, read from its persistent job queue."""
+    jobs = []
+    try: jobs = job_queue.read_entries()
+    except Exception as e: log_dashboard_error(f"Queue: Error reading job queue: {e}")
+    for job in jobs:
+        # A duplicate input links to the earlier run that stands in for it
+        run_name = os.path.basename(job["run_dir"]) if job["run_dir"] else job.get("duplicate_of")
+        job["run_name"] = run_name if run_name and os.path.isdir(os.path.join(RESULTAT_DIR_DASHBOARD, run_name)) else None
+    active = [j for j in jobs if j["state"] in ("queued", "running")]
+    # Queued jobs are listed in the order they will start within their pool
+    active.sort(key=lambda j: (j["state"] != "running", -j["priority"], j["cost"], j["seq"]))
+    return render_template("job_queue.html", active_jobs=active, finished_jobs=[j for j in jobs if j not in active])
+
+@app.route("/api/queue")
+def job_queue_api():
+    try: jobs = job_queue.read_entries()
+    except Exception as e: log_dashboard_error(f"Queue API: Error reading job queue: {e}"); return jsonify({"error": str(e)}), 500
+    return jsonify(jobs)
+
+# Resume processes started from the dashboard, so a run is not retried twice at once
+RETRY_PROCS = {}
+RETRY_LOG_NAME = "resume.log"
+
+@app.before_request
+def reap_retry_procs():
+    """Collect the exit status of finished resume processes so they do not linger as zombies."""
+    for run_name, proc in list(RETRY_PROCS.items()):
+        if proc.poll() is not None: RETRY_PROCS.pop(run_name, None)
+
+@app.route("/api/run/<run_name>/retry", methods=["POST"])
+def retry_run(run_name):
+    if ".." in run_name or "/" in run_name or "\\" in run_name: abort(403)
+    run_dir = os.path.join(RESULTAT_DIR_DASHBOARD, run_name)
+    if not os.path.isdir(run_dir): return jsonify({"success": False, "error": "Run directory not found."}), 404
+    if not stage_checkpoint.is_resumable(run_dir): return jsonify({"success": False, "error": "This run has no recorded stages to resume."}), 400
+    if run_name in RETRY_PROCS: return jsonify({"success": False, "error": "A retry of this run is already in progress."}), 409
+    try:
+        with open(os.path.join(run_dir, RETRY_LOG_NAME), "a", encoding="utf-8") as log_file:
+            RETRY_PROCS[run_name] = subprocess.Popen([sys.executable, os.path.join(DASHBOARD_PROJECT_ROOT, "monitor.py"), "--resume", "--run-dir", run_dir],
+                                                     cwd=DASHBOARD_PROJECT_ROOT, stdout=log_file, stderr=subprocess.STDOUT)
+    except Exception as e:
+        log_dashboard_error(f"Retry: failed to start monitor for {run_name}: {e}"); return jsonify({"success": False, "error": str(e)}), 500
+    return jsonify({"success": True, "log_file": RETRY_LOG_NAME})
+
 @app.route("/api/run/<run_name>/set_status", methods=["POST"])
 def set_run_status(run_name):
     ensure_resultat_dir();
@@ -499,6 +643,10 @@ def llm_compare_runs_api():
             context_parts.append(f"Input File: {loaded_run_data.get('hprof_source', 'N/A')}")
             context_parts.append(f"Model Used (original analysis): {loaded_run_data.get('model_used', 'N/A')}")
             context_parts.append(f"Analysis Type: {loaded_run_data.get('mat_report_type', 'N/A')}")
+            thread_summary = loaded_run_data.get("thread_dump_summary")
+            if thread_summary: context_parts.append(f"Thread Summary: {thread_summary.get('thread_count', 0)} threads, states {json.dumps(thread_summary.get('state_counts', {}))}")
+            lock_analysis = loaded_run_data.get("lock_analysis")
+            if lock_analysis: context_parts.append(lock_graph.format_lock_findings(lock_analysis))
             if diagnostic_text and diagnostic_text.strip(): context_parts.append("Raw Diagnostic Data for this run:"); context_parts.append(f"```text\n{diagnostic_text}\n```")
             if llm_analysis_text and llm_analysis_text.strip(): context_parts.append("LLM Summary for this specific run:"); context_parts.append(llm_analysis_text)
             context_parts.append("--- End of Analysis for this Run ---\n"); valid_runs_for_context += 1
@@ -534,11 +682,13 @@ def get_reevaluate_data(run_name):
     run_data = _load_run_data_common(run_dir, run_name)
     
     mat_summary = ""
-    if "hprof" in run_data.get("analysis_type", ""):
+    if "hprof" in (run_data.get("analysis_type") or ""):
         try:
             # Reuse the same logic from monitor.py to extract summary
             from monitor import extract_mat_suspect_text
-            mat_summary = extract_mat_suspect_text(run_dir)
+            manifest = run_manifest.RunManifest.load(run_dir)
+            report_entry = manifest and next(iter(manifest.entries(run_manifest.ROLE_MAT_REPORT)), None)
+            mat_summary = extract_mat_suspect_text(os.path.join(run_dir, os.path.dirname(report_entry["path"])) if report_entry else run_dir)
         except Exception as e:
             log_dashboard_error(f"Re-eval Data: Error parsing MAT summary for {run_name}: {e}")
             mat_summary = f"Error extracting MAT summary: {e}"
@@ -0,0 +1,93 @@
+# Filename: guard_ledger.py
+import os
+import sqlite3
+from contextlib import closing
+from datetime import datetime, timezone
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent
+LEDGER_PATH = PROJECT_ROOT / "guard_ledger.db"
+
+STATUS_QUEUED = "queued"
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+STATUS_SKIPPED = "skipped"
+STATUS_DUPLICATE = "duplicate"
+# Left behind when the GUI stopped mid-analysis; such files are picked up again
+UNFINISHED_STATUSES = (STATUS_QUEUED, STATUS_RUNNING)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS guard_files (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    content_hash TEXT,
+    run_name TEXT,
+    status TEXT NOT NULL,
+    updated_utc TEXT NOT NULL
+)
+"""
+_COLUMNS = ("path", "size", "mtime_ns", "content_hash", "run_name", "status", "updated_utc")
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+class GuardLedger:
+    """Guard Mode's record of the files it has handed to the analysis queue, kept in SQLite.
+
+    Each operation opens its own short-lived connection, so the ledger can be used from the
+    GUI thread and the folder watcher's thread alike.
+    """
+
+    def __init__(self, db_path=None):
+        self.db_path = str(db_path or LEDGER_PATH)
+        with closing(self._connect()) as conn, conn:
+            conn.execute(_SCHEMA)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def get(self, path):
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT * FROM guard_files WHERE path = ?", (os.path.abspath(path),)).fetchone()
+        return dict(row) if row else None
+
+    def should_process(self, path, size, mtime_ns):
+        """True unless the file was already handled with this size and mtime (an unfinished run counts as not handled)."""
+        entry = self.get(path)
+        if entry is None or (entry["size"], entry["mtime_ns"]) != (size, mtime_ns): return True
+        return entry["status"] in UNFINISHED_STATUSES
+
+    def record(self, path, size, mtime_ns, status=STATUS_QUEUED):
+        """Start a fresh entry for a file version, dropping what was known about the previous one."""
+        with closing(self._connect()) as conn, conn:
+            conn.execute("INSERT OR REPLACE INTO guard_files (path, size, mtime_ns, content_hash, run_name, status, updated_utc) "
+                         "VALUES (?, ?, ?, NULL, NULL, ?, ?)", (os.path.abspath(path), size, mtime_ns, status, _now()))
+
+    def update(self, path, status=None, run_name=None, content_hash=None):
+        """Set the given fields on an existing entry; fields left as None keep their value."""
+        fields = {"status": status, "run_name": run_name, "content_hash": content_hash}
+        fields = {k: v for k, v in fields.items() if v is not None}
+        if not fields: return
+        assignments = ", ".join(f"{k} = ?" for k in fields)
+        with closing(self._connect()) as conn, conn:
+            conn.execute(f"UPDATE guard_files SET {assignments}, updated_utc = ? WHERE path = ?",
+                         (*fields.values(), _now(), os.path.abspath(path)))
+
+    def entries(self):
+        with closing(self._connect()) as conn:
+            rows = conn.execute(f"SELECT {', '.join(_COLUMNS)} FROM guard_files ORDER BY updated_utc DESC").fetchall()
+        return [dict(row) for row in rows]
+
+    def remove(self, paths):
+        with closing(self._connect()) as conn, conn:
+            conn.executemany("DELETE FROM guard_files WHERE path = ?", [(os.path.abspath(p),) for p in paths])
+
+    def clear(self):
+        with closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM guard_files")
@@ -0,0 +1,85 @@
+# Filename: guard_ledger_dialog.py
+import os
+
+from PySide6.QtCore import Signal, Qt
+from PySide6.QtWidgets import (
+    QDialog, QVBoxLayout, QHBoxLayout, QTableWidget, QTableWidgetItem, QHeaderView,
+    QPushButton, QLabel, QMessageBox, QAbstractItemView
+)
+
+
+class GuardLedgerDialog(QDialog):
+    """
+    Lists the files Guard Mode has processed and lets the user retry or clear entries.
+    """
+    retryRequested = Signal(list)
+    entriesCleared = Signal(list)
+
+    COLUMNS = ["File", "Status", "Run", "Size (MB)", "Content Hash", "Updated (UTC)"]
+
+    def __init__(self, ledger, parent=None):
+        super().__init__(parent)
+        self.ledger = ledger
+        self.setWindowTitle("Guard Mode Processed Files")
+        self.setMinimumSize(800, 400)
+        layout = QVBoxLayout(self)
+        layout.addWidget(QLabel("Files Guard Mode has already handled are not analysed again after a restart unless they change."))
+        self.table = QTableWidget(0, len(self.COLUMNS))
+        self.table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.ResizeToContents)
+        self.table.horizontalHeader().setStretchLastSection(True)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        layout.addWidget(self.table)
+
+        buttons = QHBoxLayout()
+        self.retry_btn = QPushButton("Retry Selected")
+        self.retry_btn.setToolTip("Queue the selected files for analysis again now.")
+        self.clear_btn = QPushButton("Clear Selected")
+        self.clear_btn.setToolTip("Forget the selected files; Guard Mode analyses them again if they are still in the folder.")
+        self.clear_all_btn = QPushButton("Clear All")
+        close_btn = QPushButton("Close")
+        for btn in (self.retry_btn, self.clear_btn, self.clear_all_btn): buttons.addWidget(btn)
+        buttons.addStretch(); buttons.addWidget(close_btn)
+        layout.addLayout(buttons)
+
+        self.retry_btn.clicked.connect(self.on_retry_selected)
+        self.clear_btn.clicked.connect(self.on_clear_selected)
+        self.clear_all_btn.clicked.connect(self.on_clear_all)
+        close_btn.clicked.connect(self.accept)
+        self.load_entries()
+
+    def load_entries(self):
+        self.table.setRowCount(0)
+        for entry in self.ledger.entries():
+            row = self.table.rowCount(); self.table.insertRow(row)
+            values = [os.path.basename(entry["path"]), entry["status"], entry["run_name"] or "", f"{entry['size'] / (1024 * 1024):.1f}",
+                      entry["content_hash"] or "", entry["updated_utc"]]
+            for column, value in enumerate(values): self.table.setItem(row, column, QTableWidgetItem(value))
+            self.table.item(row, 0).setToolTip(entry["path"]); self.table.item(row, 0).setData(Qt.ItemDataRole.UserRole, entry["path"])
+
+    def _selected_paths(self):
+        rows = sorted({index.row() for index in self.table.selectionModel().selectedRows()})
+        return [self.table.item(row, 0).data(Qt.ItemDataRole.UserRole) for row in rows]
+
+    def on_retry_selected(self):
+        paths = self._selected_paths()
+        if not paths: return
+        missing = [p for p in paths if not os.path.isfile(p)]
+        if missing: QMessageBox.warning(self, "Files Missing", "These files are no longer in the folder and cannot be retried:\n" + "\n".join(missing))
+        paths = [p for p in paths if p not in missing]
+        if paths: self.retryRequested.emit(paths)
+        self.load_entries()
+
+    def on_clear_selected(self):
+        paths = self._selected_paths()
+        if not paths: return
+        self.ledger.remove(paths); self.entriesCleared.emit(paths)
+        self.load_entries()
+
+    def on_clear_all(self):
+        paths = [entry["path"] for entry in self.ledger.entries()]
+        if not paths: return
+        if QMessageBox.question(self, "Clear All", f"Forget all {len(paths)} processed files? Files still in the watched folder will be analysed again.") != QMessageBox.StandardButton.Yes: return
+        self.ledger.clear(); self.entriesCleared.emit(paths)
+        self.load_entries()
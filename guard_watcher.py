@@ -0,0 +1,165 @@
+# Filename: guard_watcher.py
+import os
+import queue
+import threading
+import time
+
+from PySide6.QtCore import QObject, Signal
+
+import ingest
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:  # optional: without it the folder is polled
+    FileSystemEventHandler = object
+    Observer = None
+
+# A file is handed over once its size and mtime have not changed for this long...
+STABLE_AFTER_SECONDS = 4.0
+# ...or, after a close-write notification, once it has been quiet for this long
+CLOSED_STABLE_AFTER_SECONDS = 1.0
+TICK_SECONDS = 0.5
+# Without change notifications the folder is listed this often, independent of the full rescan interval
+POLL_SECONDS = 2.0
+
+
+class StabilityTracker:
+    """Decides when files in a watched folder are complete, without sleeping.
+
+    Callers report paths as they are seen (from notifications or scans) and regularly call
+    poll(); a path is returned once, after its size and mtime stopped changing. It is returned
+    again only when it is modified after that or deleted and recreated.
+    """
+
+    def __init__(self, stable_after=STABLE_AFTER_SECONDS, closed_stable_after=CLOSED_STABLE_AFTER_SECONDS):
+        self.stable_after = stable_after
+        self.closed_stable_after = closed_stable_after
+        self.pending = {}  # path -> [size, mtime, last change time, close-write seen]
+        self.handed_over = {}  # path -> (size, mtime) when it was returned
+
+    def observe(self, path, now=None, closed=False):
+        now = time.monotonic() if now is None else now
+        stat = _stat(path)
+        if stat is None: self.forget(path); return
+        if self.handed_over.get(path) == stat: return
+        entry = self.pending.get(path)
+        if entry is None or (entry[0], entry[1]) != stat: self.pending[path] = [stat[0], stat[1], now, closed]
+        elif closed: entry[3] = True
+
+    def forget(self, path):
+        self.pending.pop(path, None); self.handed_over.pop(path, None)
+
+    def poll(self, now=None):
+        """Re-stat pending files and return those that have become stable."""
+        now = time.monotonic() if now is None else now
+        ready = []
+        for path in list(self.pending):
+            size, mtime, changed_at, closed = self.pending[path]
+            stat = _stat(path)
+            if stat is None: self.forget(path); continue
+            if stat != (size, mtime): self.pending[path] = [stat[0], stat[1], now, False]; continue
+            if now - changed_at >= (self.closed_stable_after if closed else self.stable_after):
+                del self.pending[path]; self.handed_over[path] = stat; ready.append(path)
+        return ready
+
+
+def _stat(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_size, st.st_mtime_ns)
+
+
+class _EventQueueHandler(FileSystemEventHandler):
+    def __init__(self, events):
+        super().__init__()
+        self.events = events
+
+    def on_any_event(self, event):
+        if event.is_directory: return
+        if event.event_type == "moved": self.events.put(("deleted", event.src_path)); self.events.put(("modified", event.dest_path))
+        elif event.event_type in ("created", "modified", "closed", "deleted"): self.events.put((event.event_type, event.src_path))
+
+
+class GuardWatcher(QObject):
+    """Watches a folder on a worker thread and emits fileReady for complete diagnostic files.
+
+    Uses OS change notifications (inotify, FSEvents, ReadDirectoryChangesW via watchdog) when
+    available and falls back to listing the folder every POLL_SECONDS. A full rescan every rescan_seconds also
+    catches anything notifications missed, e.g. on network shares. should_process(path, size,
+    mtime_ns), when given, is asked before a stable file is emitted (Guard Mode's ledger).
+    """
+    fileReady = Signal(str)
+    message = Signal(str)
+    error = Signal(str)
+    finished = Signal()
+
+    def __init__(self, folder, rescan_seconds=60, should_process=None):
+        super().__init__()
+        self.folder = os.path.abspath(folder)
+        self.rescan_seconds = rescan_seconds
+        self.should_process = should_process
+        self.tracker = StabilityTracker()
+        self._events = queue.Queue()
+        self._stop = threading.Event()
+
+    def stop(self):
+        self._stop.set()
+
+    def forget(self, path):
+        """Treat a file as new again, e.g. after its ledger entry was cleared. Safe to call from any thread."""
+        self._events.put(("forget", os.path.abspath(path)))
+
+    def _is_candidate(self, path):
+        return os.path.dirname(os.path.abspath(path)) == self.folder and ingest.is_supported_input(path)
+
+    def _scan(self, now):
+        try:
+            names = os.listdir(self.folder)
+        except OSError as e:
+            self.error.emit(f"Guard Mode: Error scanning folder '{self.folder}': {e}"); return
+        for name in names:
+            path = os.path.join(self.folder, name)
+            if ingest.is_supported_input(name) and os.path.isfile(path): self.tracker.observe(path, now)
+
+    def _start_observer(self):
+        if Observer is None: return None
+        try:
+            observer = Observer()
+            observer.schedule(_EventQueueHandler(self._events), self.folder, recursive=False)
+            observer.start()
+            return observer
+        except Exception as e:
+            self.message.emit(f"Guard Mode: Change notifications unavailable ({e}); polling the folder instead.")
+            return None
+
+    def run(self):
+        observer = self._start_observer()
+        scan_seconds = self.rescan_seconds if observer else min(self.rescan_seconds, POLL_SECONDS)
+        mode = "change notifications" if observer else f"polling every {scan_seconds:g}s"
+        self.message.emit(f"Guard Mode: Watching '{self.folder}' using {mode}.")
+        next_scan = 0.0
+        try:
+            while not self._stop.is_set():
+                now = time.monotonic()
+                if now >= next_scan: self._scan(now); next_scan = now + scan_seconds
+                try:
+                    while True:
+                        kind, path = self._events.get_nowait()
+                        if not self._is_candidate(path): continue
+                        if kind in ("deleted", "forget"): self.tracker.forget(path)
+                        if kind != "deleted": self.tracker.observe(path, now, closed=kind == "closed")
+                except queue.Empty:
+                    pass
+                for path in self.tracker.poll():
+                    size, mtime_ns = self.tracker.handed_over[path]
+                    if self.should_process and not self.should_process(path, size, mtime_ns):
+                        self.message.emit(f"Guard Mode: '{os.path.basename(path)}' was already processed; skipping."); continue
+                    self.message.emit(f"Guard Mode: File '{os.path.basename(path)}' is stable.")
+                    self.fileReady.emit(path)
+                self._stop.wait(TICK_SECONDS)
+        finally:
+            if observer: observer.stop(); observer.join(5)
+            self.finished.emit()
@@ -0,0 +1,319 @@
+# Filename: hprof_triage.py
+import hashlib
+import mmap
+import os
+import struct
+from concurrent.futures import ProcessPoolExecutor
+
+# Report argument used in mat_report_options for this reader; it never reaches MAT
+TRIAGE_REPORT_ARG = "triage"
+
+HPROF_MAGIC = b"JAVA PROFILE "
+# Heap dump segments are grouped into worker tasks of at least this many bytes
+TASK_TARGET_BYTES = 64 * 1024 * 1024
+TOP_CLASSES = 40
+TOP_DUPLICATES = 20
+DUPLICATE_PREVIEW_CHARS = 80
+# Bounds the per-worker memory used for duplicate detection on very large heaps
+MAX_TRACKED_ARRAYS = 1_000_000
+
+TAG_UTF8, TAG_LOAD_CLASS, TAG_FRAME, TAG_TRACE, TAG_START_THREAD = 0x01, 0x02, 0x04, 0x05, 0x0A
+TAG_HEAP_DUMP, TAG_HEAP_DUMP_SEGMENT = 0x0C, 0x1C
+SUB_CLASS_DUMP, SUB_INSTANCE_DUMP, SUB_OBJ_ARRAY_DUMP, SUB_PRIM_ARRAY_DUMP = 0x20, 0x21, 0x22, 0x23
+
+BASIC_TYPE_NAMES = {4: "boolean", 5: "char", 6: "float", 7: "double", 8: "byte", 9: "short", 10: "int", 11: "long"}
+BASIC_TYPE_SIZES = {4: 1, 5: 2, 6: 4, 7: 8, 8: 1, 9: 2, 10: 4, 11: 8}
+TYPE_OBJECT, TYPE_CHAR, TYPE_BYTE = 2, 5, 8
+# GC root sub-records: body size expressed as (ids, extra bytes)
+ROOT_RECORD_SIZES = {0xFF: (1, 0), 0x01: (2, 0), 0x02: (1, 8), 0x03: (1, 8), 0x04: (1, 4),
+                     0x05: (1, 0), 0x06: (1, 4), 0x07: (1, 0), 0x08: (1, 8)}
+
+_HEADER = struct.Struct(">BII")
+_U2, _U4, _I4 = struct.Struct(">H"), struct.Struct(">I"), struct.Struct(">i")
+
+
+class HprofFormatError(Exception):
+    pass
+
+
+def _id_struct(id_size):
+    if id_size not in (4, 8): raise HprofFormatError(f"Unsupported identifier size: {id_size}")
+    return struct.Struct(">I" if id_size == 4 else ">Q")
+
+
+def _align8(size):
+    return (size + 7) & ~7
+
+
+def read_hprof_index(mm):
+    """Walk the top-level record stream once, keeping names, classes, frames and traces.
+
+    Heap dump (segment) bodies are not parsed here; only their byte ranges are returned.
+    """
+    end_of_magic = mm.find(b"\0", 0, 64)
+    if mm[:len(HPROF_MAGIC)] != HPROF_MAGIC or end_of_magic < 0:
+        raise HprofFormatError("Not an HPROF file (missing 'JAVA PROFILE' header).")
+    if len(mm) < end_of_magic + 1 + 4 + 8: raise HprofFormatError("Truncated HPROF header.")
+    index = {"version": mm[:end_of_magic].decode("ascii", "replace"), "id_size": _U4.unpack_from(mm, end_of_magic + 1)[0],
+             "strings": {}, "class_names": {}, "class_serials": {}, "frames": {}, "traces": [], "thread_names": {},
+             "heap_ranges": [], "truncated": False}
+    id_size = index["id_size"]
+    id_struct = _id_struct(id_size)
+    pos, size = end_of_magic + 1 + 4 + 8, len(mm)
+    while pos + _HEADER.size <= size:
+        tag, _, length = _HEADER.unpack_from(mm, pos)
+        body, pos = pos + _HEADER.size, pos + _HEADER.size + length
+        if pos > size:
+            index["truncated"] = True
+            if tag in (TAG_HEAP_DUMP, TAG_HEAP_DUMP_SEGMENT): index["heap_ranges"].append((body, size))
+            break
+        if tag == TAG_UTF8:
+            index["strings"][id_struct.unpack_from(mm, body)[0]] = mm[body + id_size:pos].decode("utf-8", "replace")
+        elif tag == TAG_LOAD_CLASS:
+            serial = _U4.unpack_from(mm, body)[0]
+            class_id = id_struct.unpack_from(mm, body + 4)[0]
+            index["class_names"][class_id] = id_struct.unpack_from(mm, body + 8 + id_size)[0]
+            index["class_serials"][serial] = class_id
+        elif tag == TAG_FRAME:
+            frame_id, method, signature, source = (id_struct.unpack_from(mm, body + i * id_size)[0] for i in range(4))
+            index["frames"][frame_id] = (method, signature, source, _U4.unpack_from(mm, body + 4 * id_size)[0],
+                                         _I4.unpack_from(mm, body + 4 * id_size + 4)[0])
+        elif tag == TAG_TRACE:
+            serial, thread_serial, frame_count = struct.unpack_from(">III", mm, body)
+            frame_ids = [id_struct.unpack_from(mm, body + 12 + i * id_size)[0] for i in range(frame_count)]
+            index["traces"].append((serial, thread_serial, frame_ids))
+        elif tag == TAG_START_THREAD:
+            thread_serial = _U4.unpack_from(mm, body)[0]
+            index["thread_names"][thread_serial] = id_struct.unpack_from(mm, body + 4 + id_size + 4)[0]
+        elif tag in (TAG_HEAP_DUMP, TAG_HEAP_DUMP_SEGMENT) and length:
+            index["heap_ranges"].append((body, pos))
+    # A record header cut off part way leaves a few bytes the loop never reads
+    if pos < size: index["truncated"] = True
+    return index
+
+
+def _value_size(value_type, id_size):
+    return id_size if value_type == TYPE_OBJECT else BASIC_TYPE_SIZES[value_type]
+
+
+def _skip_class_dump(mm, pos, id_size, limit):
+    """Offset after a class dump sub-record, or None if it runs past limit."""
+    pos += 7 * id_size + 8
+    for entry_size in (lambda p: 3 + _value_size(mm[p + 2], id_size),  # constant pool: u2 index, u1 type, value
+                       lambda p: id_size + 1 + _value_size(mm[p + id_size], id_size)):  # static fields: name id, u1 type, value
+        if pos + 2 > limit: return None
+        count = _U2.unpack_from(mm, pos)[0]; pos += 2
+        for _ in range(count):
+            if pos + id_size + 1 > limit: return None
+            pos += entry_size(pos)
+    if pos + 2 > limit: return None
+    count = _U2.unpack_from(mm, pos)[0]; pos += 2
+    pos += count * (id_size + 1)  # instance field descriptors
+    return pos if pos <= limit else None
+
+
+def scan_heap_ranges(path, id_size, ranges, track_duplicates=True):
+    """Scan heap dump sub-records in the given byte ranges. Runs in a worker process.
+
+    Shallow sizes assume an object header of two identifiers (plus a 4 byte length for
+    arrays), rounded up to 8 bytes, so they are approximate. A sub-record running past its
+    range or the end of the file stops the scan of that range and sets "truncated".
+    """
+    id_struct = _id_struct(id_size)
+    header, array_header = 2 * id_size, 2 * id_size + 4
+    # Bytes after the sub-tag that must be present before a record's length fields can be read
+    fixed_sizes = {SUB_INSTANCE_DUMP: 2 * id_size + 8, SUB_PRIM_ARRAY_DUMP: id_size + 9, SUB_OBJ_ARRAY_DUMP: 2 * id_size + 8}
+    instances, object_arrays, primitive_arrays, duplicates = {}, {}, {}, {}
+    untracked_arrays, truncated = 0, False
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        for start, end in ranges:
+            pos, limit = start, min(end, len(mm))
+            truncated = truncated or end > len(mm)
+            while pos < limit:
+                sub_tag = mm[pos]
+                pos += 1
+                if pos + fixed_sizes.get(sub_tag, 0) > limit: truncated = True; break
+                if sub_tag == SUB_INSTANCE_DUMP:
+                    class_id = id_struct.unpack_from(mm, pos + id_size + 4)[0]
+                    field_bytes = _U4.unpack_from(mm, pos + 2 * id_size + 4)[0]
+                    pos += 2 * id_size + 8 + field_bytes
+                    if pos > limit: truncated = True; break
+                    entry = instances.get(class_id)
+                    if entry is None: instances[class_id] = [1, _align8(header + field_bytes)]
+                    else: entry[0] += 1; entry[1] += _align8(header + field_bytes)
+                elif sub_tag == SUB_PRIM_ARRAY_DUMP:
+                    length = _U4.unpack_from(mm, pos + id_size + 4)[0]
+                    elem_type = mm[pos + id_size + 8]
+                    if elem_type not in BASIC_TYPE_SIZES: raise HprofFormatError(f"Unknown array element type {elem_type} at offset {pos + id_size + 8}")
+                    data_start = pos + id_size + 9
+                    data_bytes = length * BASIC_TYPE_SIZES[elem_type]
+                    pos = data_start + data_bytes
+                    if pos > limit: truncated = True; break
+                    shallow = _align8(array_header + data_bytes)
+                    entry = primitive_arrays.get(elem_type)
+                    if entry is None: primitive_arrays[elem_type] = [1, shallow]
+                    else: entry[0] += 1; entry[1] += shallow
+                    # char[] and byte[] back java.lang.String, so identical contents approximate duplicate strings
+                    if track_duplicates and elem_type in (TYPE_CHAR, TYPE_BYTE) and length:
+                        key = hashlib.blake2b(mm[data_start:pos], digest_size=8).digest() + bytes((elem_type,))
+                        dup = duplicates.get(key)
+                        if dup is not None: dup[0] += 1
+                        elif len(duplicates) < MAX_TRACKED_ARRAYS: duplicates[key] = [1, shallow, data_start, length]
+                        else: untracked_arrays += 1
+                elif sub_tag == SUB_OBJ_ARRAY_DUMP:
+                    length = _U4.unpack_from(mm, pos + id_size + 4)[0]
+                    class_id = id_struct.unpack_from(mm, pos + id_size + 8)[0]
+                    pos += 2 * id_size + 8 + length * id_size
+                    if pos > limit: truncated = True; break
+                    shallow = _align8(array_header + length * id_size)
+                    entry = object_arrays.get(class_id)
+                    if entry is None: object_arrays[class_id] = [1, shallow]
+                    else: entry[0] += 1; entry[1] += shallow
+                elif sub_tag == SUB_CLASS_DUMP:
+                    pos = _skip_class_dump(mm, pos, id_size, limit)
+                    if pos is None: truncated = True; break
+                elif sub_tag in ROOT_RECORD_SIZES:
+                    ids, extra = ROOT_RECORD_SIZES[sub_tag]
+                    pos += ids * id_size + extra
+                    if pos > limit: truncated = True; break
+                else:
+                    raise HprofFormatError(f"Unknown heap dump sub-record 0x{sub_tag:02x} at offset {pos - 1}")
+    # Duplicates seen once here may still repeat in another worker's ranges, so all are returned
+    return {"instances": instances, "object_arrays": object_arrays, "primitive_arrays": primitive_arrays,
+            "duplicates": duplicates, "untracked_arrays": untracked_arrays, "truncated": truncated}
+
+
+def _group_ranges(heap_ranges, target_bytes):
+    tasks, current, current_bytes = [], [], 0
+    for start, end in heap_ranges:
+        current.append((start, end))
+        current_bytes += end - start
+        if current_bytes >= target_bytes:
+            tasks.append(current); current, current_bytes = [], 0
+    if current: tasks.append(current)
+    return tasks
+
+
+def _merge_counts(target, source):
+    for key, (count, size) in source.items():
+        entry = target.get(key)
+        if entry is None: target[key] = [count, size]
+        else: entry[0] += count; entry[1] += size
+
+
+def _class_name(index, class_id):
+    name = index["strings"].get(index["class_names"].get(class_id), f"<class 0x{class_id:x}>")
+    # HPROF uses internal names: java/lang/String, [Ljava/lang/Object;
+    dims = len(name) - len(name.lstrip("["))
+    if dims:
+        element = name[dims:]
+        element = element[1:-1] if element.startswith("L") else BASIC_TYPE_NAMES.get(" ZCFDBSIJ".find(element) + 3, element)
+        name = element + "[]" * dims
+    return name.replace("/", ".")
+
+
+def _render_trace(index, frame_ids):
+    lines = []
+    for frame_id in frame_ids:
+        frame = index["frames"].get(frame_id)
+        if frame is None: lines.append(f"\tat <unknown frame 0x{frame_id:x}>"); continue
+        method, _, source, class_serial, line = frame
+        class_name = _class_name(index, index["class_serials"].get(class_serial, 0))
+        source_name = index["strings"].get(source, "Unknown Source")
+        location = f"{source_name}:{line}" if line > 0 else "Native Method" if line == -3 else source_name
+        lines.append(f"\tat {class_name}.{index['strings'].get(method, '?')}({location})")
+    return lines
+
+
+def analyze_hprof(hprof_path, workers=None, task_target_bytes=TASK_TARGET_BYTES, track_duplicates=True):
+    """Produce a class histogram, stack traces and duplicate-string statistics without MAT."""
+    # mmap cannot map an empty file
+    if os.path.getsize(hprof_path) == 0: raise HprofFormatError("Not an HPROF file (the file is empty).")
+    with open(hprof_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        index = read_hprof_index(mm)
+        id_size = index["id_size"]
+        tasks = _group_ranges(index["heap_ranges"], task_target_bytes)
+        workers = max(1, min(workers or os.cpu_count() or 1, len(tasks) or 1))
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                partials = list(pool.map(scan_heap_ranges, [hprof_path] * len(tasks), [id_size] * len(tasks), tasks, [track_duplicates] * len(tasks)))
+        else:
+            partials = [scan_heap_ranges(hprof_path, id_size, task, track_duplicates) for task in tasks]
+
+        instances, object_arrays, primitive_arrays, duplicates, untracked = {}, {}, {}, {}, 0
+        for partial in partials:
+            _merge_counts(instances, partial["instances"])
+            _merge_counts(object_arrays, partial["object_arrays"])
+            _merge_counts(primitive_arrays, partial["primitive_arrays"])
+            untracked += partial["untracked_arrays"]
+            index["truncated"] = index["truncated"] or partial["truncated"]
+            for key, (count, shallow, offset, length) in partial["duplicates"].items():
+                entry = duplicates.get(key)
+                if entry is None: duplicates[key] = [count, shallow, offset, length]
+                else: entry[0] += count
+
+        histogram = [{"class": _class_name(index, cid), "instances": c, "shallow_bytes": s} for cid, (c, s) in instances.items()]
+        histogram += [{"class": _class_name(index, cid), "instances": c, "shallow_bytes": s} for cid, (c, s) in object_arrays.items()]
+        histogram += [{"class": f"{BASIC_TYPE_NAMES.get(t, t)}[]", "instances": c, "shallow_bytes": s} for t, (c, s) in primitive_arrays.items()]
+        histogram.sort(key=lambda row: row["shallow_bytes"], reverse=True)
+
+        repeated = sorted(((k, v) for k, v in duplicates.items() if v[0] > 1), key=lambda kv: (kv[1][0] - 1) * kv[1][1], reverse=True)
+        top_duplicates = []
+        for key, (count, shallow, offset, length) in repeated[:TOP_DUPLICATES]:
+            elem_type = key[-1]
+            raw = mm[offset:offset + min(length, DUPLICATE_PREVIEW_CHARS) * BASIC_TYPE_SIZES[elem_type]]
+            preview = raw.decode("utf-16-be" if elem_type == TYPE_CHAR else "latin-1", "replace")
+            top_duplicates.append({"preview": preview, "length": length, "copies": count, "wasted_bytes": (count - 1) * shallow})
+
+    stack_traces = []
+    for serial, thread_serial, frame_ids in index["traces"]:
+        if not thread_serial or not frame_ids: continue
+        name = index["strings"].get(index["thread_names"].get(thread_serial), f"Thread serial {thread_serial}")
+        stack_traces.append({"thread": name, "trace_serial": serial, "frames": _render_trace(index, frame_ids)})
+
+    return {
+        "hprof_version": index["version"], "id_size": id_size, "truncated": index["truncated"],
+        "heap_segments": len(index["heap_ranges"]), "worker_tasks": len(tasks), "workers": workers,
+        "total_objects": sum(row["instances"] for row in histogram),
+        "total_shallow_bytes": sum(row["shallow_bytes"] for row in histogram),
+        "class_count": len(histogram), "histogram": histogram[:TOP_CLASSES],
+        "duplicate_strings": {"tracked_arrays": sum(v[0] for v in duplicates.values()), "distinct_contents": len(duplicates),
+                              "duplicated_copies": sum(v[0] - 1 for _, v in repeated),
+                              "wasted_bytes": sum((v[0] - 1) * v[1] for _, v in repeated),
+                              "untracked_arrays": untracked, "top": top_duplicates},
+        "stack_traces": stack_traces,
+    }
+
+
+def render_stack_traces(result, max_chars=100_000):
+    """Render the STACK TRACE records in jstack-like form for the thread dump prompt placeholder."""
+    blocks, used = [], 0
+    for trace in result["stack_traces"]:
+        block = "\n".join([f'"{trace["thread"]}"'] + trace["frames"]) + "\n"
+        if used + len(block) > max_chars:
+            blocks.append(f"... {len(result['stack_traces']) - len(blocks)} more stack trace(s) omitted.")
+            break
+        blocks.append(block); used += len(block)
+    return "\n".join(blocks)
+
+
+def format_triage_report(result):
+    """Render the triage result as plain text for the prompt and the run folder."""
+    mb = lambda n: f"{n / (1024 * 1024):.1f} MB"
+    lines = [f"HPROF triage ({result['hprof_version']}, {result['id_size']}-byte ids): {result['total_objects']:,} objects, "
+             f"{mb(result['total_shallow_bytes'])} shallow, {result['class_count']} classes, {result['heap_segments']} heap segment(s)."]
+    if result["truncated"]: lines.append("WARNING: the heap dump is truncated; figures cover the readable part only.")
+    lines.append("")
+    lines.append(f"Top {len(result['histogram'])} classes by shallow size:")
+    lines.append(f"{'Shallow':>12} {'Instances':>12}  Class")
+    for row in result["histogram"]:
+        lines.append(f"{mb(row['shallow_bytes']):>12} {row['instances']:>12,}  {row['class']}")
+    dup = result["duplicate_strings"]
+    lines.append("")
+    lines.append(f"Duplicate strings (identical char[]/byte[] contents): {dup['duplicated_copies']:,} redundant copies "
+                 f"across {dup['distinct_contents']:,} distinct values, {mb(dup['wasted_bytes'])} wasted.")
+    for entry in dup["top"]:
+        lines.append(f"  {entry['copies']:>8,} x {entry['length']:>6} chars  {mb(entry['wasted_bytes']):>10} wasted  {entry['preview']!r}")
+    if dup["untracked_arrays"]:
+        lines.append(f"  ({dup['untracked_arrays']:,} arrays not tracked after the per-worker limit was reached)")
+    return "\n".join(lines)
@@ -0,0 +1,237 @@
+# Filename: incident_fingerprint.py
+"""Semantic fingerprints of analysed incidents, for finding earlier runs that showed the same problem.
+
+A run's features are short normalised strings: the top classes of the heap and the class chain of
+MAT's leak suspects, the dominant thread stack signatures, and the top tshark talkers. They are
+reduced to a MinHash signature, whose bands are stored in an SQLite LSH index so look-alikes are
+found without comparing against every run.
+"""
+import hashlib
+import json
+import random
+import re
+import sqlite3
+from contextlib import closing
+from datetime import datetime, timezone
+from pathlib import Path
+
+import thread_dump_parser
+
+PROJECT_ROOT = Path(__file__).resolve().parent
+INDEX_PATH = PROJECT_ROOT / "incident_index.db"
+
+NUM_PERM = 64
+BANDS = 16  # 4 rows per band: runs above roughly 50% Jaccard similarity become candidates
+SIMILARITY_THRESHOLD = 0.7
+MAX_MATCHES = 3
+RESOLVED_STATUS = "resolved"
+INDEXED_STATUS = "completed_ok"
+
+TOP_CLASSES = 10
+TOP_SUSPECT_CLASSES = 8
+TOP_STACKS = 10
+FRAMES_PER_STACK = 8
+TOP_TALKERS = 10
+# Client-side ports differ between captures of the same traffic
+MAX_SERVICE_PORT = 32767
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_rng = random.Random(20240601)
+_PERMUTATIONS = [(_rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(0, _MERSENNE_PRIME)) for _ in range(NUM_PERM)]
+
+CLASS_NAME_RE = re.compile(r"\b(?:[a-z_][\w$]*\.){2,}[A-Z][\w$]*(?:\[\])*")
+CONVERSATION_RE = re.compile(r"^\s*(\S+)\s+<->\s+(\S+)\s")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_name TEXT PRIMARY KEY,
+    analysis_type TEXT,
+    signature TEXT NOT NULL,
+    indexed_utc TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS bands (
+    run_name TEXT NOT NULL,
+    band INTEGER NOT NULL,
+    bucket TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS bands_by_bucket ON bands (band, bucket);
+CREATE INDEX IF NOT EXISTS bands_by_run ON bands (run_name);
+"""
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+def _load_metadata(run_dir):
+    try:
+        with open(Path(run_dir) / "run_metadata.json", "r", encoding="utf-8") as f: return json.load(f)
+    except (OSError, ValueError): return None
+
+
+def dominant_stacks(groups, top=TOP_STACKS, frames=FRAMES_PER_STACK):
+    """Signatures of the first stack groups in thread_dump_parser ranking order (contended first, then by thread count)."""
+    signatures = []
+    for group in groups[:top]:
+        frame_keys = [thread_dump_parser.normalize_frame(f) for f in group["frames"][:frames]]
+        signatures.append("|".join([group["state"]] + frame_keys))
+    return signatures
+
+
+def histogram_features(histogram, top=TOP_CLASSES):
+    """Top heap classes by shallow size, plus each adjacent pair so the ordering counts too."""
+    names = [row["class"] for row in histogram[:top]]
+    return [f"class:{name}" for name in names] + [f"class_pair:{a}>{b}" for a, b in zip(names, names[1:])]
+
+
+def suspect_chain_features(mat_summary, top=TOP_SUSPECT_CLASSES):
+    """Class names in the order MAT's leak suspects mention them, and the chain they form."""
+    names = []
+    for name in CLASS_NAME_RE.findall(mat_summary or ""):
+        if name not in names: names.append(name)
+        if len(names) >= top: break
+    return [f"suspect:{name}" for name in names] + [f"suspect_chain:{a}>{b}" for a, b in zip(names, names[1:])]
+
+
+def _endpoint(address):
+    host, sep, port = address.rpartition(":")
+    if not sep or not port.isdigit(): return address
+    return f"{host}:{port}" if int(port) <= MAX_SERVICE_PORT else f"{host}:*"
+
+
+def talker_features(tshark_summary, top=TOP_TALKERS):
+    """Endpoint pairs of the first conversations tshark lists (it sorts them by traffic)."""
+    pairs = []
+    for line in (tshark_summary or "").splitlines():
+        match = CONVERSATION_RE.match(line)
+        if not match: continue
+        pair = "<->".join(sorted((_endpoint(match.group(1)), _endpoint(match.group(2)))))
+        if pair not in pairs: pairs.append(pair)
+        if len(pairs) >= top: break
+    return [f"talker:{pair}" for pair in pairs]
+
+
+def run_features(run_dir, metadata, mat_summary=None, tshark_summary=None):
+    """Feature set of a run from what monitor.py already produced; empty when nothing characteristic is known."""
+    features = [f"stack:{signature}" for signature in metadata.get("dominant_stacks", [])]
+    triage = metadata.get("hprof_triage")
+    if triage and triage.get("json_file"):
+        try:
+            with open(Path(run_dir) / triage["json_file"], "r", encoding="utf-8") as f: triage_result = json.load(f)
+            features += histogram_features(triage_result.get("histogram", []))
+            groups = [{"state": "TRACE", "frames": trace["frames"]} for trace in triage_result.get("stack_traces", [])]
+            features += [f"stack:{signature}" for signature in dominant_stacks(groups)]
+        except (OSError, ValueError, KeyError): pass
+    features += suspect_chain_features(mat_summary) + talker_features(tshark_summary)
+    return sorted(set(features))
+
+
+def _feature_hash(feature):
+    return int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def minhash(features):
+    """MinHash signature (NUM_PERM integers) of a feature set, or None for an empty set."""
+    hashes = [_feature_hash(f) for f in set(features)]
+    if not hashes: return None
+    return [min((a * h + b) % _MERSENNE_PRIME for h in hashes) for a, b in _PERMUTATIONS]
+
+
+def similarity(signature_a, signature_b):
+    """Estimated Jaccard similarity of the feature sets behind two signatures."""
+    return sum(x == y for x, y in zip(signature_a, signature_b)) / NUM_PERM
+
+
+def _band_buckets(signature):
+    rows = NUM_PERM // BANDS
+    return [(band, hashlib.blake2b(json.dumps(signature[band * rows:(band + 1) * rows]).encode("ascii"), digest_size=8).hexdigest())
+            for band in range(BANDS)]
+
+
+def fingerprint(features):
+    """The run_metadata.json entry for a run's fingerprint, or None when it has no features."""
+    signature = minhash(features)
+    return {"features": len(features), "minhash": signature} if signature else None
+
+
+class IncidentIndex:
+    """LSH index over the MinHash fingerprints of completed runs across Resultat.
+
+    Signatures come from each run's run_metadata.json, so the database can be rebuilt with sync().
+    Whether a run is resolved is read from its metadata at lookup time, since it changes on the dashboard.
+    """
+
+    def __init__(self, db_path=None):
+        self.db_path = str(db_path or INDEX_PATH)
+        with closing(self._connect()) as conn, conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def add_run(self, run_dir):
+        """Index a completed run that has a fingerprint; returns True if it was added."""
+        metadata = _load_metadata(run_dir)
+        signature = ((metadata or {}).get("incident_fingerprint") or {}).get("minhash")
+        if not signature or metadata.get("status") != INDEXED_STATUS: return False
+        run_name = Path(run_dir).name
+        with closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM bands WHERE run_name = ?", (run_name,))
+            conn.execute("INSERT OR REPLACE INTO runs (run_name, analysis_type, signature, indexed_utc) VALUES (?, ?, ?, ?)",
+                         (run_name, metadata.get("analysis_type"), json.dumps(signature), _now()))
+            conn.executemany("INSERT INTO bands (run_name, band, bucket) VALUES (?, ?, ?)", [(run_name, band, bucket) for band, bucket in _band_buckets(signature)])
+        return True
+
+    def sync(self, resultat_dir):
+        """Index run folders not seen before and forget deleted ones. Returns the number of runs added."""
+        try: run_names = {d.name for d in Path(resultat_dir).iterdir() if d.is_dir()}
+        except OSError: return 0
+        with closing(self._connect()) as conn:
+            known = {row[0] for row in conn.execute("SELECT run_name FROM runs")}
+        added = sum(self.add_run(Path(resultat_dir) / run_name) for run_name in sorted(run_names - known))
+        self.remove(known - run_names)
+        return added
+
+    def find_similar(self, signature, analysis_type, resultat_dir, exclude=None, threshold=SIMILARITY_THRESHOLD, resolved_only=True):
+        """Runs of the same analysis type whose fingerprint is at least threshold similar, most similar first.
+
+        Returns up to MAX_MATCHES dicts with run, similarity, user_status and llm_analysis_file.
+        """
+        buckets = _band_buckets(signature)
+        with closing(self._connect()) as conn:
+            candidates = {}
+            for band, bucket in buckets:
+                for row in conn.execute("SELECT r.run_name, r.analysis_type, r.signature FROM bands b JOIN runs r ON r.run_name = b.run_name "
+                                        "WHERE b.band = ? AND b.bucket = ?", (band, bucket)):
+                    candidates[row["run_name"]] = row
+        matches = []
+        for run_name, row in candidates.items():
+            if run_name == exclude or row["analysis_type"] != analysis_type: continue
+            score = similarity(signature, json.loads(row["signature"]))
+            if score < threshold: continue
+            metadata = _load_metadata(Path(resultat_dir) / run_name)
+            if metadata is None: continue
+            if resolved_only and metadata.get("user_status") != RESOLVED_STATUS: continue
+            matches.append({"run": run_name, "similarity": round(score, 3), "user_status": metadata.get("user_status"),
+                            "llm_analysis_file": metadata.get("llm_analysis_file")})
+        matches.sort(key=lambda m: (-m["similarity"], m["run"]))
+        return matches[:MAX_MATCHES]
+
+    def remove(self, run_names):
+        with closing(self._connect()) as conn, conn:
+            conn.executemany("DELETE FROM bands WHERE run_name = ?", [(name,) for name in run_names])
+            conn.executemany("DELETE FROM runs WHERE run_name = ?", [(name,) for name in run_names])
+
+
+def reusable_analysis(run_dir):
+    """(analysis text, tags) from a finished run's analysis markdown, or None if it cannot be read."""
+    metadata = _load_metadata(run_dir)
+    if not metadata or not metadata.get("llm_analysis_file"): return None
+    try:
+        with open(Path(run_dir) / metadata["llm_analysis_file"], "r", encoding="utf-8") as f: markdown = f.read()
+    except OSError: return None
+    _, marker, text = markdown.partition("### LLM Analysis:\n")
+    if not marker or not text.strip(): return None
+    return text.strip(), metadata.get("llm_generated_tags", [])
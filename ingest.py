@@ -0,0 +1,188 @@
+# Filename: ingest.py
+import errno
+import gzip
+import os
+from pathlib import Path
+
+import analysis_cache
+
+try:
+    import zstandard
+except ImportError:  # optional: only needed for .zst inputs
+    zstandard = None
+
+try:
+    import fcntl
+except ImportError:  # not on Windows; reflinks are only attempted on Linux
+    fcntl = None
+
+SUPPORTED_EXTENSIONS = (".hprof", ".txt", ".pcap", ".pcapng")
+COMPRESSED_EXTENSIONS = (".gz", ".zst")
+COPY_CHUNK_SIZE = 1024 * 1024
+# In-kernel copies move this much per copy_file_range call; the copied range is hashed back from the page cache
+KERNEL_COPY_CHUNK_SIZE = 64 * 1024 * 1024
+FICLONE = 0x40049409  # linux/fs.h: share the source's extents (btrfs, XFS, bcachefs)
+
+STRATEGY_AUTO = "auto"
+STRATEGY_HARDLINK = "hardlink"
+STRATEGY_REFLINK = "reflink"
+STRATEGY_MOVE = "move"
+STRATEGY_COPY = "copy"
+INGEST_STRATEGIES = (STRATEGY_AUTO, STRATEGY_HARDLINK, STRATEGY_REFLINK, STRATEGY_MOVE, STRATEGY_COPY)
+# Errors meaning "this filesystem or platform cannot do that", after which the next method is tried
+_UNSUPPORTED_ERRNOS = {errno.EXDEV, errno.EPERM, errno.EACCES, errno.EINVAL, errno.ENOTTY, errno.ENOSYS, errno.EMLINK,
+                       getattr(errno, "EOPNOTSUPP", errno.EINVAL), getattr(errno, "ENOTSUP", errno.EINVAL)}
+
+
+class IngestError(Exception):
+    pass
+
+
+def split_compression(filename):
+    """Return (name without compression suffix, compression suffix or None)."""
+    name = os.path.basename(str(filename))
+    lower = name.lower()
+    for suffix in COMPRESSED_EXTENSIONS:
+        if lower.endswith(suffix):
+            return name[:-len(suffix)], suffix
+    return name, None
+
+
+def is_supported_input(filename):
+    """True for diagnostic files the pipeline understands, compressed or not."""
+    return split_compression(filename)[0].lower().endswith(SUPPORTED_EXTENSIONS)
+
+
+def is_compressed(filename):
+    return split_compression(filename)[1] is not None
+
+
+def file_dialog_filter():
+    patterns = [f"*{ext}" for ext in SUPPORTED_EXTENSIONS]
+    patterns += [f"*{ext}{suffix}" for ext in SUPPORTED_EXTENSIONS for suffix in COMPRESSED_EXTENSIONS]
+    return f"Diagnostic Files ({' '.join(patterns)})"
+
+
+def _open_source(source_path, compression):
+    if compression == ".gz":
+        return gzip.open(source_path, "rb")
+    if compression == ".zst":
+        if zstandard is None:
+            raise IngestError(f"'{os.path.basename(source_path)}' is zstd-compressed; install the 'zstandard' package to read it.")
+        return zstandard.ZstdDecompressor().stream_reader(open(source_path, "rb"), closefd=True)
+    return open(source_path, "rb")
+
+
+def ingest_file(source_path, dest_dir, chunk_size=COPY_CHUNK_SIZE, progress=None):
+    """Copy (decompressing if needed) a diagnostic file into dest_dir, hashing it in the same pass.
+
+    Returns (destination path, content hash of the decompressed bytes). The hash matches
+    analysis_cache.hash_file on the destination, so it can be passed on as --input-hash.
+    progress, when given, is called with the number of bytes written so far.
+    """
+    inner_name, compression = split_compression(source_path)
+    dest_path = Path(dest_dir) / inner_name
+    tmp_path = dest_path.with_name(dest_path.name + ".part")
+    digest = analysis_cache.content_hasher()
+    try:
+        with _open_source(source_path, compression) as src, open(tmp_path, "wb") as dst:
+            written = 0
+            for chunk in iter(lambda: src.read(chunk_size), b""):
+                digest.update(chunk)
+                dst.write(chunk)
+                if progress: written += len(chunk); progress(written)
+        os.replace(tmp_path, dest_path)
+    except Exception as e:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        corrupt = isinstance(e, (gzip.BadGzipFile, EOFError)) or (zstandard is not None and isinstance(e, zstandard.ZstdError))
+        if corrupt: raise IngestError(f"Could not decompress '{os.path.basename(source_path)}': {e}") from e
+        raise
+    return dest_path, digest.hexdigest()
+
+
+def place_input(source_path, dest_dir, strategy=STRATEGY_AUTO, chunk_size=COPY_CHUNK_SIZE, content_hash=None):
+    """Put a diagnostic file into dest_dir with the cheapest method the strategy and filesystem allow.
+
+    auto tries a hard link, then a reflink, then an in-kernel copy_file_range copy and finally a
+    plain copy; hardlink and reflink fall back to copying when unsupported. move renames the file
+    (copying and deleting it across filesystems) and is meant for inbox folders whose files may be
+    consumed. Compressed inputs are always decompressed and, with move, deleted afterwards.
+
+    Returns (destination path, content hash, method used). The hash is computed while the file is
+    placed and taken over the destination's bytes. content_hash, when the source was already hashed,
+    is returned as-is for links, reflinks and renames, which share the source's bytes; copies are
+    always hashed.
+    """
+    if strategy not in INGEST_STRATEGIES: raise IngestError(f"Unknown ingest strategy '{strategy}'.")
+    if is_compressed(source_path):
+        dest_path, content_hash = ingest_file(source_path, dest_dir, chunk_size)
+        if strategy == STRATEGY_MOVE: os.remove(source_path)
+        return dest_path, content_hash, "decompressed"
+
+    dest_path = Path(dest_dir) / os.path.basename(str(source_path))
+    if strategy == STRATEGY_MOVE:
+        try:
+            os.replace(source_path, dest_path)
+            return dest_path, content_hash or analysis_cache.hash_file(dest_path), "moved"
+        except OSError as e:
+            if e.errno != errno.EXDEV: raise
+        dest_path, content_hash, method = place_input(source_path, dest_dir, STRATEGY_AUTO, chunk_size, content_hash)
+        os.remove(source_path)
+        return dest_path, content_hash, f"moved ({method})"
+
+    attempts = {STRATEGY_AUTO: (_hardlink, _reflink, _kernel_copy), STRATEGY_HARDLINK: (_hardlink,),
+                STRATEGY_REFLINK: (_reflink,), STRATEGY_COPY: ()}[strategy]
+    for attempt in attempts:
+        try:
+            placed_hash, method = attempt(source_path, dest_path, content_hash)
+            return dest_path, placed_hash, method
+        except OSError as e:
+            if e.errno not in _UNSUPPORTED_ERRNOS: raise
+            _remove_quietly(dest_path)
+    dest_path, content_hash = ingest_file(source_path, dest_dir, chunk_size)
+    return dest_path, content_hash, "copied"
+
+
+def _hardlink(source_path, dest_path, content_hash=None):
+    os.link(source_path, dest_path)
+    return content_hash or analysis_cache.hash_file(dest_path), "hard-linked"
+
+
+def _reflink(source_path, dest_path, content_hash=None):
+    if fcntl is None: raise OSError(errno.ENOTSUP, "reflinks are not supported on this platform")
+    with open(source_path, "rb") as src, open(dest_path, "wb") as dst:
+        fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+    return content_hash or analysis_cache.hash_file(dest_path), "reflinked"
+
+
+def _kernel_copy(source_path, dest_path, content_hash=None):
+    if not hasattr(os, "copy_file_range"): raise OSError(errno.ENOSYS, "copy_file_range is not available")
+    # A known content_hash is not reused: the copy itself is what gets hashed
+    digest = analysis_cache.content_hasher()
+    tmp_path = dest_path.with_name(dest_path.name + ".part")
+    try:
+        with open(source_path, "rb") as src, open(tmp_path, "w+b") as dst:
+            size = os.fstat(src.fileno()).st_size
+            offset = 0
+            while offset < size:
+                copied = os.copy_file_range(src.fileno(), dst.fileno(), min(KERNEL_COPY_CHUNK_SIZE, size - offset), offset, offset)
+                if copied == 0: break
+                # Hash what landed in the destination, so the copy itself is what gets verified
+                for start in range(offset, offset + copied, COPY_CHUNK_SIZE):
+                    digest.update(os.pread(dst.fileno(), min(COPY_CHUNK_SIZE, offset + copied - start), start))
+                offset += copied
+            if offset != size: raise IngestError(f"Copy of '{os.path.basename(str(source_path))}' stopped at {offset} of {size} bytes.")
+        os.replace(tmp_path, dest_path)
+    except BaseException:
+        _remove_quietly(tmp_path); raise
+    return digest.hexdigest(), "copied (copy_file_range)"
+
+
+def _remove_quietly(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
@@ -0,0 +1,112 @@
+# Filename: input_index.py
+import json
+import os
+import sqlite3
+from contextlib import closing
+from datetime import datetime, timezone
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent
+INDEX_PATH = PROJECT_ROOT / "input_index.db"
+# Only runs that finished their analysis can stand in for a new one
+INDEXED_STATUS = "completed_ok"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_name TEXT PRIMARY KEY,
+    content_hash TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    analysis_type TEXT,
+    indexed_utc TEXT NOT NULL
+)
+"""
+_LOOKUP_INDEX = "CREATE INDEX IF NOT EXISTS runs_by_content ON runs (content_hash, size)"
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+def _load_metadata(run_dir):
+    try:
+        with open(Path(run_dir) / "run_metadata.json", "r", encoding="utf-8") as f: return json.load(f)
+    except (OSError, ValueError): return None
+
+
+def run_fingerprint(run_dir):
+    """(content hash, input size, analysis type) of a successfully completed run, or None."""
+    metadata = _load_metadata(run_dir)
+    if not metadata or metadata.get("status") != INDEXED_STATUS or not metadata.get("input_content_hash"): return None
+    size = metadata.get("input_size_bytes")
+    if size is None:
+        try: size = os.path.getsize(Path(run_dir) / metadata.get("input_file", ""))
+        except OSError: return None
+    return metadata["input_content_hash"], size, metadata.get("analysis_type")
+
+
+class InputIndex:
+    """Content hash and size of every analysed input across Resultat, so a re-submitted dump can be linked to its earlier run.
+
+    Rows are derived from each run's run_metadata.json (input_content_hash, written at ingest), so
+    the database can be deleted and rebuilt with sync(). Runs that did not complete are not indexed
+    and are looked at again on the next sync.
+    """
+
+    def __init__(self, db_path=None):
+        self.db_path = str(db_path or INDEX_PATH)
+        with closing(self._connect()) as conn, conn:
+            conn.execute(_SCHEMA)
+            conn.execute(_LOOKUP_INDEX)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def add_run(self, run_dir):
+        """Index a run folder; returns True if it completed and is now findable by its input."""
+        fingerprint = run_fingerprint(run_dir)
+        if fingerprint is None: return False
+        with closing(self._connect()) as conn, conn:
+            conn.execute("INSERT OR REPLACE INTO runs (run_name, content_hash, size, analysis_type, indexed_utc) VALUES (?, ?, ?, ?, ?)",
+                         (Path(run_dir).name, *fingerprint, _now()))
+        return True
+
+    def sync(self, resultat_dir):
+        """Index run folders not seen before and forget deleted ones. Returns the number of runs added."""
+        try: run_names = {d.name for d in Path(resultat_dir).iterdir() if d.is_dir()}
+        except OSError: return 0
+        with closing(self._connect()) as conn:
+            known = {row[0] for row in conn.execute("SELECT run_name FROM runs")}
+        added = sum(self.add_run(Path(resultat_dir) / run_name) for run_name in sorted(run_names - known))
+        with closing(self._connect()) as conn, conn:
+            conn.executemany("DELETE FROM runs WHERE run_name = ?", [(name,) for name in known - run_names])
+        return added
+
+    def has_size(self, size):
+        """Cheap pre-check: only inputs of an indexed size need hashing before they are placed."""
+        with closing(self._connect()) as conn:
+            return conn.execute("SELECT 1 FROM runs WHERE size = ? LIMIT 1", (size,)).fetchone() is not None
+
+    def find(self, content_hash, size, resultat_dir):
+        """Name of the newest completed run of identical input still present in resultat_dir, or None.
+
+        Entries whose run folder was deleted or re-run without success are dropped on the way.
+        """
+        with closing(self._connect()) as conn:
+            rows = conn.execute("SELECT run_name FROM runs WHERE content_hash = ? AND size = ? ORDER BY indexed_utc DESC, run_name DESC",
+                                (content_hash, size)).fetchall()
+        stale = []
+        for row in rows:
+            fingerprint = run_fingerprint(Path(resultat_dir) / row["run_name"])
+            if fingerprint and fingerprint[:2] == (content_hash, size): break
+            stale.append(row["run_name"])
+        else: row = None
+        if stale:
+            with closing(self._connect()) as conn, conn:
+                conn.executemany("DELETE FROM runs WHERE run_name = ?", [(name,) for name in stale])
+        return row["run_name"] if row else None
+
+    def remove(self, run_names):
+        with closing(self._connect()) as conn, conn:
+            conn.executemany("DELETE FROM runs WHERE run_name = ?", [(name,) for name in run_names])
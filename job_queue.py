@@ -0,0 +1,107 @@
+# Filename: job_queue.py
+import json
+import sqlite3
+from contextlib import closing
+from datetime import datetime, timezone
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent
+QUEUE_PATH = PROJECT_ROOT / "job_queue.db"
+# Finished jobs beyond the most recent ones are dropped when the queue is opened
+KEEP_FINISHED = 500
+FINISHED_STATES = ("done", "failed", "skipped", "cancelled", "duplicate")
+
+# AUTOINCREMENT keeps job numbers from being handed out again after finished jobs are deleted
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT NOT NULL UNIQUE,
+    path TEXT NOT NULL,
+    slot TEXT NOT NULL,
+    cost REAL NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 0,
+    argv TEXT,
+    origin TEXT,
+    run_dir TEXT,
+    duplicate_of TEXT,
+    state TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    created_utc TEXT NOT NULL,
+    updated_utc TEXT NOT NULL
+)
+"""
+_COLUMNS = ("seq", "id", "path", "slot", "cost", "priority", "argv", "origin", "run_dir", "duplicate_of", "state", "attempts", "created_utc", "updated_utc")
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+def _row_to_job(row):
+    job = dict(row)
+    job["argv"] = json.loads(job["argv"]) if job["argv"] else None
+    return job
+
+
+def read_entries(db_path=None, limit=500):
+    """Most recently submitted jobs first, for other processes such as the dashboard.
+
+    The database is opened read-only: unlike JobQueue() this creates nothing, prunes nothing and
+    leaves the journal mode alone. A queue that does not exist yet reads as empty.
+    """
+    path = Path(db_path or QUEUE_PATH)
+    if not path.is_file(): return []
+    with closing(sqlite3.connect(f"{path.resolve().as_uri()}?mode=ro", uri=True, timeout=10)) as conn:
+        conn.row_factory = sqlite3.Row
+        rows = conn.execute(f"SELECT {', '.join(_COLUMNS)} FROM jobs ORDER BY seq DESC LIMIT ?", (limit,)).fetchall()
+    return [_row_to_job(row) for row in rows]
+
+
+class JobQueue:
+    """Durable copy of the analysis job queue in SQLite (WAL), so queued work survives a restart or crash.
+
+    JobScheduler writes every job change here; the dashboard reads it to show queued and running
+    analyses. Like the Guard Mode ledger, each operation opens its own connection.
+    """
+
+    def __init__(self, db_path=None):
+        self.db_path = str(db_path or QUEUE_PATH)
+        with closing(self._connect()) as conn, conn:
+            # WAL lets the dashboard read while the GUI writes
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(_SCHEMA)
+            placeholders = ", ".join("?" for _ in FINISHED_STATES)
+            conn.execute(f"DELETE FROM jobs WHERE state IN ({placeholders}) AND seq NOT IN "
+                         f"(SELECT seq FROM jobs WHERE state IN ({placeholders}) ORDER BY seq DESC LIMIT ?)", FINISHED_STATES * 2 + (KEEP_FINISHED,))
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def next_sequence(self):
+        # The highest number ever used, including jobs deleted since; job ids are built from it
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'jobs'").fetchone()
+            return max(row[0] if row else 0, conn.execute("SELECT MAX(seq) FROM jobs").fetchone()[0] or 0) + 1
+
+    def save(self, job):
+        """Insert or update a scheduler job dict."""
+        now = _now()
+        with closing(self._connect()) as conn, conn:
+            conn.execute("INSERT INTO jobs (seq, id, path, slot, cost, priority, argv, origin, run_dir, duplicate_of, state, attempts, created_utc, updated_utc) "
+                         "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?) ON CONFLICT(id) DO UPDATE SET priority = excluded.priority, argv = excluded.argv, "
+                         "run_dir = excluded.run_dir, duplicate_of = excluded.duplicate_of, state = excluded.state, attempts = excluded.attempts, updated_utc = excluded.updated_utc",
+                         (job["seq"], job["id"], job["path"], job["slot"], job["cost"], job["priority"], json.dumps(job["argv"]) if job["argv"] else None,
+                          job["origin"], job["run_dir"], job.get("duplicate_of"), job["state"], job["attempts"], now, now))
+
+    def load(self, states):
+        """Jobs in the given states, in submission order."""
+        placeholders = ", ".join("?" for _ in states)
+        with closing(self._connect()) as conn:
+            rows = conn.execute(f"SELECT {', '.join(_COLUMNS)} FROM jobs WHERE state IN ({placeholders}) ORDER BY seq", tuple(states)).fetchall()
+        return [_row_to_job(row) for row in rows]
+
+    def delete(self, job_ids):
+        with closing(self._connect()) as conn, conn:
+            conn.executemany("DELETE FROM jobs WHERE id = ?", [(job_id,) for job_id in job_ids])
@@ -0,0 +1,184 @@
+# Filename: job_scheduler.py
+import itertools
+import os
+import time
+
+import ingest
+
+# Slot pools: heap dumps run Eclipse MAT, captures run tshark, thread dumps are only parsed and sent to the LLM
+SLOT_HEAVY = "heavy"
+SLOT_MEDIUM = "medium"
+SLOT_LIGHT = "light"
+DEFAULT_SLOTS = {SLOT_HEAVY: 1, SLOT_MEDIUM: 2, SLOT_LIGHT: 4}
+
+SLOT_BY_EXTENSION = {".hprof": SLOT_HEAVY, ".pcap": SLOT_MEDIUM, ".pcapng": SLOT_MEDIUM, ".txt": SLOT_LIGHT}
+# Rough seconds-per-byte ratio between the pools, used to order jobs of different types
+COST_FACTOR = {SLOT_HEAVY: 10, SLOT_MEDIUM: 3, SLOT_LIGHT: 1}
+# Compressed inputs are estimated at their typical decompressed size
+COMPRESSED_SIZE_FACTOR = 5
+
+STATE_QUEUED = "queued"
+STATE_RUNNING = "running"
+STATE_DONE = "done"
+STATE_FAILED = "failed"
+STATE_SKIPPED = "skipped"
+STATE_CANCELLED = "cancelled"
+# The input is identical to one analysed before; the job links to that run instead of running
+STATE_DUPLICATE = "duplicate"
+FINISHED_STATES = (STATE_DONE, STATE_FAILED, STATE_SKIPPED, STATE_CANCELLED, STATE_DUPLICATE)
+ACTIVE_STATES = (STATE_QUEUED, STATE_RUNNING)
+# A job that was running when the application stopped is queued again on restore, at most this many times in total
+MAX_ATTEMPTS = 3
+
+
+def slot_for_file(path):
+    name = ingest.split_compression(path)[0].lower()
+    return SLOT_BY_EXTENSION.get(os.path.splitext(name)[1], SLOT_LIGHT)
+
+
+def estimate_cost(path, size=None):
+    """Relative runtime estimate: input size scaled by how expensive its type is to analyse."""
+    if size is None:
+        try: size = os.path.getsize(path)
+        except OSError: size = 0
+    if ingest.is_compressed(path): size *= COMPRESSED_SIZE_FACTOR
+    return size * COST_FACTOR[slot_for_file(path)]
+
+
+def normalise_slots(slots):
+    """Merge configured pool sizes over the defaults; every pool keeps at least one slot."""
+    merged = dict(DEFAULT_SLOTS)
+    for name, count in (slots or {}).items():
+        if name in merged:
+            try: merged[name] = max(1, int(count))
+            except (TypeError, ValueError): pass
+    return merged
+
+
+class JobScheduler:
+    """Queue of analysis jobs run concurrently within per-type slot pools, highest priority then shortest job first.
+
+    Jobs are plain dicts; the caller starts whatever next_runnable() hands out and reports
+    back with finish(). Finished jobs stay listed until clear_finished(). With a store
+    (job_queue.JobQueue) every change is written through, and restore() reloads unfinished jobs.
+    """
+
+    def __init__(self, slots=None, store=None):
+        self.slots = normalise_slots(slots)
+        self.store = store
+        self.jobs = {}
+        self._ids = itertools.count(store.next_sequence() if store else 1)
+
+    def _new_job(self, seq, path, slot, cost, argv, origin, priority=0, attempts=0, run_dir=None):
+        return {"seq": seq, "id": f"job-{seq}", "path": str(path), "slot": slot, "cost": cost, "priority": priority, "argv": argv,
+                "origin": origin, "run_dir": run_dir, "duplicate_of": None, "state": STATE_QUEUED, "attempts": attempts,
+                "queued_at": time.monotonic(), "started_at": None, "finished_at": None}
+
+    def save(self, job):
+        """Write a job's current fields to the store, e.g. after the caller set its run_dir."""
+        if self.store: self.store.save(job)
+
+    def submit(self, path, size=None, slot=None, argv=None, origin=None, priority=0):
+        """Queue a file. argv, when given, is used as-is instead of being prepared at start time.
+
+        origin records where the file came from (e.g. "guard") for the caller's own use.
+        """
+        job = self._new_job(next(self._ids), path, slot or slot_for_file(path), estimate_cost(path, size), argv, origin, priority)
+        self.jobs[job["id"]] = job
+        self.save(job)
+        return job
+
+    def restore(self):
+        """Reload the store's unfinished jobs; jobs interrupted while running count an attempt.
+
+        Returns (requeued, failed): jobs queued again, and interrupted jobs that used up MAX_ATTEMPTS.
+        """
+        requeued, failed = [], []
+        if not self.store: return requeued, failed
+        for row in self.store.load(ACTIVE_STATES):
+            if row["id"] in self.jobs: continue
+            job = self._new_job(row["seq"], row["path"], row["slot"], row["cost"], row["argv"], row["origin"], row["priority"], row["attempts"], row["run_dir"])
+            self.jobs[job["id"]] = job
+            if row["state"] == STATE_RUNNING:
+                job["attempts"] += 1
+                if job["attempts"] >= MAX_ATTEMPTS: job["state"] = STATE_FAILED; job["finished_at"] = job["queued_at"]; failed.append(job); self.save(job); continue
+            requeued.append(job); self.save(job)
+        return requeued, failed
+
+    def active_for_path(self, path):
+        """The queued or running job for a file, if any."""
+        path = str(path)
+        return next((job for job in self.jobs.values() if job["path"] == path and job["state"] in ACTIVE_STATES), None)
+
+    def running(self, slot=None):
+        return [job for job in self.jobs.values() if job["state"] == STATE_RUNNING and (slot is None or job["slot"] == slot)]
+
+    def queued(self):
+        return [job for job in self.jobs.values() if job["state"] == STATE_QUEUED]
+
+    def free_slots(self, slot):
+        return self.slots[slot] - len(self.running(slot))
+
+    def next_runnable(self):
+        """Mark and return the highest-priority, then cheapest, queued job whose pool has a free slot, or None."""
+        candidates = [job for job in self.queued() if self.free_slots(job["slot"]) > 0]
+        if not candidates: return None
+        # Dict order is submission order, so min() keeps FIFO among equal keys
+        job = min(candidates, key=lambda j: (-j["priority"], j["cost"]))
+        job["state"] = STATE_RUNNING; job["started_at"] = time.monotonic()
+        self.save(job)
+        return job
+
+    def finish(self, job_id, state=STATE_DONE):
+        job = self.jobs.get(job_id)
+        if job is None or job["state"] in FINISHED_STATES: return None
+        job["state"] = state; job["finished_at"] = time.monotonic()
+        self.save(job)
+        return job
+
+    def set_priority(self, job_id, priority):
+        """Reorder a queued job; higher priorities start first."""
+        job = self.jobs.get(job_id)
+        if job is None or job["state"] != STATE_QUEUED: return None
+        job["priority"] = priority
+        self.save(job)
+        return job
+
+    def move_to_front(self, job_id):
+        return self.set_priority(job_id, max((j["priority"] for j in self.queued()), default=0) + 1)
+
+    def move_to_back(self, job_id):
+        return self.set_priority(job_id, min((j["priority"] for j in self.queued()), default=0) - 1)
+
+    def cancel(self, job_id):
+        """Cancel a queued or running job; the caller stops a running job's process."""
+        return self.finish(job_id, STATE_CANCELLED)
+
+    def retry(self, job_id, argv=None):
+        """Queue a finished job again as a new attempt; argv replaces the recorded arguments when given."""
+        job = self.jobs.get(job_id)
+        if job is None or job["state"] not in FINISHED_STATES: return None
+        job.update(state=STATE_QUEUED, attempts=job["attempts"] + 1, duplicate_of=None, queued_at=time.monotonic(), started_at=None, finished_at=None)
+        if argv is not None: job["argv"] = argv
+        self.save(job)
+        return job
+
+    def elapsed_seconds(self, job_id, now=None):
+        job = self.jobs[job_id]
+        if job["started_at"] is None: return 0.0
+        return (job["finished_at"] or now or time.monotonic()) - job["started_at"]
+
+    def is_idle(self):
+        return not any(job["state"] in ACTIVE_STATES for job in self.jobs.values())
+
+    def counts(self):
+        counts = dict.fromkeys(ACTIVE_STATES + FINISHED_STATES, 0)
+        for job in self.jobs.values(): counts[job["state"]] += 1
+        return counts
+
+    def clear_finished(self):
+        """Forget finished jobs and return their ids."""
+        finished = [job_id for job_id, job in self.jobs.items() if job["state"] in FINISHED_STATES]
+        for job_id in finished: del self.jobs[job_id]
+        if self.store and finished: self.store.delete(finished)
+        return finished
@@ -0,0 +1,99 @@
+# Filename: lock_graph.py
+from collections import Counter
+
+# Thresholds for the deterministic tags emitted before any LLM call
+CONTENTION_MIN_WAITERS = 3
+BLOCKED_THREADS_MIN = 3
+MAX_REPORTED_MONITORS = 10
+MAX_REPORTED_DEADLOCKS = 10
+
+
+class LockGraphBuilder:
+    """Builds a lock wait-for graph from parsed thread records (see thread_dump_parser).
+
+    Only lock ownership and the single lock each thread is waiting for are kept, so it
+    can run as an observer of the streaming parser.
+    """
+    def __init__(self):
+        self.thread_names = {}
+        self.lock_owner = {}
+        self.lock_class = {}
+        self.waiting_for = {}
+        self.blocked_count = 0
+        self._anonymous = 0
+
+    def _thread_key(self, record):
+        if record.get("tid"):
+            return record["tid"]
+        self._anonymous += 1
+        return f"{record['name']}#{self._anonymous}"
+
+    def add(self, record):
+        key = self._thread_key(record)
+        self.thread_names[key] = record["name"]
+        if record["state"] == "BLOCKED":
+            self.blocked_count += 1
+        waiting = record.get("waiting_on")
+        for lock in record.get("held_locks", []):
+            # Object.wait() releases the monitor even though jstack still lists it as locked
+            if waiting and waiting.get("kind") == "wait" and waiting["id"] == lock["id"]:
+                continue
+            self.lock_owner[lock["id"]] = key
+            if lock.get("class"): self.lock_class[lock["id"]] = lock["class"]
+        if waiting and waiting.get("kind") in ("lock", "park"):
+            self.waiting_for[key] = waiting["id"]
+            if waiting.get("class"): self.lock_class.setdefault(waiting["id"], waiting["class"])
+
+    def _find_cycles(self):
+        # Each thread waits for at most one lock, so every node has at most one outgoing edge
+        edges = {t: self.lock_owner[l] for t, l in self.waiting_for.items() if l in self.lock_owner and self.lock_owner[l] != t}
+        state, cycles = {}, []
+        for start in edges:
+            if start in state: continue
+            path, node = [], start
+            while node in edges and node not in state:
+                state[node] = start
+                path.append(node)
+                node = edges[node]
+            if node in path and state.get(node) == start:
+                cycles.append(path[path.index(node):])
+        return cycles
+
+    def analyze(self):
+        """Return deadlock cycles, the most contended monitors and deterministic tags."""
+        deadlocks = []
+        for cycle in self._find_cycles()[:MAX_REPORTED_DEADLOCKS]:
+            deadlocks.append([{"thread": self.thread_names.get(t, t), "waiting_for": self.waiting_for[t],
+                               "lock_class": self.lock_class.get(self.waiting_for[t]),
+                               "held_by": self.thread_names.get(self.lock_owner[self.waiting_for[t]])} for t in cycle])
+
+        waiter_counts = Counter(self.waiting_for.values())
+        contended = [{"lock": lock_id, "lock_class": self.lock_class.get(lock_id), "waiters": count,
+                      "owner": self.thread_names.get(self.lock_owner.get(lock_id)) if lock_id in self.lock_owner else None}
+                     for lock_id, count in waiter_counts.most_common(MAX_REPORTED_MONITORS)]
+
+        tags = []
+        if deadlocks: tags.append("Deadlock")
+        if contended and contended[0]["waiters"] >= CONTENTION_MIN_WAITERS: tags.append("ThreadContention")
+        if self.blocked_count >= BLOCKED_THREADS_MIN: tags.append("BlockedThreads")
+        return {"deadlocks": deadlocks, "contended_monitors": contended,
+                "blocked_thread_count": self.blocked_count, "tags": tags}
+
+
+def format_lock_findings(findings):
+    """Render lock graph findings as a short text block for prompts and reports."""
+    lines = [f"Deterministic lock analysis: {len(findings['deadlocks'])} deadlock(s), "
+             f"{findings['blocked_thread_count']} BLOCKED thread(s)."]
+    for i, cycle in enumerate(findings["deadlocks"], 1):
+        lines.append(f"Deadlock {i}:")
+        for edge in cycle:
+            lock_class = f" ({edge['lock_class']})" if edge.get("lock_class") else ""
+            lines.append(f'  "{edge["thread"]}" waits for <{edge["waiting_for"]}>{lock_class} held by "{edge["held_by"]}"')
+    contended = [m for m in findings["contended_monitors"] if m["waiters"] > 1]
+    if contended:
+        lines.append("Most contended monitors:")
+        for monitor in contended:
+            lock_class = f" ({monitor['lock_class']})" if monitor.get("lock_class") else ""
+            owner = f'held by "{monitor["owner"]}"' if monitor.get("owner") else "no owner in dump"
+            lines.append(f"  <{monitor['lock']}>{lock_class}: {monitor['waiters']} waiter(s), {owner}")
+    return "\n".join(lines)
@@ -5,31 +5,52 @@ import webbrowser
 import time
 import json
 import subprocess
-import glob
-from pathlib import Path
 import shutil
+import sqlite3
+from functools import partial
+from pathlib import Path
 import requests
+import psutil
 
 from PySide6.QtWidgets import (
     QWidget, QPushButton, QVBoxLayout, QHBoxLayout, QGridLayout,
     QFileDialog, QSpinBox, QLabel, QPlainTextEdit, QInputDialog,
-    QLineEdit, QComboBox, QMessageBox, QTextEdit, QProgressBar,
+    QLineEdit, QComboBox, QMessageBox, QTextEdit,
     QCheckBox, QGroupBox, QFormLayout, QDoubleSpinBox, QMenuBar,
-    QTabWidget, QApplication, QScrollArea, QSizePolicy
+    QTabWidget, QScrollArea, QSizePolicy,
+    QTableWidget, QTableWidgetItem, QHeaderView, QAbstractItemView, QProgressBar
 )
-from PySide6.QtCore import QProcess, QProcessEnvironment, QTimer, Qt, QUrl, QSettings
+from PySide6.QtCore import QProcess, QProcessEnvironment, QTimer, Qt, QUrl, QSettings, QThread
 from PySide6.QtGui import QDesktopServices, QAction, QGuiApplication
 
 # Import the refactored modules
 import config_handler
+import guard_ledger
+import ingest
+import input_index
+import incident_fingerprint
+from guard_watcher import GuardWatcher
+from guard_ledger_dialog import GuardLedgerDialog
+from ollama_health import OllamaHealthMonitor, STARTUP_TIMEOUT_SECONDS
+from background_task import BackgroundTask
+import analysis_cache
+import job_queue
+import job_scheduler
+import stage_checkpoint
+import stage_timing
+import tool_resolver
 from tool_manager import ToolManagerDialog
 from capture_dialog import LiveCaptureDialog
 
 PROJECT_ROOT = Path(__file__).resolve().parent
+JOB_TABLE_COLUMNS = ["File", "Type", "State", "Priority", "Progress", "Elapsed", "ETA", "Last Output"]
+# ETA estimates are calibrated from the stage timings of this many recent runs of the same type
+ETA_PROFILE_RUNS = 50
+# The console keeps only the newest lines; each run's full output is in <run folder>/console.log
+CONSOLE_MAX_BLOCKS = 20000
+CONSOLE_FLUSH_INTERVAL_MS = 100
+CONSOLE_LOG_NAME = "console.log"
 RESULTAT_DIR = PROJECT_ROOT / "Resultat"
-LEGACY_MAT_PATH = PROJECT_ROOT / "mat"
-TOOLS_MANIFEST_PATH = PROJECT_ROOT / "tools.json"
-TOOLS_DIR = PROJECT_ROOT / "tools"
 
 BUNDLED_OLLAMA_DIR = PROJECT_ROOT / "Ollama"
 BUNDLED_OLLAMA_EXE_PATH = BUNDLED_OLLAMA_DIR / ("ollama.exe" if sys.platform == "win32" else "ollama")
@@ -57,27 +78,47 @@ class MainWindow(QWidget):
         self.mat_report_definitions = []
         
         self.ollama_server_proc = None
-        self.analysis_proc = None
+        self.analysis_workers = []  # {"proc", "buffer", "job_id"}, one per concurrently running job
+        self.job_scheduler = job_scheduler.JobScheduler()
+        self.job_row_items = {}
+        self.job_progress = {}  # job_id -> latest progress event state and its progress bar
+        self.stage_timings = {}  # analysis type -> timings of its newest completed runs, newest first; None while being read
+        self.stage_profiles = {}  # analysis type -> stage_timing.stage_profile of those timings
+        self.background_tasks = set()  # BackgroundTask objects whose thread has not reported back yet
+        self.preparing_jobs = {}  # job_id -> BackgroundTask hashing or placing its input before it is submitted
+        self.job_elapsed_timer = QTimer(self)
+        self.job_console_logs = {}
+        self.console_buffer = []
+        self.console_flush_timer = QTimer(self)
+        self.console_flush_timer.setSingleShot(True)
+        self.console_flush_timer.timeout.connect(self._flush_console)
         self.dashboard_proc = None
         self.pull_model_proc = None
         
         self.ollama_available = False
-        self.health_check_timer = None 
-        
-        self.batch_queue = []
-        self.is_batch_running = False
-        self.current_batch_total_files = 0
-        self.current_batch_processed_files = 0
+        self.ollama_health = None
+        self.ollama_health_thread = None
+        self.pending_model_selection = None
         
-        self.guard_mode_timer = QTimer(self)
-        self.processed_in_guard_mode = set()
-        self.guard_mode_file_mod_times = {} 
+        self.guard_watcher = None
+        self.guard_thread = None
+        self.guard_ledger = None
+        self.input_index = None
         
         self.wireshark_task_checkboxes = {}
         
         self._init_ui() 
         self.load_settings_from_handler() 
         self._check_bundled_resources()
+        try: self.guard_ledger = guard_ledger.GuardLedger()
+        except sqlite3.Error as e: self.append_console(f"WARN: Guard Mode ledger unavailable ({e}); watched files will be re-analysed after a restart.")
+        try: self.job_scheduler = job_scheduler.JobScheduler(self.settings.get("scheduler_slots"), job_queue.JobQueue())
+        except sqlite3.Error as e: self.append_console(f"WARN: Job queue database unavailable ({e}); queued analyses will not survive a restart.")
+        try: self.input_index = input_index.InputIndex()
+        except sqlite3.Error as e: self.append_console(f"WARN: Input index unavailable ({e}); duplicate inputs will be analysed again.")
+        # Picks up runs finished or deleted while the application was closed; both scans of Resultat run off the GUI thread
+        self._run_in_background(self._on_run_indexes_synced, self._sync_run_indexes, self.input_index)
+        self._restore_queued_jobs()
 
     def _init_ui(self):
         main_layout = QVBoxLayout(self)
@@ -97,6 +138,7 @@ class MainWindow(QWidget):
         # Connect signals to slots
         self.run_btn.clicked.connect(self.on_select_and_run_analysis)
         self.analyze_batch_btn.clicked.connect(self.on_start_batch_analysis)
+        self.resume_run_btn.clicked.connect(self.on_resume_failed_run)
         self.pull_model_btn.clicked.connect(self.on_pull_model_clicked)
         self.prompt_selector_combo.currentIndexChanged.connect(self.on_prompt_selected)
         self.edit_current_prompt_btn.clicked.connect(self.on_edit_selected_prompt)
@@ -109,7 +151,14 @@ class MainWindow(QWidget):
         self.guard_folder_select_btn.clicked.connect(self.on_select_guard_folder)
         self.guard_enable_checkbox.toggled.connect(self.on_toggle_guard_mode)
         self.guard_interval_spinbox.valueChanged.connect(self.on_guard_interval_changed)
-        self.clear_console_btn.clicked.connect(self.console.clear)
+        self.guard_ledger_btn.clicked.connect(self.on_show_guard_ledger)
+        self.clear_console_btn.clicked.connect(self.on_clear_console)
+        self.clear_finished_jobs_btn.clicked.connect(self.on_clear_finished_jobs)
+        self.run_next_jobs_btn.clicked.connect(self.on_run_selected_jobs_next)
+        self.run_later_jobs_btn.clicked.connect(self.on_run_selected_jobs_later)
+        self.cancel_jobs_btn.clicked.connect(self.on_cancel_selected_jobs)
+        self.retry_jobs_btn.clicked.connect(self.on_retry_selected_jobs)
+        self.job_elapsed_timer.timeout.connect(self._refresh_job_rows)
 
     def _create_analysis_control_tab(self):
         # Use a scroll area so the UI remains usable on small screens.
@@ -123,15 +172,43 @@ class MainWindow(QWidget):
         analysis_label = QLabel("<b>1. Select Diagnostic File(s):</b>")
         self.run_btn = QPushButton("Analyze Single File...")
         self.analyze_batch_btn = QPushButton("Analyze Batch/Folder...")
+        self.resume_run_btn = QPushButton("Resume Failed Run...")
+        self.resume_run_btn.setToolTip("Re-run a failed analysis from its run folder, skipping the stages that already completed.")
         analysis_group_layout = QGridLayout() 
         analysis_group_layout.addWidget(analysis_label, 0, 0, 1, 2)
         analysis_group_layout.addWidget(self.run_btn, 1, 0)
         analysis_group_layout.addWidget(self.analyze_batch_btn, 1, 1)
-        self.batch_status_label = QLabel("Batch Status: Idle")
-        self.batch_progress_bar = QProgressBar()
-        self.batch_progress_bar.setVisible(False)
-        analysis_group_layout.addWidget(self.batch_status_label, 2,0)
-        analysis_group_layout.addWidget(self.batch_progress_bar, 2,1)
+        analysis_group_layout.addWidget(self.resume_run_btn, 1, 2)
+        self.batch_status_label = QLabel("Jobs: Idle")
+        self.clear_finished_jobs_btn = QPushButton("Clear Finished")
+        self.run_next_jobs_btn = QPushButton("Run Next")
+        self.run_next_jobs_btn.setToolTip("Start the selected queued jobs before all other queued jobs.")
+        self.run_later_jobs_btn = QPushButton("Run Later")
+        self.run_later_jobs_btn.setToolTip("Start the selected queued jobs after all other queued jobs.")
+        self.cancel_jobs_btn = QPushButton("Cancel")
+        self.cancel_jobs_btn.setToolTip("Remove the selected jobs from the queue; running analyses are stopped.")
+        self.retry_jobs_btn = QPushButton("Retry")
+        self.retry_jobs_btn.setToolTip("Queue the selected finished jobs again; runs with completed stages are resumed.")
+        self.force_reanalysis_checkbox = QCheckBox("Re-analyse duplicates")
+        self.force_reanalysis_checkbox.setToolTip("Analyse files again even when identical content was analysed before.\nOtherwise such files are linked to the earlier run.")
+        self.reuse_resolved_checkbox = QCheckBox("Reuse resolved look-alikes")
+        self.reuse_resolved_checkbox.setToolTip("When a run closely matches an incident marked resolved on the dashboard\n(same leak suspects, blocked stacks or top talkers), reuse that analysis instead of calling the LLM.")
+        self.job_table = QTableWidget(0, len(JOB_TABLE_COLUMNS))
+        self.job_table.setHorizontalHeaderLabels(JOB_TABLE_COLUMNS)
+        self.job_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.ResizeToContents)
+        self.job_table.horizontalHeader().setStretchLastSection(True)
+        self.job_table.verticalHeader().setVisible(False)
+        self.job_table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.job_table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.job_table.setSelectionMode(QAbstractItemView.SelectionMode.ExtendedSelection)
+        self.job_table.setMinimumHeight(140)
+        self.job_table.setVisible(False)
+        job_buttons_layout = QHBoxLayout()
+        for btn in (self.run_next_jobs_btn, self.run_later_jobs_btn, self.cancel_jobs_btn, self.retry_jobs_btn): job_buttons_layout.addWidget(btn)
+        job_buttons_layout.addStretch(); job_buttons_layout.addWidget(self.reuse_resolved_checkbox); job_buttons_layout.addWidget(self.force_reanalysis_checkbox); job_buttons_layout.addWidget(self.clear_finished_jobs_btn)
+        analysis_group_layout.addWidget(self.batch_status_label, 2, 0, 1, 3)
+        analysis_group_layout.addWidget(self.job_table, 3, 0, 1, 3)
+        analysis_group_layout.addLayout(job_buttons_layout, 4, 0, 1, 3)
         
         ollama_model_group_layout = QGridLayout()
         ollama_model_group_layout.addWidget(QLabel("<b>2. Configure Model & Prompts:</b>"), 0, 0, 1, 2)
@@ -147,6 +224,10 @@ class MainWindow(QWidget):
         ollama_model_group_layout.addWidget(QLabel("Pull Model:"), 2, 0)
         ollama_model_group_layout.addWidget(self.pull_model_name_input, 2, 1)
         ollama_model_group_layout.addWidget(self.pull_model_btn, 3, 1)
+        self.ollama_status_label = QLabel("Ollama: not started")
+        self.ollama_status_label.setToolTip("Live status from the Ollama API: response time and the models currently loaded in memory.")
+        self.ollama_status_label.setWordWrap(True)
+        ollama_model_group_layout.addWidget(self.ollama_status_label, 4, 0, 1, 2)
 
         prompt_label = QLabel("<b>Prompt Template:</b>")
         self.prompt_selector_combo = QComboBox()
@@ -220,10 +301,10 @@ class MainWindow(QWidget):
         self.guard_folder_input.setPlaceholderText("Enter folder path to monitor...")
         self.guard_folder_select_btn = QPushButton("Browse Folder...")
         self.guard_enable_checkbox = QCheckBox("Enable Guard Mode")
-        self.guard_interval_label = QLabel("Check Interval (min):")
+        self.guard_interval_label = QLabel("Full Rescan Interval (min):")
         self.guard_interval_spinbox = QSpinBox()
         self.guard_interval_spinbox.setRange(1, 1440)
-        self.guard_interval_spinbox.setToolTip("How often to check the folder (in minutes).")
+        self.guard_interval_spinbox.setToolTip("New files are picked up as they appear; the folder is also rescanned this often (in minutes) in case a change notification was missed.")
         self.guard_status_label = QLabel("Guard Mode: Inactive")
         guard_folder_layout = QHBoxLayout()
         guard_folder_layout.addWidget(QLabel("Folder to Watch:"))
@@ -234,6 +315,9 @@ class MainWindow(QWidget):
         guard_options_layout.addStretch()
         guard_options_layout.addWidget(self.guard_interval_label)
         guard_options_layout.addWidget(self.guard_interval_spinbox)
+        self.guard_ledger_btn = QPushButton("Processed Files...")
+        self.guard_ledger_btn.setToolTip("Show, retry or clear the files Guard Mode has already processed.")
+        guard_options_layout.addWidget(self.guard_ledger_btn)
         guard_mode_layout.addLayout(guard_folder_layout)
         guard_mode_layout.addLayout(guard_options_layout)
         guard_mode_layout.addWidget(self.guard_status_label)
@@ -253,6 +337,7 @@ class MainWindow(QWidget):
         console_header_layout.addWidget(self.clear_console_btn)
         self.console = QPlainTextEdit()
         self.console.setReadOnly(True)
+        self.console.setMaximumBlockCount(CONSOLE_MAX_BLOCKS)
         self.console.setStyleSheet("background-color: #2d2d2d; color: #f0f0f0; font-family: Consolas, 'Courier New', monospace;")
         self.console.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding)
         main_layout.addLayout(console_header_layout)
@@ -269,8 +354,17 @@ class MainWindow(QWidget):
         self.mat_memory_spinbox.setToolTip("Memory for MAT.")
         self.mat_report_type_combo = QComboBox()
         self.mat_report_type_combo.setToolTip("Select MAT report type.")
-        hprof_form_layout.addRow("MAT Memory (MB):", self.mat_memory_spinbox)
+        self.mat_memory_auto_checkbox = QCheckBox("Auto")
+        self.mat_memory_auto_checkbox.setToolTip("Size the MAT heap from the dump size and free memory, and wait for memory if other MAT runs are using it.")
+        self.mat_memory_auto_checkbox.toggled.connect(lambda checked: self.mat_memory_spinbox.setEnabled(not checked))
+        mat_memory_layout = QHBoxLayout()
+        mat_memory_layout.addWidget(self.mat_memory_spinbox)
+        mat_memory_layout.addWidget(self.mat_memory_auto_checkbox)
+        hprof_form_layout.addRow("MAT Memory (MB):", mat_memory_layout)
         hprof_form_layout.addRow("MAT Report Type:", self.mat_report_type_combo)
+        self.mat_all_reports_checkbox = QCheckBox("Also generate the other report types in the same MAT run")
+        self.mat_all_reports_checkbox.setToolTip("All reports share one parse and are cached, so switching report type later on the same dump is instant.")
+        hprof_form_layout.addRow("", self.mat_all_reports_checkbox)
         hprof_group.setLayout(hprof_form_layout)
         
         self.llm_params_group = QGroupBox("LLM Parameters (Advanced)")
@@ -380,69 +474,9 @@ class MainWindow(QWidget):
         self.trigger_analysis_for_file(pcap_path)
 
     def get_tool_launcher_path(self, tool_id):
-        if tool_id == "wireshark":
-            binary = "tshark.exe" if sys.platform == "win32" else "tshark"
-            current_platform = (
-                "win64" if sys.platform == "win32" else
-                "macos-aarch64" if sys.platform == "darwin" else
-                "linux-x86_64"
-            )
-
-            # Check any installed version in the tools directory
-            for path in TOOLS_DIR.glob(f"wireshark-*-{current_platform}"):
-                launcher_path = path / binary
-                if launcher_path.is_file():
-                    self.append_console(f"Using Wireshark installation found at: {launcher_path}")
-                    return str(launcher_path)
-                nested = next(path.rglob(binary), None)
-                if nested:
-                    self.append_console(f"Using Wireshark installation found at: {nested}")
-                    return str(nested)
-
-            # Fall back to the manifest-defined location
-            if TOOLS_MANIFEST_PATH.exists():
-                with open(TOOLS_MANIFEST_PATH, "r") as f:
-                    manifest = json.load(f)
-                for tool in manifest.get("tools", []):
-                    if tool.get("id") == "wireshark" and tool.get("platform") == current_platform:
-                        install_path = PROJECT_ROOT / tool.get("install_path")
-                        launcher_path = install_path / tool.get("launcher_relative_path")
-                        if launcher_path.is_file():
-                            self.append_console(f"Using managed Wireshark (tshark) found at: {launcher_path}")
-                            return str(launcher_path)
-                        nested = next(install_path.rglob(binary), None)
-                        if nested:
-                            self.append_console(f"Using managed Wireshark (tshark) found at: {nested}")
-                            return str(nested)
-
-            # Last resort: system PATH
-            tshark_path = shutil.which("tshark")
-            if tshark_path:
-                self.append_console(f"Using system tshark found at: {tshark_path}")
-                return tshark_path
-            return None
-
-        if tool_id == "mat":
-            legacy_plugins_path = LEGACY_MAT_PATH / "plugins"
-            if legacy_plugins_path.is_dir():
-                legacy_launchers = list(legacy_plugins_path.glob("org.eclipse.equinox.launcher_*.jar"))
-                if legacy_launchers:
-                    self.append_console(f"Using legacy MAT installation found at: {LEGACY_MAT_PATH}")
-                    return str(legacy_launchers[0])
-
-            if not TOOLS_MANIFEST_PATH.exists(): return None
-            with open(TOOLS_MANIFEST_PATH, "r") as f: manifest = json.load(f)
-            current_platform = "win64" if sys.platform == "win32" else "macos-aarch64" if sys.platform == "darwin" else "linux-x86_64"
-            for tool in manifest.get("tools", []):
-                if tool.get("id") == "mat" and tool.get("platform") == current_platform:
-                    install_path = PROJECT_ROOT / tool.get("install_path")
-                    if not install_path.is_dir(): continue
-                    launcher_pattern = str(install_path / tool.get("launcher_relative_path"))
-                    found_launchers = glob.glob(launcher_pattern)
-                    if found_launchers:
-                        self.append_console(f"Using managed MAT installation found at: {install_path}")
-                        return found_launchers[0]
-        return None
+        resolution = tool_resolver.resolve(tool_id)
+        if resolution.path and not resolution.cached: self.append_console(f"Using {resolution.source} found at: {resolution.path}")
+        return resolution.path
 
     def on_llm_params_group_toggled(self, checked):
         self.settings["llm_params_group_checked"] = checked
@@ -450,9 +484,10 @@ class MainWindow(QWidget):
     def _set_analysis_buttons_enabled(self, enabled_state):
         self.run_btn.setEnabled(enabled_state)
         self.analyze_batch_btn.setEnabled(enabled_state)
+        self.resume_run_btn.setEnabled(enabled_state)
         ollama_ready = self.ollama_available and (self.ollama_server_proc and self.ollama_server_proc.state() == QProcess.Running)
         can_toggle_guard = enabled_state and ollama_ready 
-        self.guard_enable_checkbox.setEnabled(can_toggle_guard and not self.is_batch_running)
+        self.guard_enable_checkbox.setEnabled(can_toggle_guard)
         self.pull_model_btn.setEnabled(ollama_ready and enabled_state) 
 
     def _check_bundled_resources(self):
@@ -469,9 +504,12 @@ class MainWindow(QWidget):
         """
         self.settings = config_handler.load_settings()
         self.append_console(f"Settings loaded from {config_handler.CONFIG_FILE_PATH}")
+        self.job_scheduler.slots = job_scheduler.normalise_slots(self.settings.get("scheduler_slots"))
         
         self.port_spin.setValue(self.settings["ollama_dashboard_port"])
         self.mat_memory_spinbox.setValue(self.settings["mat_memory_mb"])
+        self.mat_memory_auto_checkbox.setChecked(self.settings.get("mat_memory_auto", config_handler.DEFAULT_SETTINGS["mat_memory_auto"]))
+        self.reuse_resolved_checkbox.setChecked(self.settings.get("reuse_resolved_analyses", config_handler.DEFAULT_SETTINGS["reuse_resolved_analyses"]))
         
         self.current_prompts_list = self.settings["saved_prompts"][:]
         self._populate_prompt_selector()
@@ -488,6 +526,7 @@ class MainWindow(QWidget):
             self.mat_report_type_combo.setCurrentIndex(mat_report_idx)
         elif self.mat_report_type_combo.count() > 0:
             self.mat_report_type_combo.setCurrentIndex(0)
+        self.mat_all_reports_checkbox.setChecked(self.settings.get("mat_generate_all_reports", config_handler.DEFAULT_SETTINGS["mat_generate_all_reports"]))
         
         llm_params = self.settings.get("llm_parameters", config_handler.DEFAULT_SETTINGS["llm_parameters"].copy())
         self.llm_temp_spin.setValue(llm_params.get("temperature"))
@@ -522,6 +561,8 @@ class MainWindow(QWidget):
         self.settings["default_ollama_model"] = self.model_selector_combo.currentText()
         self.settings["ollama_dashboard_port"] = self.port_spin.value()
         self.settings["mat_memory_mb"] = self.mat_memory_spinbox.value()
+        self.settings["mat_memory_auto"] = self.mat_memory_auto_checkbox.isChecked()
+        self.settings["reuse_resolved_analyses"] = self.reuse_resolved_checkbox.isChecked()
         self.settings["saved_prompts"] = self.current_prompts_list
         
         current_prompt_name = self.prompt_selector_combo.currentText()
@@ -531,6 +572,7 @@ class MainWindow(QWidget):
         selected_mat_id = self.mat_report_type_combo.currentData()
         if selected_mat_id:
             self.settings["default_mat_report_type_id"] = selected_mat_id
+        self.settings["mat_generate_all_reports"] = self.mat_all_reports_checkbox.isChecked()
         
         self.settings["llm_parameters"] = {
             "temperature": self.llm_temp_spin.value(),
@@ -665,7 +707,7 @@ class MainWindow(QWidget):
     def dragEnterEvent(self, event): 
         if event.mimeData().hasUrls():
             for url in event.mimeData().urls():
-                if url.isLocalFile() and url.toLocalFile().lower().endswith((".hprof", ".txt", ".pcap", ".pcapng")):
+                if url.isLocalFile() and ingest.is_supported_input(url.toLocalFile()):
                     event.acceptProposedAction()
                     return
         event.ignore()
@@ -673,132 +715,153 @@ class MainWindow(QWidget):
     def dropEvent(self, event): 
         if event.mimeData().hasUrls():
             file_paths = [url.toLocalFile() for url in event.mimeData().urls() if url.isLocalFile()]
-            valid_files = [fp for fp in file_paths if fp.lower().endswith((".hprof", ".txt", ".pcap", ".pcapng"))]
+            valid_files = [fp for fp in file_paths if ingest.is_supported_input(fp)]
             
             if len(valid_files) == 1:
                 self.append_console(f"File dropped: {valid_files[0]}")
                 self.settings["last_hprof_dir"] = os.path.dirname(valid_files[0])
                 self.trigger_analysis_for_file(valid_files[0])
             elif len(valid_files) > 1:
-                self.append_console(f"{len(valid_files)} files dropped. Starting batch analysis.")
-                self.batch_queue = valid_files
-                self.current_batch_total_files = len(self.batch_queue)
-                self.current_batch_processed_files = 0
-                self.is_batch_running = True
-                self.batch_status_label.setText("Batch processing starting...")
-                self.batch_progress_bar.setMaximum(self.current_batch_total_files)
-                self.batch_progress_bar.setValue(0)
-                self.batch_progress_bar.setVisible(True)
-                self._set_analysis_buttons_enabled(False)
-                self.process_next_in_batch()
+                self.append_console(f"{len(valid_files)} files dropped. Queueing batch analysis.")
+                self._queue_analysis_files(valid_files)
             
             event.acceptProposedAction()
         else:
             event.ignore()
 
     def on_select_and_run_analysis(self):
-        if self.is_batch_running or (self.analysis_proc and self.analysis_proc.state() != QProcess.NotRunning):
-            QMessageBox.information(self, "Busy", "An analysis or batch process is already in progress.")
-            return
-            
         last_dir = self.settings.get("last_hprof_dir", str(PROJECT_ROOT))
         
-        file_path, _ = QFileDialog.getOpenFileName(self, "Select Diagnostic File", last_dir, "Diagnostic Files (*.hprof *.txt *.pcap *.pcapng);;All Files (*)")
+        file_path, _ = QFileDialog.getOpenFileName(self, "Select Diagnostic File", last_dir, f"{ingest.file_dialog_filter()};;All Files (*)")
         if file_path:
             self.settings["last_hprof_dir"] = os.path.dirname(file_path)
             self.trigger_analysis_for_file(file_path)
 
     def on_start_batch_analysis(self):
-        if self.is_batch_running or (self.analysis_proc and self.analysis_proc.state() != QProcess.NotRunning):
-            QMessageBox.information(self, "Busy", "An analysis or batch process is already in progress.")
-            return
-
         last_dir = self.settings.get("last_hprof_dir", str(PROJECT_ROOT))
         
-        dialog = QFileDialog(self, "Select Diagnostic Files for Batch Analysis", last_dir, "Diagnostic Files (*.hprof *.txt *.pcap *.pcapng)")
+        dialog = QFileDialog(self, "Select Diagnostic Files for Batch Analysis", last_dir, ingest.file_dialog_filter())
         dialog.setFileMode(QFileDialog.FileMode.ExistingFiles)
         
         if dialog.exec():
             selected_files = dialog.selectedFiles()
             if selected_files:
-                self.batch_queue = selected_files
-                self.current_batch_total_files = len(self.batch_queue)
-                self.current_batch_processed_files = 0
-                self.is_batch_running = True
-                self.batch_status_label.setText("Batch processing starting...")
-                self.batch_progress_bar.setMaximum(self.current_batch_total_files)
-                self.batch_progress_bar.setValue(0)
-                self.batch_progress_bar.setVisible(True)
-                self._set_analysis_buttons_enabled(False) 
-                self.append_console(f"Batch analysis started for {self.current_batch_total_files} file(s).")
-                self.process_next_in_batch()
-
-    def process_next_in_batch(self):
-        if not self.is_batch_running or not self.batch_queue:
-            completion_status = "Complete" if self.current_batch_total_files > 0 and self.current_batch_processed_files == self.current_batch_total_files else "Idle (or ended)"
-            self.batch_status_label.setText(f"Batch Status: {completion_status}")
-            self.batch_progress_bar.setVisible(False)
-            self.is_batch_running = False
-            self.current_batch_total_files = 0
-            self.current_batch_processed_files = 0
-            self._set_analysis_buttons_enabled(True) 
-            if self.batch_queue: self.append_console("Warning: Batch queue had remaining items but processing stopped.") 
-            self.batch_queue = [] 
-            return
-            
-        file_path = self.batch_queue.pop(0) 
-        self.batch_status_label.setText(f"Batch: Preparing {self.current_batch_processed_files + 1}/{self.current_batch_total_files}: {os.path.basename(file_path)}")
-        self.batch_progress_bar.setValue(self.current_batch_processed_files) 
-        self.settings["last_hprof_dir"] = os.path.dirname(file_path) 
-        self.trigger_analysis_for_file(file_path) 
-    
+                self.settings["last_hprof_dir"] = os.path.dirname(selected_files[0])
+                self.append_console(f"Batch analysis queued for {len(selected_files)} file(s).")
+                self._queue_analysis_files(selected_files)
+
     def trigger_analysis_for_file(self, source_file_path):
-        run_dir = ""
-        analysis_file = ""
+        self._queue_analysis_files([source_file_path])
+
+    def _queue_analysis_files(self, file_paths, origin=None):
+        """Adds files to the job scheduler; each is prepared and started once a slot of its type is free."""
+        for file_path in file_paths: self._add_job_row(self.job_scheduler.submit(file_path, origin=origin))
+        self._dispatch_analysis_jobs()
 
+    def _find_duplicate_run(self, content_hash, size):
+        """Name of an earlier completed run of identical input, unless re-analysis is forced."""
+        if self.input_index is None or self.force_reanalysis_checkbox.isChecked(): return None
+        try: return self.input_index.find(content_hash, size, RESULTAT_DIR)
+        except sqlite3.Error as e: self.append_console(f"WARN: Input index lookup failed: {e}"); return None
+
+    def _link_duplicate_job(self, job, duplicate_of):
+        job["duplicate_of"] = duplicate_of
+        self.append_console(f"'{os.path.basename(job['path'])}' is identical to the input of run '{duplicate_of}'; linked to its results instead of analysing it again.")
+
+    def _is_in_run_folder(self, file_path):
         try:
-            source_path = Path(source_file_path)
-            is_in_run_folder = source_path.parent.parent.resolve() == RESULTAT_DIR.resolve()
+            return Path(file_path).parent.parent.resolve() == RESULTAT_DIR.resolve()
         except Exception:
-            is_in_run_folder = False
+            return False
 
-        if is_in_run_folder:
-            self.append_console(f"File '{os.path.basename(source_file_path)}' is already in a run folder.")
-            run_dir = os.path.dirname(source_file_path)
-            analysis_file = source_file_path
-        else:
-            self.append_console(f"Creating new run folder for '{os.path.basename(source_file_path)}'.")
-            try:
-                base_name = os.path.splitext(os.path.basename(source_file_path))[0]
-                ts = time.strftime("%Y%m%d-%H%M%S")
-                run_name = f"{base_name}_{ts}"
-                run_dir = RESULTAT_DIR / run_name
-                run_dir.mkdir(parents=True, exist_ok=True)
-                
-                analysis_file = run_dir / os.path.basename(source_file_path)
-                shutil.copy(source_file_path, analysis_file)
-                self.append_console(f"Copied file to run folder: {analysis_file}")
-            except Exception as e:
-                QMessageBox.critical(self, "File Error", f"Could not create run folder or copy file: {e}")
-                self._analysis_ended_or_failed(); return
-        
-        lower_analysis_file = str(analysis_file).lower()
+    def _create_run_folder(self, job):
+        """Creates the run folder a job's input is placed into, or returns None if the job cannot run.
+
+        A file whose content was analysed before gets no folder; job["duplicate_of"] names the earlier run.
+        """
+        source_file_path = job["path"]
+        # Uncompressed inputs of an indexed size were hashed before the job started, so duplicates are never placed
+        known_hash = job.get("input_hash")
+        try: source_size = None if ingest.is_compressed(source_file_path) else os.path.getsize(source_file_path)
+        except OSError: source_size = None
+        duplicate_of = self._find_duplicate_run(known_hash, source_size) if known_hash and source_size is not None else None
+        if duplicate_of: self._link_duplicate_job(job, duplicate_of); return None
+        self.append_console(f"Creating new run folder for '{os.path.basename(source_file_path)}'.")
+        try:
+            base_name = os.path.splitext(ingest.split_compression(source_file_path)[0])[0]
+            ts = time.strftime("%Y%m%d-%H%M%S")
+            run_name = f"{base_name}_{ts}"
+            run_dir = RESULTAT_DIR / run_name
+            # Concurrent jobs for same-named files can start within the same second
+            suffix = 1
+            while run_dir.exists(): suffix += 1; run_dir = RESULTAT_DIR / f"{run_name}_{suffix}"
+            run_dir.mkdir(parents=True)
+        except Exception as e:
+            QMessageBox.critical(self, "File Error", f"Could not create run folder: {e}")
+            return None
+        return run_dir
+
+    def _place_job_input(self, job):
+        """Places a job's input into a new run folder off the GUI thread; the job is submitted once it is in place."""
+        run_dir = self._create_run_folder(job)
+        if run_dir is None: self._submit_analysis_job(job, None); return
+        # Linked, cloned or copied into the run folder (compressed dumps are decompressed), hashed in the same pass
+        strategy_key = "guard_mode_ingest_strategy" if job["origin"] == "guard" else "ingest_strategy"
+        strategy = self.settings.get(strategy_key, config_handler.DEFAULT_SETTINGS[strategy_key])
+        self.append_console(f"Placing '{os.path.basename(job['path'])}' into run folder '{run_dir.name}'...")
+        self.preparing_jobs[job["id"]] = self._run_in_background(partial(self._on_job_input_placed, job["id"], run_dir), self._timed_place_input, job["path"], run_dir, strategy, job.get("input_hash"))
+
+    @staticmethod
+    def _timed_place_input(source_file_path, run_dir, strategy, content_hash):
+        """Runs on a background thread: ingest.place_input's (path, hash, method) plus the seconds it took."""
+        ingest_started = time.perf_counter()
+        return ingest.place_input(source_file_path, run_dir, strategy, content_hash=content_hash) + (time.perf_counter() - ingest_started,)
+
+    def _on_job_input_placed(self, job_id, run_dir, task):
+        if self.preparing_jobs.get(job_id) is not task: return
+        del self.preparing_jobs[job_id]
+        job = self.job_scheduler.jobs.get(job_id)
+        # The move strategy may already have taken the file from its source folder, so the run folder is kept
+        if job is None or job["state"] != job_scheduler.STATE_RUNNING: self.append_console(f"Job {job_id} was cancelled while its input was placed; the input is left in '{run_dir}'."); return
+        if task.error is not None:
+            QMessageBox.critical(self, "File Error", f"Could not place file into run folder: {task.error}")
+            self._submit_analysis_job(job, None); return
+        analysis_file, input_hash, method, ingest_seconds = task.result
+        self.append_console(f"Input {method} into run folder in {ingest_seconds:.1f}s: {analysis_file}")
+        # Compressed inputs are only known by their decompressed content once placed
+        duplicate_of = self._find_duplicate_run(input_hash, os.path.getsize(analysis_file)) if ingest.is_compressed(job["path"]) else None
+        if duplicate_of: shutil.rmtree(run_dir, ignore_errors=True); self._link_duplicate_job(job, duplicate_of); self._submit_analysis_job(job, None); return
+        if job["origin"] == "guard" and self.guard_ledger: self.guard_ledger.update(job["path"], status=guard_ledger.STATUS_RUNNING, run_name=run_dir.name, content_hash=input_hash)
+        self._submit_analysis_job(job, self._build_monitor_args(analysis_file, run_dir, input_hash, ingest_seconds))
+        self._update_batch_status()
+
+    def _build_monitor_args(self, analysis_file, run_dir, input_hash=None, ingest_seconds=None):
+        """Builds the monitor.py arguments for an input in its run folder, or returns None if it cannot run."""
+        lower_analysis_file = ingest.split_compression(analysis_file)[0].lower()
         is_hprof = lower_analysis_file.endswith(".hprof")
         is_txt = lower_analysis_file.endswith(".txt")
         is_pcap = lower_analysis_file.endswith((".pcap", ".pcapng"))
         
         tool_launcher = None
         prompt_name = None
-        extra_args = []
+        extra_args = ["--input-hash", input_hash] if input_hash else []
+        if ingest_seconds is not None: extra_args += ["--ingest-seconds", f"{ingest_seconds:.3f}"]
+        if self.reuse_resolved_checkbox.isChecked(): extra_args.append("--reuse-resolved")
         
         if is_hprof:
             self.settings_tabs.setCurrentWidget(self.hprof_tab)
-            tool_launcher = self.get_tool_launcher_path("mat")
-            if not tool_launcher:
-                QMessageBox.warning(self, "MAT Not Found", "Eclipse MAT is required for HPROF analysis.\nPlease use the Tool Manager to install it.", QMessageBox.StandardButton.Ok)
-                self._analysis_ended_or_failed(); return
+            mat_report_args = self._selected_mat_report_args()
+            # The fast triage report is read in Python, so MAT is only needed for the other report types
+            needs_mat = any(arg != "triage" for arg in mat_report_args.split(","))
+            tool_launcher = self.get_tool_launcher_path("mat") if needs_mat else None
+            if needs_mat and not tool_launcher:
+                QMessageBox.warning(self, "MAT Not Found", "Eclipse MAT is required for HPROF analysis.\nPlease use the Tool Manager to install it, or select the Fast Triage report type.", QMessageBox.StandardButton.Ok)
+                return None
             prompt_name = "HPROF Comprehensive Analysis"
-            extra_args.extend(["--mat-memory", str(self.mat_memory_spinbox.value()), "--mat-report-arg", self.mat_report_type_combo.currentData(), "--mat-launcher-path", tool_launcher])
+            # 0 lets monitor.py size the heap from the dump and the machine's free memory
+            mat_memory = 0 if self.mat_memory_auto_checkbox.isChecked() else self.mat_memory_spinbox.value()
+            extra_args.extend(["--mat-memory", str(mat_memory), "--mat-report-arg", mat_report_args])
+            if tool_launcher: extra_args.extend(["--mat-launcher-path", tool_launcher])
         
         elif is_txt:
             self.settings_tabs.setCurrentWidget(self.hprof_tab)
@@ -809,30 +872,30 @@ class MainWindow(QWidget):
             tool_launcher = self.get_tool_launcher_path("wireshark")
             if not tool_launcher:
                 QMessageBox.warning(self, "Wireshark (tshark) Not Found", "Wireshark (tshark) is required for packet capture analysis.\nPlease use the Tool Manager to install it or ensure 'tshark' is in your system's PATH.", QMessageBox.StandardButton.Ok)
-                self._analysis_ended_or_failed(); return
+                return None
             prompt_name = "Wireshark Multi-Tool Analysis"
             
             selected_tasks = [task_id for task_id, cb in self.wireshark_task_checkboxes.items() if cb.isChecked()]
             if not selected_tasks:
                 QMessageBox.warning(self, "No Tasks Selected", "Please select at least one Wireshark analysis task to run.")
-                self._analysis_ended_or_failed(); return
+                return None
             extra_args.extend(["--tshark-path", tool_launcher, "--pcap-tasks", ",".join(selected_tasks)])
 
         else:
             QMessageBox.warning(self, "Unsupported File", f"The file type for '{os.path.basename(str(analysis_file))}' is not supported.");
-            self._analysis_ended_or_failed(); return
+            return None
 
         prompt_index = self.prompt_selector_combo.findText(prompt_name)
         if prompt_index == -1:
             QMessageBox.warning(self, "Prompt Not Found", f"The required '{prompt_name}' prompt is missing.")
-            self._analysis_ended_or_failed(); return
+            return None
         self.prompt_selector_combo.setCurrentIndex(prompt_index)
 
         ollama_ready = self.ollama_available and (self.ollama_server_proc and self.ollama_server_proc.state() == QProcess.Running)
-        if not ollama_ready: QMessageBox.warning(self, "Ollama Not Ready", "Ollama server not running or model not verified."); self._analysis_ended_or_failed(); return
+        if not ollama_ready: QMessageBox.warning(self, "Ollama Not Ready", "Ollama server not running or model not verified."); return None
         
         selected_model = self.model_selector_combo.currentText().strip()
-        if not selected_model: QMessageBox.warning(self, "Model Not Specified", "Select/enter Ollama model name."); self._analysis_ended_or_failed(); return
+        if not selected_model: QMessageBox.warning(self, "Model Not Specified", "Select/enter Ollama model name."); return None
         
         current_prompt_template = self.prompt_template_display.toPlainText().strip()
             
@@ -847,12 +910,7 @@ class MainWindow(QWidget):
         llm_params_json = json.dumps(llm_params_to_use)
 
         self.append_console(f"Running analysis on '{analysis_file}' in run dir '{run_dir}'")
-        if self.analysis_proc and self.analysis_proc.state() != QProcess.NotRunning: self.append_console("Terminating previous analysis..."); self.analysis_proc.kill(); self.analysis_proc.waitForFinished(5000)
-        if not self.is_batch_running: self._set_analysis_buttons_enabled(False)
-        
-        self.analysis_proc = QProcess(self); self.analysis_proc.setProgram(sys.executable) 
-        
-        direct_monitor_args = [ str(PROJECT_ROOT / "monitor.py"), 
+        direct_monitor_args = [
             "--prompt", current_prompt_template, "--model", selected_model,
             "--ollama-cmd", str(BUNDLED_OLLAMA_EXE_PATH),
             "--llm-params", llm_params_json,
@@ -861,25 +919,296 @@ class MainWindow(QWidget):
         ]
         
         direct_monitor_args.extend(extra_args)
-
-        self.append_console(f"Executing: {sys.executable} {' '.join(direct_monitor_args)}")
+        return direct_monitor_args
+
+    def on_resume_failed_run(self):
+        run_dir = QFileDialog.getExistingDirectory(self, "Select Run Folder to Resume", str(RESULTAT_DIR))
+        if not run_dir: return
+        if not stage_checkpoint.is_resumable(run_dir):
+            QMessageBox.warning(self, "Cannot Resume", "This run folder has no recorded stages. Analyze the file again instead."); return
+        if any(job["argv"] and run_dir in job["argv"] for job in self.job_scheduler.queued() + self.job_scheduler.running()):
+            QMessageBox.information(self, "Busy", "This run is already queued for resuming."); return
+        self.append_console(f"Resuming run '{os.path.basename(run_dir)}'; completed stages will be reused.")
+        input_file = (stage_checkpoint.load_args(run_dir) or {}).get("input_file") or run_dir
+        self._add_job_row(self.job_scheduler.submit(input_file, argv=["--resume", "--run-dir", run_dir]))
+        self._dispatch_analysis_jobs()
+
+    def _dispatch_analysis_jobs(self):
+        """Starts queued jobs, shortest first, while their slot pool has room; each running job gets its own worker."""
+        while (job := self.job_scheduler.next_runnable()):
+            self._update_job_row(job["id"])
+            job["duplicate_of"] = None; job.pop("input_hash", None)
+            # A file that may repeat an earlier run's input is hashed off the GUI thread first; the job starts once the hash is in
+            if self._needs_input_hash(job): self._hash_job_input(job); continue
+            self._start_analysis_job(job)
+        if self.job_scheduler.running() and not self.job_elapsed_timer.isActive(): self.job_elapsed_timer.start(1000)
+        self._update_batch_status()
+
+    def _start_analysis_job(self, job):
+        if job["argv"]: self._submit_analysis_job(job, job["argv"]); return
+        if self._is_in_run_folder(job["path"]):
+            self.append_console(f"File '{os.path.basename(job['path'])}' is already in a run folder.")
+            self._submit_analysis_job(job, self._build_monitor_args(job["path"], os.path.dirname(job["path"]))); return
+        self._place_job_input(job)
+
+    def _submit_analysis_job(self, job, monitor_args):
+        if monitor_args is None: self._on_analysis_job_done(job["id"], job_scheduler.STATE_DUPLICATE if job.get("duplicate_of") else job_scheduler.STATE_SKIPPED); return
+        # Recorded so a restart resumes the run folder instead of starting over
+        if job["argv"] is None: job["run_dir"] = monitor_args[monitor_args.index("--run-dir") + 1]; self.job_scheduler.save(job)
+        worker = self._acquire_analysis_worker()
+        if worker is None: self._on_analysis_job_done(job["id"], job_scheduler.STATE_FAILED); return
+        worker["job_id"] = job["id"]
+        self._open_job_console_log(job["id"], monitor_args)
+        self.append_console(f"Submitting {job['id']} to analysis worker (PID {worker['proc'].processId()}): monitor.py {' '.join(monitor_args)}")
+        worker["proc"].write((json.dumps({"id": job["id"], "argv": monitor_args}) + "\n").encode("utf-8"))
+
+    def _run_in_background(self, callback, function, *args):
+        """Calls function(*args) off the GUI thread; callback(task) then runs on the GUI thread with task.result or task.error."""
+        task = BackgroundTask(function, *args)
+        task.callback = callback
+        task.done.connect(self._on_background_task_done)
+        self.background_tasks.add(task); task.start()
+        return task
+
+    def _on_background_task_done(self, task):
+        self.background_tasks.discard(task)
+        task.callback(task)
+
+    @staticmethod
+    def _sync_run_indexes(input_idx):
+        """Runs on a background thread: brings the input and incident indexes up to date with Resultat. Returns console warnings."""
+        warnings = []
+        if input_idx is not None:
+            try: input_idx.sync(RESULTAT_DIR)
+            except sqlite3.Error as e: warnings.append(f"WARN: Input index sync failed ({e}); earlier runs may not be recognised as duplicates.")
+        # monitor.py adds the runs it completes to the incident index itself
+        try: incident_fingerprint.IncidentIndex().sync(RESULTAT_DIR)
+        except sqlite3.Error as e: warnings.append(f"WARN: Incident index unavailable ({e}); similar earlier incidents will not be found.")
+        return warnings
+
+    def _on_run_indexes_synced(self, task):
+        for warning in task.result if task.error is None else [f"WARN: Run index sync failed: {task.error}"]: self.append_console(warning)
+
+    def _needs_input_hash(self, job):
+        """Whether a file must be hashed before it is placed: uncompressed, new to Resultat and of a size the input index knows."""
+        if job["argv"] is not None or self.input_index is None or self.force_reanalysis_checkbox.isChecked(): return False
+        if ingest.is_compressed(job["path"]) or self._is_in_run_folder(job["path"]): return False
+        try: return self.input_index.has_size(os.path.getsize(job["path"]))
+        except (OSError, sqlite3.Error): return False
+
+    def _hash_job_input(self, job):
+        self.append_console(f"Hashing '{os.path.basename(job['path'])}' to look for an earlier run of the same input...")
+        self.preparing_jobs[job["id"]] = self._run_in_background(partial(self._on_job_input_hashed, job["id"]), analysis_cache.hash_file, job["path"])
+
+    def _on_job_input_hashed(self, job_id, task):
+        # A job cancelled (and perhaps retried) while hashing is left alone; a retry has its own task
+        if self.preparing_jobs.get(job_id) is not task: return
+        del self.preparing_jobs[job_id]
+        job = self.job_scheduler.jobs.get(job_id)
+        if job is None or job["state"] != job_scheduler.STATE_RUNNING: return
+        # An unreadable file is left to fail while it is placed
+        job["input_hash"] = task.result
+        self._start_analysis_job(job)
+        self._update_batch_status()
+
+    def _acquire_analysis_worker(self):
+        """Returns an idle worker, starting a new one when all are busy; idle workers keep their warm interpreter for later jobs."""
+        for worker in self.analysis_workers:
+            if worker["job_id"] is None and worker["proc"].state() == QProcess.Running: return worker
+        proc = QProcess(self); proc.setProgram(sys.executable)
+        worker = {"proc": proc, "buffer": b"", "job_id": None}
         env = QProcessEnvironment.systemEnvironment(); env.insert("OLLAMA_MODELS", str(BUNDLED_OLLAMA_MODELS_DIR))
-        self.analysis_proc.setProcessEnvironment(env); self.analysis_proc.setArguments(direct_monitor_args); self.analysis_proc.setWorkingDirectory(str(PROJECT_ROOT))
-        self.analysis_proc.setProcessChannelMode(QProcess.MergedChannels)
-        self.analysis_proc.readyReadStandardOutput.connect(self._on_analysis_output); self.analysis_proc.finished.connect(self._on_analysis_finished); self.analysis_proc.errorOccurred.connect(self._on_analysis_error)
-        self.analysis_proc.start()
-        if not self.analysis_proc.waitForStarted(5000): self.append_console(f"ERROR: Failed to start monitor.py: {self.analysis_proc.errorString()}"); self._analysis_ended_or_failed()
-        elif self.is_batch_running: self.current_batch_processed_files += 1 
-    
-    def _analysis_ended_or_failed(self): 
-        if self.is_batch_running:
-            if self.analysis_proc and not self.analysis_proc.waitForStarted(0) and \
-               self.current_batch_processed_files < self.current_batch_total_files : 
-                self.current_batch_processed_files +=1 
-                self.batch_progress_bar.setValue(self.current_batch_processed_files)
-            QTimer.singleShot(0, self.process_next_in_batch) 
-        else:
-            self._set_analysis_buttons_enabled(True)
+        proc.setProcessEnvironment(env); proc.setArguments([str(PROJECT_ROOT / "analysis_worker.py")]); proc.setWorkingDirectory(str(PROJECT_ROOT))
+        proc.readyReadStandardOutput.connect(partial(self._on_analysis_worker_events, worker)); proc.readyReadStandardError.connect(partial(self._on_analysis_output, worker))
+        proc.finished.connect(partial(self._on_analysis_worker_finished, worker)); proc.errorOccurred.connect(partial(self._on_analysis_error, worker))
+        proc.start()
+        if not proc.waitForStarted(5000): self.append_console(f"ERROR: Failed to start analysis worker: {proc.errorString()}"); return None
+        self.analysis_workers.append(worker)
+        return worker
+
+    def _shutdown_analysis_worker(self, worker, wait=False):
+        # Forget the job first so the worker's exit is not reported as a crash
+        worker["job_id"] = None
+        if worker in self.analysis_workers: self.analysis_workers.remove(worker)
+        if worker["proc"].state() == QProcess.NotRunning: return
+        worker["proc"].write(b'{"command": "shutdown"}\n')
+        # A worker still busy with a job is stopped with the MAT or tshark process it started, not orphaning them
+        if wait and not worker["proc"].waitForFinished(3000): self._kill_worker_children(worker); worker["proc"].kill(); worker["proc"].waitForFinished(3000)
+
+    def _on_analysis_job_done(self, job_id, state):
+        job = self.job_scheduler.finish(job_id, state)
+        if job is None: return
+        log_file = self.job_console_logs.pop(job_id, None)
+        if log_file: log_file.close()
+        # Job states double as ledger statuses (done/failed/skipped)
+        if job["origin"] == "guard" and self.guard_ledger: self.guard_ledger.update(job["path"], status=state, run_name=job.get("duplicate_of"))
+        if state == job_scheduler.STATE_DONE and job["run_dir"] and self.input_index:
+            try: self.input_index.add_run(job["run_dir"])
+            except sqlite3.Error as e: self.append_console(f"WARN: Could not index run '{os.path.basename(job['run_dir'])}': {e}")
+        # The next estimate for this type includes the run that just finished
+        progress = self.job_progress.get(job_id)
+        if state == job_scheduler.STATE_DONE and progress and job["run_dir"]: self._add_stage_timings(progress["analysis_type"], stage_timing.run_timings(job["run_dir"], progress["analysis_type"]))
+        self._update_job_row(job_id, f"Same input as run {job['duplicate_of']}" if job.get("duplicate_of") else None)
+        if self.job_scheduler.is_idle():
+            counts = self.job_scheduler.counts()
+            self.append_console(f"All queued analyses finished: {counts['done']} done, {counts['failed']} failed, {counts['skipped']} skipped, {counts['duplicate']} duplicate.")
+            # One warm worker is enough between batches
+            for worker in [w for w in self.analysis_workers if w["job_id"] is None][1:]: self._shutdown_analysis_worker(worker)
+        self._update_batch_status()
+        QTimer.singleShot(0, self._dispatch_analysis_jobs)
+
+    def _add_job_row(self, job):
+        row = self.job_table.rowCount(); self.job_table.insertRow(row)
+        for column, value in enumerate([os.path.basename(job["path"]), job["slot"]] + [""] * (len(JOB_TABLE_COLUMNS) - 2)): self.job_table.setItem(row, column, QTableWidgetItem(value))
+        self.job_table.item(row, 0).setToolTip(job["path"]); self.job_table.item(row, 0).setData(Qt.ItemDataRole.UserRole, job["id"])
+        self.job_row_items[job["id"]] = self.job_table.item(row, 0)
+        bar = QProgressBar(); bar.setRange(0, 100); bar.setValue(0); bar.setFormat("")
+        self.job_table.setCellWidget(row, 4, bar)
+        self.job_progress[job["id"]] = {"bar": bar, "analysis_type": None, "stage": None, "stage_started": None, "started_stages": [], "percent": None, "tokens": None}
+        self.job_table.setVisible(True)
+        self._update_job_row(job["id"])
+
+    def _update_job_row(self, job_id, last_line=None):
+        item = self.job_row_items.get(job_id); job = self.job_scheduler.jobs.get(job_id)
+        if item is None or job is None: return
+        row = item.row()
+        self.job_table.item(row, 2).setText(job["state"] + (f" (attempt {job['attempts'] + 1})" if job["attempts"] else ""))
+        self.job_table.item(row, 3).setText(str(job["priority"]))
+        self.job_table.item(row, 5).setText(f"{self.job_scheduler.elapsed_seconds(job_id):.0f}s" if job["started_at"] is not None else "")
+        if last_line is not None: self.job_table.item(row, 7).setText(last_line.strip()[:200])
+        self._update_job_progress(job_id)
+
+    def _on_job_progress(self, job_id, event):
+        progress = self.job_progress.get(job_id)
+        if progress is None: return
+        kind = event.get("kind")
+        if kind == "run": progress["analysis_type"] = event.get("analysis_type")
+        elif kind == "stage" and event.get("status") == "started":
+            progress.update(stage=event.get("stage"), stage_started=time.monotonic(), percent=None, tokens=None); progress["started_stages"].append(event.get("stage"))
+        elif kind == "stage": progress.update(stage=None, percent=None, tokens=None)
+        elif kind == "progress" and event.get("stage") == progress["stage"]:
+            progress["percent"] = event.get("percent", progress["percent"]); progress["tokens"] = event.get("tokens", progress["tokens"])
+        self._update_job_progress(job_id)
+
+    def _stage_profile(self, analysis_type):
+        """Typical stage durations for an analysis type; the newest runs' metadata is read once, in the background.
+
+        Returns None until that read has finished, which leaves the job on its measured percent meanwhile.
+        """
+        if analysis_type not in self.stage_timings:
+            self.stage_timings[analysis_type] = None
+            self._run_in_background(partial(self._on_stage_timings_loaded, analysis_type), stage_timing.recent_timings, RESULTAT_DIR, analysis_type, ETA_PROFILE_RUNS)
+        return self.stage_profiles.get(analysis_type)
+
+    def _on_stage_timings_loaded(self, analysis_type, task):
+        self.stage_timings[analysis_type] = task.result or []
+        self.stage_profiles[analysis_type] = stage_timing.stage_profile(self.stage_timings[analysis_type])
+
+    def _add_stage_timings(self, analysis_type, timings):
+        # Only once the history is loaded; a read still running sees the new run in Resultat itself
+        if not timings or self.stage_timings.get(analysis_type) is None: return
+        self.stage_timings[analysis_type] = ([timings] + self.stage_timings[analysis_type])[:ETA_PROFILE_RUNS]
+        self.stage_profiles[analysis_type] = stage_timing.stage_profile(self.stage_timings[analysis_type])
+
+    def _update_job_progress(self, job_id):
+        progress = self.job_progress.get(job_id); item = self.job_row_items.get(job_id); job = self.job_scheduler.jobs.get(job_id)
+        if progress is None or item is None or job is None: return
+        bar, eta_item = progress["bar"], self.job_table.item(item.row(), 6)
+        if job["state"] != job_scheduler.STATE_RUNNING:
+            bar.setRange(0, 100)
+            if job["state"] == job_scheduler.STATE_DONE: bar.setValue(100)
+            bar.setFormat(job["state"] if job["state"] != job_scheduler.STATE_QUEUED else ""); eta_item.setText(""); return
+        stage, percent = progress["stage"], progress["percent"]
+        stage_elapsed = time.monotonic() - progress["stage_started"] if progress["stage_started"] else 0.0
+        remaining = stage_timing.estimate_remaining_seconds(self._stage_profile(progress["analysis_type"]), stage, stage_elapsed, percent, progress["started_stages"]) if progress["analysis_type"] else None
+        label = stage or "starting"
+        if progress["tokens"]: label += f" \u00b7 {progress['tokens']} tokens"
+        if remaining is not None:
+            # Overall progress follows the calibrated estimate; the label names the current stage
+            elapsed = self.job_scheduler.elapsed_seconds(job_id)
+            bar.setRange(0, 100); bar.setValue(int(100 * elapsed / (elapsed + remaining)) if elapsed + remaining > 0 else 0)
+            eta_item.setText(f"~{remaining:.0f}s")
+        elif percent is not None: bar.setRange(0, 100); bar.setValue(int(percent)); eta_item.setText("")
+        else: bar.setRange(0, 0); eta_item.setText("")
+        bar.setFormat(f"{label} {percent:.0f}%" if percent is not None else label)
+
+    def _refresh_job_rows(self):
+        running = self.job_scheduler.running()
+        for job in running: self._update_job_row(job["id"])
+        if not running: self.job_elapsed_timer.stop()
+
+    def _update_batch_status(self):
+        counts = self.job_scheduler.counts()
+        if not self.job_scheduler.jobs: self.batch_status_label.setText("Jobs: Idle"); return
+        pools = ", ".join(f"{slot} {len(self.job_scheduler.running(slot))}/{size}" for slot, size in self.job_scheduler.slots.items())
+        self.batch_status_label.setText(f"Jobs: {counts['running']} running, {counts['queued']} queued, {counts['done']} done, {counts['duplicate']} duplicate, {counts['failed'] + counts['skipped'] + counts['cancelled']} failed/skipped/cancelled  (slots: {pools})")
+
+    def _restore_queued_jobs(self):
+        requeued, failed = self.job_scheduler.restore()
+        for job in requeued:
+            # A run folder with completed stages is resumed instead of starting over
+            if job["argv"] is None and job["run_dir"] and stage_checkpoint.is_resumable(job["run_dir"]):
+                job["argv"] = ["--resume", "--run-dir", job["run_dir"]]; self.job_scheduler.save(job)
+        for job in failed:
+            if job["origin"] == "guard" and self.guard_ledger: self.guard_ledger.update(job["path"], status=job["state"])
+        for job in requeued + failed: self._add_job_row(job)
+        if requeued: self.append_console(f"Restored {len(requeued)} queued analysis job(s) from the previous session; they start once Ollama is ready.")
+        if failed: self.append_console(f"{len(failed)} job(s) were interrupted {job_scheduler.MAX_ATTEMPTS} times and are marked failed: {', '.join(os.path.basename(j['path']) for j in failed)}")
+        self._update_batch_status()
+
+    def _selected_job_ids(self):
+        rows = sorted({index.row() for index in self.job_table.selectionModel().selectedRows()})
+        return [self.job_table.item(row, 0).data(Qt.ItemDataRole.UserRole) for row in rows]
+
+    def on_run_selected_jobs_next(self):
+        # Moved to the front in reverse so the selection keeps its order
+        for job_id in reversed(self._selected_job_ids()):
+            if self.job_scheduler.move_to_front(job_id): self._update_job_row(job_id)
+
+    def on_run_selected_jobs_later(self):
+        for job_id in self._selected_job_ids():
+            if self.job_scheduler.move_to_back(job_id): self._update_job_row(job_id)
+
+    def on_cancel_selected_jobs(self):
+        for job_id in self._selected_job_ids():
+            job = self.job_scheduler.jobs.get(job_id)
+            if job is None or job["state"] not in job_scheduler.ACTIVE_STATES: continue
+            worker = next((w for w in self.analysis_workers if w["job_id"] == job_id), None)
+            if worker: self._kill_analysis_worker(worker)
+            self.append_console(f"{job_id}: Cancelled.")
+            self._on_analysis_job_done(job_id, job_scheduler.STATE_CANCELLED)
+
+    def _kill_analysis_worker(self, worker):
+        """Stops a worker mid-analysis, including the MAT or tshark processes it started."""
+        worker["job_id"] = None
+        if worker in self.analysis_workers: self.analysis_workers.remove(worker)
+        self._kill_worker_children(worker)
+        worker["proc"].kill()
+
+    @staticmethod
+    def _kill_worker_children(worker):
+        # Listed before the worker dies; once it is gone its children are reparented and no longer found
+        try:
+            for child in psutil.Process(worker["proc"].processId()).children(recursive=True): child.kill()
+        except psutil.Error: pass
+
+    def on_retry_selected_jobs(self):
+        retried = 0
+        for job_id in self._selected_job_ids():
+            job = self.job_scheduler.jobs.get(job_id)
+            if job is None or job["state"] not in job_scheduler.FINISHED_STATES: continue
+            run_dir = job["run_dir"] or (job["argv"][job["argv"].index("--run-dir") + 1] if job["argv"] and "--run-dir" in job["argv"] else None)
+            resume_argv = ["--resume", "--run-dir", run_dir] if run_dir and stage_checkpoint.is_resumable(run_dir) else None
+            self.job_scheduler.retry(job_id, argv=resume_argv)
+            if job_id in self.job_progress: self.job_progress[job_id].update(analysis_type=None, stage=None, stage_started=None, started_stages=[], percent=None, tokens=None)
+            if job["origin"] == "guard" and self.guard_ledger: self.guard_ledger.update(job["path"], status=guard_ledger.STATUS_QUEUED)
+            self._update_job_row(job_id); retried += 1
+        if retried: self._dispatch_analysis_jobs()
+
+    def on_clear_finished_jobs(self):
+        for job_id in self.job_scheduler.clear_finished(): self.job_table.removeRow(self.job_row_items.pop(job_id).row()); self.job_progress.pop(job_id, None)
+        self.job_table.setVisible(self.job_table.rowCount() > 0)
+        self._update_batch_status()
 
     def start_bundled_ollama_server(self):
         if not self.ollama_available: self.append_console("Cannot start Ollama: resources missing."); return
@@ -895,45 +1224,56 @@ class MainWindow(QWidget):
             err_str = self.ollama_server_proc.errorString() if self.ollama_server_proc else "Process object is None"
             self.append_console(f"ERROR: Ollama server failed to start: {err_str}")
             self.ollama_server_proc = None; self._set_analysis_buttons_enabled(False); self.model_selector_combo.setEnabled(False); return
-        self.append_console("Ollama server initiated. Verifying models..."); self.health_check_attempts = 0
-        if not self.health_check_timer: self.health_check_timer = QTimer(self); self.health_check_timer.timeout.connect(self.check_ollama_server_health)
-        self.health_check_timer.start(3000)
-    def check_ollama_server_health(self):
-        self.health_check_attempts += 1; max_attempts = 15
-        if self.health_check_attempts > max_attempts: 
-            self.append_console(f"ERROR: Ollama health check timeout. Analysis disabled."); self.health_check_timer.stop()
-            self._set_analysis_buttons_enabled(False); self.model_selector_combo.setEnabled(False); return
-        self.append_console(f"Checking Ollama health ({self.health_check_attempts}/{max_attempts})...")
-        list_proc = QProcess(self); list_proc.setProgram(str(BUNDLED_OLLAMA_EXE_PATH)); list_proc.setArguments(["list"])
-        env = QProcessEnvironment.systemEnvironment(); env.insert("OLLAMA_MODELS", str(BUNDLED_OLLAMA_MODELS_DIR)); list_proc.setProcessEnvironment(env)
-        list_proc.start(); 
-        if not list_proc.waitForStarted(2000): self.append_console("Failed to start `ollama list`."); return
-        if not list_proc.waitForFinished(10000): self.append_console("`ollama list` timed out."); list_proc.kill(); return
-        out_bytes, err_bytes = list_proc.readAllStandardOutput(), list_proc.readAllStandardError()
-        try: out_str = out_bytes.data().decode('utf-8', errors='surrogateescape').lower()
-        except: out_str = out_bytes.data().decode(sys.stdout.encoding or 'utf-8', errors='replace').lower()
-        try: err_str = err_bytes.data().decode('utf-8', errors='surrogateescape').lower()
-        except: err_str = err_bytes.data().decode(sys.stderr.encoding or 'utf-8', errors='replace').lower()
-        if list_proc.exitCode() == 0:
-            model_names = [line.split()[0] for line in out_str.splitlines() if line and not line.startswith("name")]
-            current_sel = self.model_selector_combo.currentText(); self.model_selector_combo.clear()
-            if model_names: self.model_selector_combo.addItems(model_names); self.append_console(f"Available models: {', '.join(model_names)}")
-            else: self.append_console("No models found by `ollama list`.")
-            idx_current = self.model_selector_combo.findText(current_sel, Qt.MatchFlag.MatchFixedString | Qt.MatchFlag.MatchCaseSensitive)
-            idx_default = self.model_selector_combo.findText(self.settings.get("default_ollama_model",""), Qt.MatchFlag.MatchFixedString | Qt.MatchFlag.MatchCaseSensitive)
-            if idx_current != -1: self.model_selector_combo.setCurrentIndex(idx_current)
-            elif idx_default != -1: self.model_selector_combo.setCurrentIndex(idx_default)
-            elif self.model_selector_combo.count() > 0 : self.model_selector_combo.setCurrentIndex(0)
-            else: self.model_selector_combo.setCurrentText(current_sel if current_sel else config_handler.DEFAULT_SETTINGS["default_ollama_model"]) 
-            self.append_console("Ollama server responsive."); self.health_check_timer.stop(); 
-            self._set_analysis_buttons_enabled(True); self.model_selector_combo.setEnabled(True)
-            if self.settings.get("guard_mode_enabled", False) and self.guard_enable_checkbox.isEnabled() and not self.guard_mode_timer.isActive():
-                 self.append_console("Attempting to enable Guard Mode based on saved settings as Ollama is now ready.")
-                 if not self.guard_enable_checkbox.isChecked(): self.guard_enable_checkbox.setChecked(True) 
-                 else: self.on_toggle_guard_mode(True)
-        else: self.append_console(f"Health check: `ollama list` failed (Exit: {list_proc.exitCode()}).\nOut: {out_str}\nErr: {err_str}")
+        self.append_console("Ollama server initiated. Waiting for its API...")
+        self._start_ollama_health_monitor()
+    def _start_ollama_health_monitor(self):
+        if self.ollama_health is not None: return
+        # Probing runs on its own thread with backoff; results come back through signals
+        self.ollama_health = OllamaHealthMonitor()
+        self.ollama_health_thread = QThread()
+        self.ollama_health.moveToThread(self.ollama_health_thread)
+        self.ollama_health.statusChanged.connect(self._on_ollama_status)
+        self.ollama_health.modelsChanged.connect(self._on_ollama_models_changed)
+        self.ollama_health.ready.connect(self._on_ollama_ready)
+        self.ollama_health.failed.connect(self._on_ollama_health_failed)
+        self.ollama_health.finished.connect(self.ollama_health_thread.quit)
+        self.ollama_health_thread.started.connect(self.ollama_health.run)
+        self.ollama_health_thread.start()
+        self.ollama_status_label.setText("Ollama: starting...")
+    def _stop_ollama_health_monitor(self):
+        if self.ollama_health is None: return
+        self.ollama_health.stop(); self.ollama_health_thread.quit(); self.ollama_health_thread.wait(5000)
+        self.ollama_health = None; self.ollama_health_thread = None
+    def _on_ollama_status(self, status):
+        if not status["ok"]: self.ollama_status_label.setText(f"Ollama: not responding ({status['error']})"[:160]); return
+        loaded = ", ".join(status["loaded"]) or "none"
+        self.ollama_status_label.setText(f"Ollama: ready \u00b7 {status['latency_ms']:.0f} ms \u00b7 {len(status['models'])} model(s) \u00b7 loaded: {loaded}")
+    def _on_ollama_models_changed(self, model_names):
+        current_sel = self.pending_model_selection or self.model_selector_combo.currentText(); self.pending_model_selection = None
+        self.model_selector_combo.clear()
+        if model_names: self.model_selector_combo.addItems(model_names); self.append_console(f"Available models: {', '.join(model_names)}")
+        else: self.append_console("No models installed on the Ollama server.")
+        idx_current = self.model_selector_combo.findText(current_sel, Qt.MatchFlag.MatchFixedString | Qt.MatchFlag.MatchCaseSensitive)
+        idx_default = self.model_selector_combo.findText(self.settings.get("default_ollama_model",""), Qt.MatchFlag.MatchFixedString | Qt.MatchFlag.MatchCaseSensitive)
+        if idx_current != -1: self.model_selector_combo.setCurrentIndex(idx_current)
+        elif idx_default != -1: self.model_selector_combo.setCurrentIndex(idx_default)
+        elif self.model_selector_combo.count() > 0 : self.model_selector_combo.setCurrentIndex(0)
+        else: self.model_selector_combo.setCurrentText(current_sel if current_sel else config_handler.DEFAULT_SETTINGS["default_ollama_model"])
+    def _on_ollama_ready(self):
+        self.append_console("Ollama server responsive.")
+        self._set_analysis_buttons_enabled(True); self.model_selector_combo.setEnabled(True)
+        # Jobs restored from the previous session have been waiting for the server
+        self._dispatch_analysis_jobs()
+        if self.settings.get("guard_mode_enabled", False) and self.guard_enable_checkbox.isEnabled() and self.guard_watcher is None:
+             self.append_console("Attempting to enable Guard Mode based on saved settings as Ollama is now ready.")
+             if not self.guard_enable_checkbox.isChecked(): self.guard_enable_checkbox.setChecked(True) 
+             else: self.on_toggle_guard_mode(True)
+    def _on_ollama_health_failed(self, error):
+        self.append_console(f"ERROR: Ollama did not respond within {STARTUP_TIMEOUT_SECONDS}s ({error}). Analysis disabled.")
+        self.ollama_status_label.setText("Ollama: unavailable")
+        self._set_analysis_buttons_enabled(False); self.model_selector_combo.setEnabled(False)
     def stop_ollama_server(self):
-        if self.health_check_timer and self.health_check_timer.isActive(): self.health_check_timer.stop()
+        self._stop_ollama_health_monitor()
         if self.ollama_server_proc and self.ollama_server_proc.state() != QProcess.NotRunning:
             self.append_console("Stopping Ollama server..."); self.ollama_server_proc.kill() 
             if self.ollama_server_proc.waitForFinished(5000): self.append_console("Ollama server stopped.")
@@ -960,12 +1300,20 @@ class MainWindow(QWidget):
     def _on_ollama_server_finished(self, exit_code, exit_status):
         status = "normally" if exit_status == QProcess.NormalExit else "crashed"; self.append_console(f"Ollama server finished ({status}) code {exit_code}.")
         self._set_analysis_buttons_enabled(False); self.model_selector_combo.setEnabled(False)
-        if self.health_check_timer and self.health_check_timer.isActive(): self.health_check_timer.stop()
+        self._stop_ollama_health_monitor(); self.ollama_status_label.setText("Ollama: stopped")
     def _on_ollama_server_error_occurred(self, error):
         err_str = self.ollama_server_proc.errorString() if self.ollama_server_proc else "Process is None"
         self.append_console(f"ERROR Ollama server: {err_str} (Code: {error})")
         self._set_analysis_buttons_enabled(False); self.model_selector_combo.setEnabled(False)
-        if self.health_check_timer and self.health_check_timer.isActive(): self.health_check_timer.stop()
+        self._stop_ollama_health_monitor(); self.ollama_status_label.setText("Ollama: unavailable")
+
+    def _selected_mat_report_args(self):
+        # The selected report comes first; monitor.py treats it as the primary report
+        selected_id = self.mat_report_type_combo.currentData()
+        report_args = [d["mat_arg"] for d in self.mat_report_definitions if d["id"] == selected_id]
+        if self.mat_all_reports_checkbox.isChecked():
+            report_args += [d["mat_arg"] for d in self.mat_report_definitions if d["id"] != selected_id]
+        return ",".join(report_args) or selected_id
 
     def on_select_guard_folder(self):
         current_folder = self.settings.get("guard_mode_folder", "")
@@ -980,83 +1328,69 @@ class MainWindow(QWidget):
         if checked:
             if not current_folder_text or not os.path.isdir(current_folder_text): QMessageBox.warning(self, "Invalid Folder", "Select a valid folder for Guard Mode."); self.guard_enable_checkbox.setChecked(False); return
             if not self.ollama_available or (self.ollama_server_proc and self.ollama_server_proc.state() != QProcess.Running): QMessageBox.warning(self, "Ollama Not Ready", "Ollama server not running. Guard Mode cannot be enabled."); self.guard_enable_checkbox.setChecked(False); return
+            if self.guard_watcher is not None: return
             interval_minutes = self.guard_interval_spinbox.value()
-            if not self.guard_mode_timer.isActive(): 
-                try: self.guard_mode_timer.timeout.disconnect(self.scan_guard_folder) 
-                except RuntimeError: pass 
-                self.guard_mode_timer.timeout.connect(self.scan_guard_folder)
-            self.guard_mode_timer.start(interval_minutes * 60 * 1000) 
-            self.guard_status_label.setText(f"Guard Mode: Active - Watching '{os.path.basename(current_folder_text)}' every {interval_minutes} min(s).")
-            self.append_console(f"Guard Mode enabled: '{current_folder_text}', interval: {interval_minutes} min(s).")
-            self.guard_folder_input.setEnabled(False); self.guard_folder_select_btn.setEnabled(False); self.guard_interval_spinbox.setEnabled(False)
-            self.processed_in_guard_mode.clear(); self.guard_mode_file_mod_times.clear() 
-            QTimer.singleShot(1000, self.scan_guard_folder) 
+            # Watching and stability checks run on their own thread; ready files come back through fileReady
+            self.guard_watcher = GuardWatcher(current_folder_text, rescan_seconds=interval_minutes * 60, should_process=self.guard_ledger.should_process if self.guard_ledger else None)
+            self.guard_thread = QThread()
+            self.guard_watcher.moveToThread(self.guard_thread)
+            self.guard_watcher.fileReady.connect(self._on_guard_file_ready)
+            self.guard_watcher.message.connect(self.append_console); self.guard_watcher.error.connect(self.append_console)
+            self.guard_watcher.finished.connect(self.guard_thread.quit)
+            self.guard_thread.started.connect(self.guard_watcher.run)
+            self.guard_thread.start()
+            self.guard_status_label.setText(f"Guard Mode: Active - Watching '{os.path.basename(current_folder_text)}', full rescan every {interval_minutes} min(s).")
+            self.append_console(f"Guard Mode enabled: '{current_folder_text}', rescan interval: {interval_minutes} min(s).")
+            self.guard_folder_input.setEnabled(False); self.guard_folder_select_btn.setEnabled(False)
         else: 
-            self.guard_mode_timer.stop()
+            self._stop_guard_watcher()
             self.guard_status_label.setText("Guard Mode: Inactive"); self.append_console("Guard Mode disabled.")
-            self.guard_folder_input.setEnabled(True); self.guard_folder_select_btn.setEnabled(True); self.guard_interval_spinbox.setEnabled(True)
+            self.guard_folder_input.setEnabled(True); self.guard_folder_select_btn.setEnabled(True)
+
+    def _record_guard_files(self, file_paths):
+        if not self.guard_ledger: return
+        for filepath in file_paths:
+            try: stat = os.stat(filepath)
+            except OSError: continue
+            self.guard_ledger.record(filepath, stat.st_size, stat.st_mtime_ns)
+
+    def on_show_guard_ledger(self):
+        if not self.guard_ledger: QMessageBox.warning(self, "Ledger Unavailable", "The Guard Mode ledger could not be opened. See the console for details."); return
+        dialog = GuardLedgerDialog(self.guard_ledger, self)
+        dialog.retryRequested.connect(self._on_guard_ledger_retry)
+        dialog.entriesCleared.connect(self._on_guard_ledger_cleared)
+        dialog.exec()
+
+    def _on_guard_ledger_retry(self, file_paths):
+        self.append_console(f"Guard Mode: Retrying {len(file_paths)} file(s).")
+        self._record_guard_files(file_paths)
+        self._queue_analysis_files(file_paths, origin="guard")
+
+    def _on_guard_ledger_cleared(self, file_paths):
+        self.append_console(f"Guard Mode: Cleared {len(file_paths)} ledger entr{'y' if len(file_paths) == 1 else 'ies'}.")
+        if self.guard_watcher is not None:
+            for filepath in file_paths: self.guard_watcher.forget(filepath)
+
+    def _stop_guard_watcher(self):
+        if self.guard_watcher is None: return
+        self.guard_watcher.stop(); self.guard_thread.quit(); self.guard_thread.wait(5000)
+        self.guard_watcher = None; self.guard_thread = None
             
     def on_guard_interval_changed(self, new_interval_minutes):
         self.settings["guard_mode_interval_minutes"] = new_interval_minutes
-        if self.guard_enable_checkbox.isChecked() and self.guard_mode_timer.isActive():
-            self.guard_mode_timer.stop(); self.guard_mode_timer.start(new_interval_minutes * 60 * 1000)
-            self.append_console(f"Guard Mode: Interval updated to {new_interval_minutes} min(s).")
+        if self.guard_watcher is not None:
+            self.guard_watcher.rescan_seconds = new_interval_minutes * 60
+            self.append_console(f"Guard Mode: Rescan interval updated to {new_interval_minutes} min(s).")
             folder_name = os.path.basename(self.guard_folder_input.text().strip()) if self.guard_folder_input.text().strip() else "selected folder"
-            self.guard_status_label.setText(f"Guard Mode: Active - Interval {new_interval_minutes} min(s). Watching '{folder_name}'.")
+            self.guard_status_label.setText(f"Guard Mode: Active - Watching '{folder_name}', full rescan every {new_interval_minutes} min(s).")
 
-    def is_file_stable(self, filepath, stability_check_interval_sec=2, stability_checks=2):
-        try:
-            if not os.path.isfile(filepath): return False 
-            last_size = os.path.getsize(filepath); last_mtime = os.path.getmtime(filepath)
-            for i in range(stability_checks):
-                time.sleep(stability_check_interval_sec) 
-                if not os.path.isfile(filepath): return False 
-                current_size = os.path.getsize(filepath); current_mtime = os.path.getmtime(filepath)
-                if current_size != last_size or current_mtime != last_mtime : self.append_console(f"Guard Mode: File '{os.path.basename(filepath)}' unstable. Check {i+1}/{stability_checks}"); return False 
-                last_size, last_mtime = current_size, current_mtime
-            self.append_console(f"Guard Mode: File '{os.path.basename(filepath)}' appears stable (size: {last_size})."); return True
-        except FileNotFoundError: self.append_console(f"Guard Mode: File '{os.path.basename(filepath)}' FNF during stability check."); return False
-        except Exception as e: self.append_console(f"Guard Mode: Error checking file stability for '{os.path.basename(filepath)}': {e}"); return False
-
-    def scan_guard_folder(self): 
-        if not self.guard_enable_checkbox.isChecked(): self.guard_mode_timer.stop(); return
-        if self.is_batch_running or (self.analysis_proc and self.analysis_proc.state() != QProcess.NotRunning): self.append_console("Guard Mode: Analysis/Batch in progress, scan deferred."); return
-        folder_to_watch = self.guard_folder_input.text().strip()
-        if not folder_to_watch or not os.path.isdir(folder_to_watch): self.append_console("Guard Mode: Invalid folder, stopping guard."); self.guard_enable_checkbox.setChecked(False); return
-        self.append_console(f"Guard Mode: Scanning '{folder_to_watch}'...")
-        new_files_to_process = []
-        try:
-            for filename in os.listdir(folder_to_watch):
-                if filename.lower().endswith((".hprof", ".txt", ".pcap", ".pcapng")):
-                    filepath = os.path.join(folder_to_watch, filename)
-                    try:
-                        if not os.path.isfile(filepath): continue
-                        current_mod_time = os.path.getmtime(filepath)
-                        if (filepath not in self.guard_mode_file_mod_times or self.guard_mode_file_mod_times.get(filepath) != current_mod_time):
-                            if self.is_file_stable(filepath):
-                                self.append_console(f"Guard Mode: Adding stable file to queue: {filepath}")
-                                new_files_to_process.append(filepath)
-                    except FileNotFoundError: 
-                        if filepath in self.processed_in_guard_mode: self.processed_in_guard_mode.remove(filepath) 
-                        if filepath in self.guard_mode_file_mod_times: del self.guard_mode_file_mod_times[filepath]
-                        continue 
-        except Exception as e: self.append_console(f"Guard Mode: Error scanning folder '{folder_to_watch}': {e}"); return
-        if new_files_to_process:
-            self.append_console(f"Guard Mode: Adding {len(new_files_to_process)} file(s) to analysis queue.")
-            for fp in new_files_to_process: 
-                self.processed_in_guard_mode.add(fp) 
-                try:
-                    self.guard_mode_file_mod_times[fp] = os.path.getmtime(fp) if os.path.exists(fp) else 0
-                except FileNotFoundError:
-                    self.guard_mode_file_mod_times[fp] = 0
-            self.batch_queue.extend(new_files_to_process) 
-            if not self.is_batch_running: 
-                self.current_batch_total_files = len(self.batch_queue); self.current_batch_processed_files = 0; self.is_batch_running = True
-                self._set_analysis_buttons_enabled(False)
-                self.batch_progress_bar.setMaximum(self.current_batch_total_files); self.batch_progress_bar.setVisible(True)
-                self.process_next_in_batch()
-        else: self.append_console(f"Guard Mode: No new or modified files found requiring processing.")
-        self.guard_status_label.setText(f"Guard Mode: Last scan {time.strftime('%H:%M:%S')}. Watching '{os.path.basename(folder_to_watch)}'.")
+    def _on_guard_file_ready(self, filepath):
+        if self.guard_watcher is None: return
+        if self.job_scheduler.active_for_path(filepath): self.append_console(f"Guard Mode: '{os.path.basename(filepath)}' is already queued."); return
+        self.append_console(f"Guard Mode: Adding stable file to queue: {filepath}")
+        self._record_guard_files([filepath])
+        self._queue_analysis_files([filepath], origin="guard")
+        self.guard_status_label.setText(f"Guard Mode: Last file queued {time.strftime('%H:%M:%S')}: '{os.path.basename(filepath)}'.")
 
     def on_pull_model_clicked(self):
         model_name_to_pull = self.pull_model_name_input.text().strip()
@@ -1088,40 +1422,59 @@ class MainWindow(QWidget):
         model_name = self.pull_model_name_input.text().strip() 
         if exit_status == QProcess.NormalExit and exit_code == 0:
             self.append_console(f"Successfully pulled Ollama model: {model_name}. Refreshing list...")
-            if self.health_check_timer and self.health_check_timer.isActive(): self.health_check_timer.stop()
-            self.check_ollama_server_health() 
-            idx = self.model_selector_combo.findText(model_name, Qt.MatchFlag.MatchExactly | Qt.MatchFlag.MatchCaseSensitive)
-            if idx != -1: self.model_selector_combo.setCurrentIndex(idx)
+            # Selected once the monitor reports the new model list
+            self.pending_model_selection = model_name
+            if self.ollama_health is not None: self.ollama_health.refresh()
         else: self.append_console(f"Failed to pull Ollama model: {model_name}. Exit: {exit_code}, Status: {exit_status}")
         self._set_analysis_buttons_enabled(True); self.pull_model_name_input.clear(); self.pull_model_proc = None
 
-    def _on_analysis_output(self): 
-        if not self.analysis_proc: return
-        out_bytes = self.analysis_proc.readAllStandardOutput()
+    def _on_analysis_output(self, worker): 
+        out_bytes = worker["proc"].readAllStandardError()
         try: 
             console_encoding = sys.stdout.encoding or "utf-8"
             try: out_str = out_bytes.data().decode('utf-8', errors='surrogateescape')
             except UnicodeDecodeError: out_str = out_bytes.data().decode(console_encoding, errors='replace')
             for line in out_str.splitlines(): 
                 safe_line = line.encode(console_encoding, errors='replace').decode(console_encoding)
-                self.append_console(safe_line)
+                if worker["job_id"]: self._job_console_line(worker["job_id"], safe_line)
+                else: self.append_console(safe_line)
         except Exception as e: self.append_console(f"Error decoding analysis output: {e}")
-            
-    def _on_analysis_finished(self, exit_code, exit_status):
+
+    def _on_analysis_worker_events(self, worker):
+        worker["buffer"] += worker["proc"].readAllStandardOutput().data()
+        *lines, worker["buffer"] = worker["buffer"].split(b"\n")
+        console_encoding = sys.stdout.encoding or "utf-8"
+        for raw_line in lines:
+            try: event = json.loads(raw_line.decode("utf-8", errors="replace"))
+            except ValueError: self.append_console(raw_line.decode("utf-8", errors="replace")); continue
+            kind, job_id = event.get("event"), event.get("id")
+            if kind == "output":
+                line = event.get("line", "").encode(console_encoding, errors='replace').decode(console_encoding)
+                self._job_console_line(job_id, line); self._update_job_row(job_id, last_line=line)
+            elif kind == "progress": self._on_job_progress(job_id, event)
+            elif kind == "ready": self.append_console(f"Analysis worker ready (PID {event.get('pid')}).")
+            elif kind == "error": self.append_console(f"Analysis worker error: {event.get('message')}")
+            elif kind == "finished" and job_id == worker["job_id"]:
+                worker["job_id"] = None; exit_code = event.get("exit_code")
+                self.append_console(f"\n{job_id}: Analysis finished code {exit_code}")
+                self._on_analysis_job_done(job_id, job_scheduler.STATE_DONE if exit_code == 0 else job_scheduler.STATE_FAILED)
+
+    def _on_analysis_worker_finished(self, worker, exit_code, exit_status):
+        if worker in self.analysis_workers: self.analysis_workers.remove(worker)
+        job_id, worker["job_id"] = worker["job_id"], None
+        if job_id is None: return
+        # The worker died mid-job; the next submission starts a fresh one
         status = "normally" if exit_status == QProcess.NormalExit else "crashed"
-        self.append_console(f"\nAnalysis finished ({status}) code {exit_code}")
-        if self.is_batch_running:
-            if not self.batch_queue: self.append_console("Batch processing complete.")
-            QTimer.singleShot(100, self.process_next_in_batch) 
-        else: self._set_analysis_buttons_enabled(True)
+        self.append_console(f"Analysis worker exited ({status}) code {exit_code} during {job_id}.")
+        self._on_analysis_job_done(job_id, job_scheduler.STATE_FAILED)
             
-    def _on_analysis_error(self, error):
-        proc_error_string = self.analysis_proc.errorString() if self.analysis_proc else "N/A"
-        self.append_console(f"ERROR in analysis process execution (QProcess error type {error}): {proc_error_string}")
-        if self.is_batch_running:
-            self.append_console("Error during batch item. Moving to next file if any.")
-            QTimer.singleShot(100, self.process_next_in_batch) 
-        else: self._set_analysis_buttons_enabled(True)
+    def _on_analysis_error(self, worker, error):
+        if error == QProcess.ProcessError.Crashed: return  # reported by _on_analysis_worker_finished
+        self.append_console(f"ERROR in analysis worker execution (QProcess error type {error}): {worker['proc'].errorString()}")
+        if worker["proc"].state() == QProcess.NotRunning and worker in self.analysis_workers: self.analysis_workers.remove(worker)
+        job_id, worker["job_id"] = worker["job_id"], None
+        if job_id is None: return
+        self._on_analysis_job_done(job_id, job_scheduler.STATE_FAILED)
 
     def on_toggle_dashboard(self): 
         port = self.port_spin.value()
@@ -1166,15 +1519,39 @@ class MainWindow(QWidget):
         self.append_console(f"Attempted to open browser at {url_string}")
         
     def append_console(self, txt): 
-        self.console.appendPlainText(str(txt).rstrip('\r\n')); QApplication.processEvents()
+        # Lines are rendered in bulk by _flush_console so chatty tools cannot stall the event loop
+        self.console_buffer.append(str(txt).rstrip('\r\n'))
+        if not self.console_flush_timer.isActive(): self.console_flush_timer.start(CONSOLE_FLUSH_INTERVAL_MS)
+
+    def _flush_console(self):
+        if not self.console_buffer: return
+        lines, self.console_buffer = self.console_buffer[-CONSOLE_MAX_BLOCKS:], []
+        self.console.appendPlainText("\n".join(lines))
+
+    def on_clear_console(self):
+        self.console_buffer = []; self.console.clear()
+
+    def _open_job_console_log(self, job_id, monitor_args):
+        """Spills the job's complete output to console.log in its run folder (appended to on resume)."""
+        try:
+            run_dir = monitor_args[monitor_args.index("--run-dir") + 1]
+            self.job_console_logs[job_id] = open(os.path.join(run_dir, CONSOLE_LOG_NAME), "a", encoding="utf-8")
+        except (ValueError, IndexError, OSError) as e: self.append_console(f"WARN: No console log for {job_id}: {e}")
+
+    def _job_console_line(self, job_id, line):
+        self.append_console(f"[{job_id}] {line}")
+        log_file = self.job_console_logs.get(job_id)
+        if log_file: log_file.write(line + "\n")
         
     def closeEvent(self, event):
         self.append_console("Window closing. Saving settings & stopping processes...")
         self.save_settings_to_handler()
         # Persist window geometry so it can be restored on next launch
         self.app_settings.setValue("geometry", self.saveGeometry())
-        if self.guard_mode_timer.isActive(): self.guard_mode_timer.stop()
-        if self.analysis_proc and self.analysis_proc.state() != QProcess.NotRunning: self.analysis_proc.kill(); self.analysis_proc.waitForFinished(3000)
+        self._stop_guard_watcher()
+        self.job_elapsed_timer.stop()
+        for worker in list(self.analysis_workers): self._shutdown_analysis_worker(worker, wait=True)
+        for log_file in self.job_console_logs.values(): log_file.close()
         if self.dashboard_proc and self.dashboard_proc.state() != QProcess.NotRunning: self.dashboard_proc.kill(); self.dashboard_proc.waitForFinished(3000)
         if self.pull_model_proc and self.pull_model_proc.state() != QProcess.NotRunning: self.pull_model_proc.kill(); self.pull_model_proc.waitForFinished(3000)
         self.stop_ollama_server()
@@ -0,0 +1,128 @@
+# Filename: memory_admission.py
+import json
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import psutil
+
+import resource_monitor
+
+# Shared by every DumpBehandler process on the machine, whichever folder it runs from
+ADMISSION_DIR = Path(tempfile.gettempdir()) / "dumpbehandler_admission"
+RESERVATIONS_FILE = "reservations.json"
+LOCK_FILE = "reservations.lock"
+STALE_LOCK_SECONDS = 30
+
+MB = 1024 * 1024
+# MAT needs roughly the dump size in heap to parse it; reusing a cached index needs less
+MAT_HEAP_FACTOR = 1.25
+MAT_HEAP_FACTOR_INDEXED = 0.75
+MIN_MAT_HEAP_MB = 1024
+HEAP_ROUNDING_MB = 256
+# Memory left for the OS, Ollama and the GUI when sizing and admitting jobs
+SYSTEM_RESERVE_MB = 2048
+JVM_OVERHEAD_MB = 512
+
+
+def estimate_mat_heap_mb(hprof_size_bytes, index_cached=False):
+    """Return the -Xmx (MB) MAT should get for a dump of this size."""
+    factor = MAT_HEAP_FACTOR_INDEXED if index_cached else MAT_HEAP_FACTOR
+    wanted = max(MIN_MAT_HEAP_MB, int(hprof_size_bytes * factor / MB))
+    return -(-wanted // HEAP_ROUNDING_MB) * HEAP_ROUNDING_MB
+
+
+def choose_mat_heap_mb(hprof_path, index_cached=False, total_mb=None):
+    """Size -Xmx from the hprof size, capped so a single job never exceeds physical memory."""
+    total_mb = total_mb if total_mb is not None else psutil.virtual_memory().total // MB
+    ceiling = max(MIN_MAT_HEAP_MB, total_mb - SYSTEM_RESERVE_MB - JVM_OVERHEAD_MB)
+    ceiling -= ceiling % HEAP_ROUNDING_MB
+    return min(estimate_mat_heap_mb(os.path.getsize(hprof_path), index_cached), ceiling)
+
+
+@contextmanager
+def _locked(admission_dir):
+    # A lock file created with O_EXCL works on Windows and POSIX without extra dependencies
+    admission_dir.mkdir(parents=True, exist_ok=True)
+    lock_path = admission_dir / LOCK_FILE
+    while True:
+        try:
+            fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            break
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(lock_path) > STALE_LOCK_SECONDS: os.remove(lock_path)
+            except OSError:
+                pass
+            time.sleep(0.05)
+    try:
+        os.close(fd)
+        yield admission_dir / RESERVATIONS_FILE
+    finally:
+        try:
+            os.remove(lock_path)
+        except OSError:
+            pass
+
+
+def _read_reservations(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            reservations = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    # Reservations of processes that died without releasing are dropped
+    return {pid: r for pid, r in reservations.items() if psutil.pid_exists(int(pid))}
+
+
+def _write_reservations(path, reservations):
+    tmp_path = path.with_name(path.name + f".{os.getpid()}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(reservations, f)
+    os.replace(tmp_path, path)
+
+
+def _outstanding_mb(reservations, own_pid):
+    # A reservation only counts for the part its process has not allocated yet
+    return sum(max(0, r["mb"] - resource_monitor.process_tree_rss(int(pid)) // MB) for pid, r in reservations.items() if int(pid) != own_pid)
+
+
+def try_reserve(required_mb, label="", admission_dir=None):
+    """Record a reservation if enough memory is free. Returns True when admitted.
+
+    A job is always admitted when no other reservation exists, so a single oversized
+    job runs instead of waiting forever.
+    """
+    pid = os.getpid()
+    with _locked(admission_dir or ADMISSION_DIR) as path:
+        reservations = _read_reservations(path)
+        others = {p: r for p, r in reservations.items() if int(p) != pid}
+        free_mb = psutil.virtual_memory().available // MB - _outstanding_mb(others, pid)
+        if others and free_mb < required_mb + SYSTEM_RESERVE_MB:
+            _write_reservations(path, reservations)
+            return False
+        reservations[str(pid)] = {"mb": required_mb, "label": label, "since": time.time()}
+        _write_reservations(path, reservations)
+        return True
+
+
+def release(admission_dir=None):
+    with _locked(admission_dir or ADMISSION_DIR) as path:
+        reservations = _read_reservations(path)
+        reservations.pop(str(os.getpid()), None)
+        _write_reservations(path, reservations)
+
+
+@contextmanager
+def reserve_memory(required_mb, label="", poll_seconds=5.0, on_wait=None, admission_dir=None):
+    """Block until required_mb can be reserved machine-wide; yields the seconds spent waiting."""
+    started = time.time()
+    while not try_reserve(required_mb, label, admission_dir):
+        if on_wait: on_wait(time.time() - started)
+        time.sleep(poll_seconds)
+    try:
+        yield time.time() - started
+    finally:
+        release(admission_dir)
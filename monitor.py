@@ -10,8 +10,22 @@ import time
 from datetime import datetime, timezone
 import argparse
 import json 
+import sqlite3
 import traceback 
 import ollama_client 
+import analysis_cache
+import thread_dump_parser
+import lock_graph
+import hprof_triage
+import memory_admission
+import ingest
+import resource_monitor
+import stage_timing
+import stage_checkpoint
+import run_manifest
+import tool_resolver
+import progress_events
+import incident_fingerprint
 from bs4 import BeautifulSoup
 
 PROJECT_ROOT_MONITOR = os.path.dirname(os.path.abspath(__file__))
@@ -25,7 +39,17 @@ def log_monitor_error(msg):
     except OSError: pass
     with open(LOG_FILE_MONITOR, "a", encoding="utf-8") as f: f.write(f"[{datetime.now()}] {msg}\n{traceback.format_exc()}\n")
 
+# A persistent worker checks each model once per TTL instead of running `ollama list` for every job
+MODEL_CHECK_TTL_SECONDS = 300
+_model_check_cache = {}
+
 def check_ollama_model_availability(model_name, ollama_cmd_path, timeout=30):
+    cache_key = (model_name.lower(), ollama_cmd_path)
+    if time.monotonic() - _model_check_cache.get(cache_key, float("-inf")) < MODEL_CHECK_TTL_SECONDS: return True
+    if _check_ollama_model_uncached(model_name, ollama_cmd_path, timeout): _model_check_cache[cache_key] = time.monotonic(); return True
+    return False
+
+def _check_ollama_model_uncached(model_name, ollama_cmd_path, timeout):
     if not os.path.isfile(ollama_cmd_path): print(f"ERROR: Ollama cmd FNF: '{ollama_cmd_path}'.", flush=True); log_monitor_error(f"Ollama cmd FNF: '{ollama_cmd_path}'."); return False
     list_cmd = [ollama_cmd_path, "list"]; process = None
     try:
@@ -43,74 +67,138 @@ def check_ollama_model_availability(model_name, ollama_cmd_path, timeout=30):
         return False
     except Exception as e: print(f"Err in `ollama list`: {e}", flush=True); log_monitor_error(f"Err `ollama list` for {model_name}: {e}"); return False
 
+# Built-in report ids (see config_handler.DEFAULT_SETTINGS), so --mat-report-arg accepts ids or MAT args
+MAT_PARSE_ONLY = "org.eclipse.mat.api.parse"
+MAT_REPORT_IDS = {
+    "leak_suspects": "org.eclipse.mat.api:suspects",
+    "dominator_tree": "org.eclipse.mat.api:dominator_tree",
+    "top_consumers": "org.eclipse.mat.api:top_consumers_html",
+    "system_overview": MAT_PARSE_ONLY,
+    "triage": hprof_triage.TRIAGE_REPORT_ARG,
+}
+# MAT names report zips after the hprof; these suffixes identify which report a zip belongs to
+MAT_REPORT_ZIP_SUFFIXES = {"suspects": "_Leak_Suspects.zip", "dominator": "_dominator_tree.zip", "consumers": "_Top_Consumers.zip"}
+
+def resolve_mat_report_args(mat_report_argument):
+    """Splits a comma-separated --mat-report-arg into MAT report arguments, primary report first."""
+    report_args = [MAT_REPORT_IDS.get(arg.strip(), arg.strip()) for arg in (mat_report_argument or "").split(",") if arg.strip()]
+    return list(dict.fromkeys(report_args)) or [MAT_PARSE_ONLY]
+
+def mat_report_zip_suffix(report_arg):
+    return next((suffix for key, suffix in MAT_REPORT_ZIP_SUFFIXES.items() if key in report_arg.lower()), None)
+
 def generate_mat_report(hprof_path, current_run_dir, base_name, mat_jar_to_use, mat_memory_mb, mat_report_argument): 
     if not mat_jar_to_use or not os.path.isfile(mat_jar_to_use): raise ValueError(f"MAT_JAR invalid: '{mat_jar_to_use}'.")
     abs_hprof = os.path.abspath(hprof_path)
     
     # current_run_dir is already created by the GUI, so no need for os.makedirs
     
+    # Several reports can be produced by one JVM invocation, sharing a single parse
+    report_args = mat_report_argument if isinstance(mat_report_argument, list) else [mat_report_argument]
+    report_args = [arg for arg in report_args if arg and arg != MAT_PARSE_ONLY]
     cmd = [ "java", "--add-opens=java.base/java.lang=ALL-UNNAMED", "--add-exports=java.base/jdk.internal.org.objectweb.asm=ALL-UNNAMED",
-        f"-Xmx{mat_memory_mb}m", "-jar", mat_jar_to_use, "-consoleLog", "-application"]
-    if mat_report_argument and mat_report_argument != "org.eclipse.mat.api.parse":
-        cmd.extend(["org.eclipse.mat.api.parse", abs_hprof, mat_report_argument])
-    else: 
-        cmd.extend(["org.eclipse.mat.api.parse", abs_hprof])
-    log_monitor_error(f"MAT Command: {' '.join(cmd)}"); print(f"Generating MAT report with argument: {mat_report_argument}", flush=True)
+        f"-Xmx{mat_memory_mb}m", "-jar", mat_jar_to_use, "-consoleLog", "-application", MAT_PARSE_ONLY, abs_hprof, *report_args]
+    log_monitor_error(f"MAT Command: {' '.join(cmd)}"); print(f"Generating MAT report with argument(s): {', '.join(report_args) or MAT_PARSE_ONLY}", flush=True)
     
-    # MAT generates output in its CWD, so we run it from the run_dir to keep files contained
-    p = subprocess.Popen(cmd, cwd=current_run_dir, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, encoding="utf-8", errors="replace")
-    for line in p.stdout: print(line, end="", flush=True)
-    p.wait()
+    # Concurrent MAT runs (other GUI/Guard Mode jobs) queue here until the machine can hold this heap
+    announce_wait = lambda waited: print(f"Waiting for {mat_memory_mb} MB of free memory before starting MAT ({int(waited)}s)...", flush=True)
+    with memory_admission.reserve_memory(mat_memory_mb + memory_admission.JVM_OVERHEAD_MB, os.path.basename(hprof_path), on_wait=announce_wait) as waited_seconds:
+        # MAT generates output in its CWD, so we run it from the run_dir to keep files contained
+        p = subprocess.Popen(cmd, cwd=current_run_dir, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, encoding="utf-8", errors="replace")
+        sampler = resource_monitor.PeakRssSampler(p.pid).start()
+        for line in p.stdout: print(line, end="", flush=True)
+        p.wait()
+        peak_rss_mb = sampler.stop() // memory_admission.MB
     if p.returncode != 0: log_monitor_error(f"MAT fail {p.returncode} for {hprof_path} with arg {mat_report_argument}"); raise subprocess.CalledProcessError(p.returncode, cmd)
 
     # MAT files should now be in current_run_dir.
-    print("MAT process finished. Checking for output in run directory.")
+    print(f"MAT process finished (peak RSS {peak_rss_mb} MB). Checking for output in run directory.")
+    return {"admission_wait_seconds": round(waited_seconds, 1), "peak_rss_mb": peak_rss_mb}
+
+
+def generate_mat_reports_cached(hprof_path, current_run_dir, base_name, mat_jar_to_use, mat_memory_mb, report_args, hprof_hash):
+    """Runs MAT only for the index and reports not already cached for this hprof.
+
+    Returns (index_from_cache, cached_report_args, mat_run) where mat_run is None if MAT was skipped.
+    A mat_memory_mb of 0 sizes the heap from the dump and the machine's memory.
+    """
+    index_from_cache = analysis_cache.restore_mat_index(hprof_hash, mat_jar_to_use, hprof_path)
+    hprof_prefix = os.path.splitext(os.path.abspath(hprof_path))[0]
+    cached_report_args, pending_report_args = [], []
+    for report_arg in report_args:
+        if report_arg == MAT_PARSE_ONLY: continue
+        suffix = mat_report_zip_suffix(report_arg)
+        if suffix and analysis_cache.load_mat_report(hprof_hash, mat_jar_to_use, report_arg, hprof_prefix + suffix):
+            cached_report_args.append(report_arg)
+        else:
+            pending_report_args.append(report_arg)
+    if index_from_cache: print("Reusing cached MAT index for this heap dump.", flush=True)
+    if cached_report_args: print(f"Reusing cached MAT report(s): {', '.join(cached_report_args)}", flush=True)
+
+    mat_run = None
+    if pending_report_args or not index_from_cache:
+        heap_mb = mat_memory_mb or memory_admission.choose_mat_heap_mb(hprof_path, index_from_cache)
+        if not mat_memory_mb: print(f"Auto-sized MAT heap: {heap_mb} MB", flush=True)
+        mat_run = generate_mat_report(hprof_path, current_run_dir, base_name, mat_jar_to_use, heap_mb, pending_report_args)
+        mat_run["heap_mb"] = heap_mb
+        if analysis_cache.store_mat_index(hprof_hash, mat_jar_to_use, hprof_path): print("Stored MAT index in cache.", flush=True)
+        for report_arg in pending_report_args:
+            suffix = mat_report_zip_suffix(report_arg)
+            if suffix and os.path.isfile(hprof_prefix + suffix):
+                analysis_cache.store_mat_report(hprof_hash, mat_jar_to_use, report_arg, hprof_prefix + suffix)
+    else:
+        print("All requested MAT output was found in the cache; skipping MAT.", flush=True)
+    return index_from_cache, cached_report_args, mat_run
 
 
 def unzip_mat_zip(current_run_dir, base_name, mat_report_argument_used):
+    """Extracts the report zip for one MAT report argument into its own subfolder. Returns the folder or None."""
     zip_to_extract = None
     # MAT sometimes creates unpredictable zip names, so we find any relevant zip
-    if "suspects" in mat_report_argument_used.lower():
-        zip_pattern = "_Leak_Suspects.zip"
-    elif "dominator" in mat_report_argument_used.lower():
-        zip_pattern = "_dominator_tree.zip"
-    elif "consumers" in mat_report_argument_used.lower():
-        zip_pattern = "_Top_Consumers.zip"
-    else:
+    zip_pattern = mat_report_zip_suffix(mat_report_argument_used)
+    if not zip_pattern:
         print(f"Skipping unzip for MAT report type: {mat_report_argument_used}", flush=True)
-        return
+        return None
 
-    for f in os.listdir(current_run_dir):
-        if f.endswith(zip_pattern):
-            zip_to_extract = os.path.join(current_run_dir, f)
-            break
+    # MAT normally names the zip after the hprof; only list the folder when it did not
+    expected_zip = os.path.join(current_run_dir, base_name + zip_pattern)
+    if os.path.isfile(expected_zip): zip_to_extract = expected_zip
+    else: zip_to_extract = next((os.path.join(current_run_dir, f) for f in os.listdir(current_run_dir) if f.endswith(zip_pattern)), None)
             
     if zip_to_extract and os.path.isfile(zip_to_extract):
+        # Each report gets its own folder so several reports from one MAT run do not overwrite each other
+        extract_dir = os.path.splitext(zip_to_extract)[0]
         try:
-            with zipfile.ZipFile(zip_to_extract, "r") as z: z.extractall(current_run_dir)
+            with zipfile.ZipFile(zip_to_extract, "r") as z: z.extractall(extract_dir)
             print(f"Unzipped MAT report: {zip_to_extract}", flush=True)
             os.remove(zip_to_extract) # Clean up the zip file after extraction
+            return extract_dir
         except zipfile.BadZipFile: print(f"ERROR: Bad zip: {zip_to_extract}", flush=True); log_monitor_error(f"Bad MAT zip: {zip_to_extract}")
         except Exception as e: print(f"ERROR: Unzip fail {zip_to_extract}: {e}", flush=True); log_monitor_error(f"Unzip fail {zip_to_extract}: {e}")
     else: print(f"MAT report zip not found with pattern *{zip_pattern}", flush=True)
+    return None
+
+def _find_mat_index_html(report_or_run_dir):
+    # A report folder holds index.html directly; only runs without recorded report folders need a walk
+    direct = os.path.join(report_or_run_dir, "index.html")
+    if os.path.isfile(direct): return direct
+    return next((os.path.join(root, "index.html") for root, _, files in os.walk(report_or_run_dir) if "index.html" in files), None)
 
-def extract_mat_suspect_text(run_dir):
-    # Find index.html, which might be in a subdirectory after extraction
-    for root, _, files in os.walk(run_dir):
-        if "index.html" in files:
-            html_report_path = os.path.join(root, "index.html")
-            try:
-                with open(html_report_path, "r", encoding="utf-8", errors="ignore") as f:
-                    soup = BeautifulSoup(f.read(), "lxml")
-                header = soup.find(lambda tag: tag.name in ("h2", "h3") and "Problem Suspect" in tag.get_text())
-                if not header: return "Could not find 'Problem Suspect' section in the MAT report."
-                details_element = header.find_next_sibling("div", class_="details") or header.find_next_sibling("table")
-                if details_element: return details_element.get_text(separator='\n', strip=True)
-                return "Found 'Problem Suspect' header, but no details section followed it."
-            except Exception as e:
-                log_monitor_error(f"Failed to extract text from MAT HTML report: {html_report_path} - {e}"); return f"Error parsing MAT report HTML: {e}"
-
-    log_monitor_error(f"Could not find index.html in {run_dir} for summary extraction.")
+def extract_mat_suspect_text(report_or_run_dir):
+    html_report_path = _find_mat_index_html(report_or_run_dir)
+    if html_report_path:
+        try:
+            with open(html_report_path, "r", encoding="utf-8", errors="ignore") as f:
+                soup = BeautifulSoup(f.read(), "lxml")
+            header = soup.find(lambda tag: tag.name in ("h2", "h3") and "Problem Suspect" in tag.get_text())
+            if not header: return "Could not find 'Problem Suspect' section in the MAT report."
+            details_element = header.find_next_sibling("div", class_="details") or header.find_next_sibling("table")
+            if details_element: return details_element.get_text(separator='\n', strip=True)
+            return "Found 'Problem Suspect' header, but no details section followed it."
+        except Exception as e:
+            log_monitor_error(f"Failed to extract text from MAT HTML report: {html_report_path} - {e}"); return f"Error parsing MAT report HTML: {e}"
+
+    log_monitor_error(f"Could not find index.html in {report_or_run_dir} for summary extraction.")
     return "MAT report summary file (index.html) not found."
 
 
@@ -123,19 +211,74 @@ def extract_threads_file_content(threads_filepath):
     except Exception as e:
         log_monitor_error(f"Error reading content from {threads_filepath}: {e}"); return None
 
-def run_tshark_task(pcap_path, tshark_exe_path, task_id):
+RAW_DIAGNOSTIC_SUFFIX = "_diagnostic.txt"
+
+def write_raw_diagnostic(run_dir, base_name, text):
+    """Stores the diagnostic text given to the LLM in its own file; the analysis markdown only links to it."""
+    name = f"{base_name}{RAW_DIAGNOSTIC_SUFFIX}"
+    with open(os.path.join(run_dir, name), "w", encoding="utf-8") as f: f.write(text)
+    return name
+
+def format_diagnostic_references(references):
+    lines = [f"* {title}: [{name}]({name})" for title, name in references if name]
+    return "### Diagnostic Data:\n" + ("\n".join(lines) if lines else "Not available.") + "\n\n"
+
+def run_hprof_triage(hprof_path, run_dir, base_name, metadata):
+    """Runs the MAT-free HPROF reader and writes <base>_triage.json/.txt. Returns (report text, stack trace text)."""
+    print("Running fast HPROF triage (no MAT)...", flush=True)
+    started = time.time()
+    result = hprof_triage.analyze_hprof(hprof_path)
+    report_text = hprof_triage.format_triage_report(result)
+    json_name, txt_name = f"{base_name}_triage.json", f"{base_name}_triage.txt"
+    with open(os.path.join(run_dir, json_name), "w", encoding="utf-8") as f_json: json.dump(result, f_json, indent=2)
+    with open(os.path.join(run_dir, txt_name), "w", encoding="utf-8") as f_txt: f_txt.write(report_text)
+    metadata["hprof_triage"] = {"report_file": txt_name, "json_file": json_name, "seconds": round(time.time() - started, 2),
+                                "workers": result["workers"], "total_objects": result["total_objects"],
+                                "total_shallow_bytes": result["total_shallow_bytes"], "class_count": result["class_count"],
+                                "duplicate_string_wasted_bytes": result["duplicate_strings"]["wasted_bytes"]}
+    print(f"Triage finished in {metadata['hprof_triage']['seconds']}s using {result['workers']} worker(s).", flush=True)
+    return report_text, hprof_triage.render_stack_traces(result, thread_dump_parser.PROMPT_CHAR_BUDGET)
+
+def build_thread_dump_artifact(threads_filepath, run_dir, base_name, metadata):
+    """Parses a thread dump into <base>_threads.json and returns the compact text used for the prompt and report."""
+    json_name = f"{base_name}_threads.json"
+    grouper, lock_builder = thread_dump_parser.StackSignatureGrouper(), lock_graph.LockGraphBuilder()
+    try:
+        summary = thread_dump_parser.write_threads_json(threads_filepath, os.path.join(run_dir, json_name), observers=(grouper, lock_builder))
+    except Exception as e:
+        log_monitor_error(f"Error parsing thread dump {threads_filepath}: {e}"); return None
+    if not summary["thread_count"]:
+        # Unrecognised format: fall back to a bounded slice of the raw text
+        print(f"Warning: No threads recognised in {os.path.basename(threads_filepath)}; using raw text.", flush=True)
+        content = extract_threads_file_content(threads_filepath)
+        return content[:thread_dump_parser.PROMPT_CHAR_BUDGET] if content else content
+    # Threads parked on identical stacks are collapsed into one block each for the prompt
+    ranked_groups = grouper.ranked_groups()
+    compact_text = thread_dump_parser.render_stack_groups(ranked_groups)
+    # Deadlocks and contended monitors are found from the wait-for graph, not left to the LLM
+    lock_findings = lock_builder.analyze()
+    compact_text = f"{lock_graph.format_lock_findings(lock_findings)}\n\n{compact_text}"
+    summary["unique_stacks"] = len(grouper.groups)
+    metadata.update({"thread_dump_json": json_name, "thread_dump_summary": summary, "dominant_stacks": incident_fingerprint.dominant_stacks(ranked_groups),
+                     "lock_analysis": lock_findings, "deterministic_tags": lock_findings["tags"],
+                     "thread_dump_prompt_chars": {"raw": os.path.getsize(threads_filepath), "compact": len(compact_text)}})
+    print(f"Parsed {summary['thread_count']} threads ({summary['unique_stacks']} distinct stacks) into {json_name}.", flush=True)
+    return compact_text
+
+TSHARK_TASKS = {
+    "tcp_conv":   {"cmd": ["-q", "-z", "conv,tcp"], "title": "TCP Conversation Summary"},
+    "ip_conv":    {"cmd": ["-q", "-z", "conv,ip"], "title": "IP Conversation Summary"},
+    "dns_stats":  {"cmd": ["-q", "-z", "dns,tree"], "title": "DNS Statistics"},
+    "http_reqs":  {"cmd": ["-Y", "http.request", "-T", "fields", "-e", "http.host", "-e", "http.request.method", "-e", "http.request.uri"], "title": "HTTP Requests"},
+    "tls_alerts": {"cmd": ["-Y", "tls.alert_message", "-T", "fields", "-e", "frame.number", "-e", "ip.src", "-e", "ip.dst", "-e", "tls.alert_message.desc"], "title": "TLS/SSL Alerts"},
+    "slow_resps": {"cmd": ["-Y", "tcp.time_delta > 0.2", "-T", "fields", "-e", "frame.number", "-e", "ip.src", "-e", "ip.dst", "-e", "tcp.time_delta"], "title": "Slow TCP Responses (>200ms)"}
+}
+
+def _run_tshark_task(pcap_path, tshark_exe_path, task_id):
+    # Returns (output, succeeded) so callers can decide whether the output may be cached
     if not os.path.isfile(tshark_exe_path):
         raise FileNotFoundError(f"tshark executable not found at: {tshark_exe_path}")
 
-    TSHARK_TASKS = {
-        "tcp_conv":   {"cmd": ["-q", "-z", "conv,tcp"], "title": "TCP Conversation Summary"},
-        "ip_conv":    {"cmd": ["-q", "-z", "conv,ip"], "title": "IP Conversation Summary"},
-        "dns_stats":  {"cmd": ["-q", "-z", "dns,tree"], "title": "DNS Statistics"},
-        "http_reqs":  {"cmd": ["-Y", "http.request", "-T", "fields", "-e", "http.host", "-e", "http.request.method", "-e", "http.request.uri"], "title": "HTTP Requests"},
-        "tls_alerts": {"cmd": ["-Y", "tls.alert_message", "-T", "fields", "-e", "frame.number", "-e", "ip.src", "-e", "ip.dst", "-e", "tls.alert_message.desc"], "title": "TLS/SSL Alerts"},
-        "slow_resps": {"cmd": ["-Y", "tcp.time_delta > 0.2", "-T", "fields", "-e", "frame.number", "-e", "ip.src", "-e", "ip.dst", "-e", "tcp.time_delta"], "title": "Slow TCP Responses (>200ms)"}
-    }
-
     task = TSHARK_TASKS.get(task_id)
     if not task:
         raise ValueError(f"Unknown tshark task ID: {task_id}")
@@ -147,24 +290,44 @@ def run_tshark_task(pcap_path, tshark_exe_path, task_id):
     
     try:
         process = subprocess.run(full_cmd, capture_output=True, text=True, encoding="utf-8", errors="replace", check=True, timeout=120)
-        return f"--- {task['title']} ---\n{process.stdout}\n"
+        return f"--- {task['title']} ---\n{process.stdout}\n", True
     except subprocess.TimeoutExpired as e:
         error_output = f"--- {task['title']} (TIMED OUT) ---\n"
         error_output += f"tshark task timed out after 120 seconds.\n"
         log_monitor_error(error_output)
-        return error_output
+        return error_output, False
     except subprocess.CalledProcessError as e:
         error_output = f"--- {task['title']} (FAILED) ---\n"
         error_output += f"tshark failed with exit code {e.returncode}.\nStderr: {e.stderr}\n"
         log_monitor_error(error_output)
-        return error_output
+        return error_output, False
     except FileNotFoundError:
         log_monitor_error(f"tshark command failed. Is tshark installed and in the PATH or specified correctly?")
         raise
 
-def ask_ollama_model(prompt, model_tag, ollama_cmd_path_ignored, llm_params_dict, timeout=300):
+def run_tshark_task(pcap_path, tshark_exe_path, task_id):
+    return _run_tshark_task(pcap_path, tshark_exe_path, task_id)[0]
+
+def run_tshark_tasks_cached(pcap_path, tshark_exe_path, task_ids, pcap_hash, tshark_version, progress=None):
+    """Runs only the tshark tasks that have no cached output for this capture and tshark version."""
+    summaries, cached_task_ids = [], []
+    for done, task_id in enumerate(task_ids):
+        if progress: progress.update("tshark_tasks", percent=100.0 * done / len(task_ids), force=True)
+        summary = analysis_cache.load_tshark_task(pcap_hash, task_id, tshark_version)
+        if summary is not None:
+            print(f"Using cached tshark output for task '{task_id}' (tshark {tshark_version}).", flush=True)
+            cached_task_ids.append(task_id)
+        else:
+            summary, succeeded = _run_tshark_task(pcap_path, tshark_exe_path, task_id)
+            if succeeded: analysis_cache.store_tshark_task(pcap_hash, task_id, tshark_version, summary)
+        summaries.append(summary)
+    return summaries, cached_task_ids
+
+def ask_ollama_model(prompt, model_tag, ollama_cmd_path_ignored, llm_params_dict, timeout=300, progress=None):
     print(f"Contacting Ollama API via client with model '{model_tag}'...", flush=True)
-    text_response, _ = ollama_client.ollama_api_generate(model_tag=model_tag, prompt_text=prompt, llm_parameters=llm_params_dict, timeout=timeout)
+    # The reply is streamed only when someone is listening for token progress
+    on_token = (lambda tokens: progress.update("llm_call", tokens=tokens)) if progress and progress.sink else None
+    text_response, _ = ollama_client.ollama_api_generate(model_tag=model_tag, prompt_text=prompt, llm_parameters=llm_params_dict, timeout=timeout, on_token=on_token)
     if text_response: print("Ollama API interaction successful.")
     else: print("Ollama API interaction failed.")
     return text_response
@@ -175,40 +338,104 @@ def save_run_metadata(current_run_dir, metadata_dict):
         with open(metadata_path, "w", encoding="utf-8") as f: json.dump(metadata_dict, f, indent=4)
     except Exception as e: print(f"Error saving metadata: {e}", flush=True); log_monitor_error(f"Error saving metadata to {metadata_path}: {e}")
 
-def main(argv_to_parse=None):
+def build_arg_parser():
     parser = argparse.ArgumentParser(description="Analyze diagnostic files.")
-    parser.add_argument("input_file", help="Path to the diagnostic file (should be inside the run_dir).")
+    parser.add_argument("input_file", nargs="?", help="Path to the diagnostic file (should be inside the run_dir).")
     parser.add_argument("--run-dir", required=True, help="Path to the dedicated directory for this analysis run.")
     parser.add_argument("--prompt", help="LLM prompt template.")
-    parser.add_argument("--model", required=True, help="Ollama model tag.")
-    parser.add_argument("--ollama-cmd", required=True, help="Path to Ollama CLI.")
+    parser.add_argument("--model", help="Ollama model tag.")
+    parser.add_argument("--ollama-cmd", help="Path to Ollama CLI.")
     parser.add_argument("--llm-params", type=str, default="{}", help="JSON string of LLM parameters.")
-    parser.add_argument("--mat-memory", type=int, help="Memory for MAT in MB (HPROF only).")
+    parser.add_argument("--mat-memory", type=int, default=0, help="Memory for MAT in MB (HPROF only); 0 sizes it from the dump and free memory.")
     parser.add_argument("--mat-report-arg", help="MAT API argument for report type (HPROF only).")
-    parser.add_argument("--mat-launcher-path", help="Path to the MAT launcher JAR (HPROF only).")
-    parser.add_argument("--tshark-path", help="Path to tshark executable (pcap only).")
+    parser.add_argument("--mat-launcher-path", help="Path to the MAT launcher JAR (HPROF only); found in the tools folder when omitted.")
+    parser.add_argument("--tshark-path", help="Path to tshark executable (pcap only); found in the tools folder or PATH when omitted.")
     parser.add_argument("--pcap-tasks", help="Comma-separated list of tshark tasks to run (pcap only).")
-    args = parser.parse_args(argv_to_parse)
+    parser.add_argument("--input-hash", help="Content hash of the input computed while it was copied into the run dir; skips re-hashing.")
+    parser.add_argument("--ingest-seconds", type=float, help="Wall time the caller spent copying the input into the run dir, recorded as the ingest stage.")
+    parser.add_argument("--progress-fd", type=int, help="File descriptor to write JSON-lines progress events to (stage, percent, bytes, tokens).")
+    parser.add_argument("--reuse-resolved", action="store_true", help="When a resolved earlier run closely matches this incident, reuse its analysis instead of calling the LLM.")
+    parser.add_argument("--resume", action="store_true", help="Resume the run in --run-dir with its recorded arguments, skipping stages that completed. Arguments given alongside override the recorded ones.")
+    return parser
+
+def resolve_resume_args(parser, args):
+    """Merges the arguments recorded for args.run_dir with those given explicitly on this invocation."""
+    recorded = stage_checkpoint.load_args(args.run_dir)
+    if recorded is None: return None
+    overrides = {k: v for k, v in vars(args).items() if v != parser.get_default(k)}
+    return argparse.Namespace(**{**vars(args), **recorded, **overrides})
+
+# Metadata the user or the first invocation set, kept when a run is resumed
+RESUME_KEPT_METADATA = ("user_status", "user_notes", "input_compressed_file")
+
+def load_run_metadata(current_run_dir):
+    try:
+        with open(os.path.join(current_run_dir, "run_metadata.json"), "r", encoding="utf-8") as f: return json.load(f)
+    except (OSError, ValueError): return {}
+
+def run_analysis(argv_to_parse=None, progress_sink=None):
+    """Runs one analysis and returns its exit code, so a long-lived worker can call it per job.
 
-    input_file_lower = args.input_file.lower()
+    progress_sink, when given, receives progress_events dicts; --progress-fd does the same for standalone runs.
+    """
+    parser = build_arg_parser()
+    args = parser.parse_args(argv_to_parse)
+    if args.resume:
+        args = resolve_resume_args(parser, args)
+        if args is None: print("ERROR: Nothing to resume: the run folder has no recorded arguments.", file=sys.stderr); return 1
+    if not (args.input_file and args.model and args.ollama_cmd): parser.error("input_file, --model and --ollama-cmd are required unless resuming a recorded run")
+    if progress_sink is None and args.progress_fd is not None: progress_sink = progress_events.fd_sink(args.progress_fd)
+    progress = progress_events.ProgressReporter(progress_sink)
+    timer = stage_timing.StageTimer(progress=progress)
+    if args.ingest_seconds is not None: timer.record("ingest", args.ingest_seconds)
+
+    # Compressed inputs (.hprof.gz, .pcapng.zst, ...) are typed by the name inside the compression suffix
+    input_name, compression = ingest.split_compression(args.input_file)
+    input_file_lower = input_name.lower()
     is_hprof, is_txt, is_pcap = input_file_lower.endswith('.hprof'), input_file_lower.endswith('.txt'), input_file_lower.endswith(('.pcap', '.pcapng'))
     
     # The run directory is now passed as an argument
     run_dir = args.run_dir
     os.makedirs(run_dir, exist_ok=True) # Ensure it exists, though GUI should have created it
 
-    if is_hprof and not args.mat_launcher_path: print("ERROR: --mat-launcher-path is required for .hprof analysis.", file=sys.stderr); sys.exit(1)
-    if is_pcap and not args.tshark_path: print("ERROR: --tshark-path is required for pcap analysis.", file=sys.stderr); sys.exit(1)
+    # System load over the whole run, sampled in the background and written to the run folder in batches
+    metrics_sampler = resource_monitor.MetricsSampler(os.path.join(run_dir, resource_monitor.SYSTEM_METRICS_FILE)).start()
+    try: return analyse_in_run_dir(args, run_dir, progress, timer, compression, is_hprof, is_txt, is_pcap)
+    finally: metrics_sampler.stop()
+
+def analyse_in_run_dir(args, run_dir, progress, timer, compression, is_hprof, is_txt, is_pcap):
+    """The body of run_analysis once the run folder exists; returns the exit code."""
+    # Launchers not passed by the caller come from the shared resolver, which a persistent worker keeps cached between jobs
+    if is_hprof and not args.mat_launcher_path: args.mat_launcher_path = tool_resolver.resolve_path(tool_resolver.TOOL_MAT)
+    if is_pcap and not args.tshark_path: args.tshark_path = tool_resolver.resolve_path(tool_resolver.TOOL_WIRESHARK)
+    if is_hprof and not args.mat_launcher_path and any(arg != hprof_triage.TRIAGE_REPORT_ARG for arg in resolve_mat_report_args(args.mat_report_arg)):
+        print("ERROR: --mat-launcher-path is required for .hprof analysis with MAT reports (no MAT installation found).", file=sys.stderr); return 1
+    if is_pcap and not args.tshark_path: print("ERROR: --tshark-path is required for pcap analysis (no tshark found).", file=sys.stderr); return 1
 
     try: llm_parameters = json.loads(args.llm_params)
     except (json.JSONDecodeError, ValueError) as e: print(f"ERROR: Invalid JSON for --llm-params: {e}", flush=True); llm_parameters = {}
 
     log_monitor_error(f"Monitor run. CWD:{os.getcwd()}. Args:{args}")
+    try: input_bytes = os.path.getsize(args.input_file)
+    except OSError: input_bytes = None
+    progress.run_started("hprof" if is_hprof else "threaddump" if is_txt else "pcap" if is_pcap else "unknown", input_bytes)
     
-    if not check_ollama_model_availability(args.model, args.ollama_cmd): print(f"Model '{args.model}' unavailable. Aborting.", flush=True); sys.exit(1)
-    if not os.path.isfile(args.input_file): print(f"Input file not found: '{args.input_file}'.", flush=True); log_monitor_error(f"Input file FNF: {args.input_file}"); sys.exit(1)
+    if not check_ollama_model_availability(args.model, args.ollama_cmd): print(f"Model '{args.model}' unavailable. Aborting.", flush=True); return 1
+    if not os.path.isfile(args.input_file): print(f"Input file not found: '{args.input_file}'.", flush=True); log_monitor_error(f"Input file FNF: {args.input_file}"); return 1
+    compressed_input_name = None
+    if compression:
+        compressed_input_name = os.path.basename(args.input_file)
+        print(f"Decompressing '{compressed_input_name}' into the run folder...", flush=True)
+        try:
+            with timer.stage("ingest"): decompressed_path, args.input_hash = ingest.ingest_file(args.input_file, run_dir, progress=progress.bytes_callback("ingest"))
+            args.input_file = str(decompressed_path)
+        except (ingest.IngestError, OSError) as e:
+            print(f"Failed to decompress input: {e}", flush=True); log_monitor_error(f"Decompress fail {args.input_file}: {e}"); return 1
 
     base_name = os.path.splitext(os.path.basename(args.input_file))[0]
+    # Recorded after decompression, so a resume starts from the file already in the run folder
+    stage_checkpoint.save_args(run_dir, vars(args))
+    previous_metadata = load_run_metadata(run_dir) if args.resume else {}
     
     metadata = { 
         "input_file": os.path.basename(args.input_file),
@@ -219,62 +446,169 @@ def main(argv_to_parse=None):
         "mat_report_arg_used": args.mat_report_arg if is_hprof else "N/A", 
         "prompt_template_used": args.prompt or "Default", "llm_parameters_used": llm_parameters, 
         "status": "started", "user_status": "pending",
-        "llm_generated_tags": []
+        "llm_generated_tags": [],
+        # Filled in as stages finish, so failed runs keep the timings of the stages they reached
+        "timings": timer.stages
     }
+    metadata.update({k: previous_metadata[k] for k in RESUME_KEPT_METADATA if k in previous_metadata})
+    if args.resume: metadata["resumed_from_status"] = previous_metadata.get("status", "unknown")
+    if compressed_input_name: metadata["input_compressed_file"] = compressed_input_name
+    if args.input_hash: metadata["input_content_hash"] = args.input_hash
+    metadata["system_metrics_file"] = resource_monitor.SYSTEM_METRICS_FILE
+    # With the content hash, lets input_index recognise the same dump submitted again
+    try: metadata["input_size_bytes"] = os.path.getsize(args.input_file)
+    except OSError: pass
+    checkpoints = stage_checkpoint.StageCheckpoints(run_dir, metadata, resume=args.resume)
+    # Artifacts of reused stages stay listed when resuming; a fresh run starts a new manifest
+    manifest = (run_manifest.RunManifest.load(run_dir) if args.resume else None) or run_manifest.RunManifest(run_dir)
+    manifest.add(run_manifest.ROLE_INPUT, os.path.abspath(args.input_file), content_hash=args.input_hash)
+    def record_threads_json():
+        if metadata.get("thread_dump_json"): manifest.add(run_manifest.ROLE_THREADS_JSON, metadata["thread_dump_json"])
     save_run_metadata(run_dir, metadata)
 
-    mat_summary, thread_dump, tshark_summary, md_content_header = "N/A", "N/A", "N/A", ""
+    mat_summary, thread_dump, tshark_summary, diagnostic_refs = "N/A", "N/A", "N/A", []
+    def record_raw_diagnostic(text):
+        name = write_raw_diagnostic(run_dir, base_name, text)
+        manifest.add(run_manifest.ROLE_RAW_DIAGNOSTIC, os.path.abspath(os.path.join(run_dir, name))); return name
 
     if is_hprof:
         print("--- Starting HPROF Analysis ---")
         try: 
-            generate_mat_report(args.input_file, run_dir, base_name, args.mat_launcher_path, args.mat_memory, args.mat_report_arg)
-            unzip_mat_zip(run_dir, base_name, args.mat_report_arg)
-            
-            # Find the .threads file which might be in a subdirectory after unzipping
-            threads_path = next((os.path.join(root, f) for root, _, files in os.walk(run_dir) for f in files if f.lower().endswith((".threads", "_threads.txt"))), None)
-
-            if threads_path:
-                thread_dump = extract_threads_file_content(threads_path)
-            else:
-                print("Warning: No .threads file found in the MAT output.")
-
-            mat_summary = extract_mat_suspect_text(run_dir)
-            md_content_header = f"### Thread Dump Details from HPROF:\n```text\n{thread_dump or 'Not available.'}\n```\n\n"
+            report_args = resolve_mat_report_args(args.mat_report_arg)
+            mat_report_args = [arg for arg in report_args if arg != hprof_triage.TRIAGE_REPORT_ARG]
+            metadata["mat_report_args_used"] = report_args
+            triage_text, triage_traces = None, None
+            if hprof_triage.TRIAGE_REPORT_ARG in report_args:
+                def triage_stage():
+                    with timer.stage("hprof_triage"): triage_result = run_hprof_triage(args.input_file, run_dir, base_name, metadata)
+                    manifest.add(run_manifest.ROLE_TRIAGE_REPORT, metadata["hprof_triage"]["report_file"])
+                    manifest.add(run_manifest.ROLE_TRIAGE_JSON, metadata["hprof_triage"]["json_file"])
+                    return triage_result
+                triage_text, triage_traces = checkpoints.run("hprof_triage", triage_stage)
+
+            if mat_report_args:
+                def mat_stage():
+                    with timer.stage("input_hash"): hprof_hash = args.input_hash or analysis_cache.hash_file(args.input_file, progress=progress.bytes_callback("input_hash", input_bytes))
+                    metadata["input_content_hash"] = hprof_hash
+                    with timer.stage("mat_parse"):
+                        index_from_cache, cached_report_args, mat_run = generate_mat_reports_cached(args.input_file, run_dir, base_name, args.mat_launcher_path, args.mat_memory, mat_report_args, hprof_hash)
+                    with timer.stage("mat_unzip"): report_dirs = {arg: unzip_mat_zip(run_dir, base_name, arg) for arg in mat_report_args}
+                    report_dirs = {arg: os.path.relpath(d, run_dir).replace("\\", "/") for arg, d in report_dirs.items() if d}
+                    manifest.add(run_manifest.ROLE_INPUT, os.path.abspath(args.input_file), content_hash=hprof_hash)
+                    for arg, report_dir in report_dirs.items():
+                        index_html = _find_mat_index_html(os.path.abspath(os.path.join(run_dir, report_dir)))
+                        if index_html: manifest.add(run_manifest.ROLE_MAT_REPORT, index_html, key=arg)
+                    metadata.update({"input_content_hash": hprof_hash, "mat_report_dirs": report_dirs,
+                                     "mat_index_from_cache": index_from_cache, "mat_reports_from_cache": cached_report_args,
+                                     "mat_memory_mode": "manual" if args.mat_memory else "auto"})
+                    if mat_run:
+                        metadata.update({"mat_memory_mb_used": mat_run["heap_mb"], "mat_peak_rss_mb": mat_run["peak_rss_mb"],
+                                         "mat_admission_wait_seconds": mat_run["admission_wait_seconds"]})
+                    return report_dirs
+                report_dirs = checkpoints.run("mat", mat_stage, key=mat_report_args)
+                
+                def threads_stage():
+                    with timer.stage("threads_extraction"):
+                        # MAT writes <dump>.threads next to the hprof while parsing (or it was restored from the index cache)
+                        threads_path = os.path.splitext(os.path.abspath(args.input_file))[0] + ".threads"
+                        if not os.path.isfile(threads_path): print("Warning: No .threads file found in the MAT output."); return "N/A"
+                        manifest.add(run_manifest.ROLE_THREADS, threads_path)
+                        compact_text = build_thread_dump_artifact(threads_path, run_dir, base_name, metadata)
+                        record_threads_json(); return compact_text
+                thread_dump = checkpoints.run("threads_extraction", threads_stage, key=mat_report_args)
+
+                def mat_summary_stage():
+                    with timer.stage("mat_summary"):
+                        # The summary comes from the Leak Suspects report when it was requested, else the primary report
+                        summary_arg = next((arg for arg in mat_report_args if "suspects" in arg.lower() and arg in report_dirs), mat_report_args[0])
+                        summary_index = manifest.path(run_manifest.ROLE_MAT_REPORT, summary_arg)
+                        return extract_mat_suspect_text(str(summary_index.parent) if summary_index else run_dir)
+                mat_summary = checkpoints.run("mat_summary", mat_summary_stage, key=mat_report_args)
+
+            if triage_text:
+                mat_summary = f"{mat_summary}\n\n{triage_text}" if mat_report_args else triage_text
+                # STACK TRACE records stand in for the thread dump when MAT did not extract one
+                if thread_dump in (None, "N/A") and triage_traces: thread_dump = triage_traces
+            if thread_dump not in (None, "N/A"): diagnostic_refs.append(("Thread dump details from HPROF", record_raw_diagnostic(thread_dump)))
+            if triage_text: diagnostic_refs.append(("Heap triage", metadata["hprof_triage"]["report_file"]))
         except Exception as e: 
-            print(f"MAT analysis failed: {e}", flush=True); metadata["status"] = "failed_mat"; save_run_metadata(run_dir, metadata); sys.exit(1)
+            failed_step = "MAT" if mat_report_args else "HPROF triage"
+            print(f"{failed_step} analysis failed: {e}", flush=True); metadata["status"] = "failed_mat" if mat_report_args else "failed_triage"; save_run_metadata(run_dir, metadata); return 1
     
     elif is_txt:
         print("--- Starting Thread Dump Analysis ---")
         try:
             # The .txt file is already in the run_dir, passed as input_file
-            thread_dump = extract_threads_file_content(args.input_file)
-            md_content_header = f"### Full Thread Dump:\n```text\n{thread_dump or 'Not available.'}\n```\n\n"
+            def threads_stage():
+                with timer.stage("threads_extraction"): compact_text = build_thread_dump_artifact(args.input_file, run_dir, base_name, metadata)
+                record_threads_json(); return compact_text
+            thread_dump = checkpoints.run("threads_extraction", threads_stage)
+            if thread_dump: diagnostic_refs.append(("Thread dump grouped by stack", record_raw_diagnostic(thread_dump)))
+            diagnostic_refs.append(("Full thread dump", os.path.basename(args.input_file)))
         except Exception as e:
-            print(f"Failed to read thread dump file: {e}", flush=True); metadata["status"] = "failed_read_input"; save_run_metadata(run_dir, metadata); sys.exit(1)
+            print(f"Failed to read thread dump file: {e}", flush=True); metadata["status"] = "failed_read_input"; save_run_metadata(run_dir, metadata); return 1
 
     elif is_pcap:
         print("--- Starting Wireshark (tshark) Analysis ---")
         task_ids = [task.strip() for task in args.pcap_tasks.split(',')]
-        summaries = []
         try:
             # The pcap file is already in the run_dir, passed as input_file
-            for task_id in task_ids:
-                summary = run_tshark_task(args.input_file, args.tshark_path, task_id)
-                summaries.append(summary)
-            tshark_summary = "\n".join(summaries)
-            with open(os.path.join(run_dir, f"{base_name}_tshark_summary.txt"), "w", encoding="utf-8") as f_out: f_out.write(tshark_summary)
-            md_content_header = f"### tshark Analysis Output:\n```text\n{tshark_summary or 'Not available.'}\n```\n\n"
+            def tshark_stage():
+                with timer.stage("input_hash"): pcap_hash = args.input_hash or analysis_cache.hash_file(args.input_file, progress=progress.bytes_callback("input_hash", input_bytes))
+                with timer.stage("tshark_tasks"):
+                    tshark_version = analysis_cache.get_tshark_version(args.tshark_path)
+                    summaries, cached_task_ids = run_tshark_tasks_cached(args.input_file, args.tshark_path, task_ids, pcap_hash, tshark_version, progress)
+                metadata.update({"input_content_hash": pcap_hash, "tshark_version": tshark_version, "tshark_tasks_from_cache": cached_task_ids})
+                summary_text = "\n".join(summaries)
+                summary_path = os.path.join(run_dir, f"{base_name}_tshark_summary.txt")
+                with open(summary_path, "w", encoding="utf-8") as f_out: f_out.write(summary_text)
+                manifest.add(run_manifest.ROLE_TSHARK_SUMMARY, os.path.abspath(summary_path))
+                return summary_text
+            tshark_summary = checkpoints.run("tshark_tasks", tshark_stage, key=task_ids)
+            # The tshark summary file already holds the raw output, so it is referenced rather than copied
+            summary_entry = manifest.get(run_manifest.ROLE_TSHARK_SUMMARY)
+            if summary_entry:
+                manifest.add(run_manifest.ROLE_RAW_DIAGNOSTIC, summary_entry["path"], content_hash=summary_entry["hash"])
+                diagnostic_refs.append(("tshark analysis output", summary_entry["path"]))
         except Exception as e:
-            print(f"tshark analysis failed: {e}", flush=True); metadata["status"] = "failed_tshark"; save_run_metadata(run_dir, metadata); sys.exit(1)
-
-    prompt_txt = (args.prompt or "Default prompt...").format(
-        thread_dump_details=thread_dump or "Not available.",
-        mat_summary=mat_summary or "Not available.",
-        tshark_summary=tshark_summary or "Not available."
-    )
+            print(f"tshark analysis failed: {e}", flush=True); metadata["status"] = "failed_tshark"; save_run_metadata(run_dir, metadata); return 1
+
+    deterministic_tags = metadata.get("deterministic_tags", [])
+    if deterministic_tags:
+        # Make the rule-based tags visible on the dashboard before the LLM call returns
+        metadata["llm_generated_tags"] = list(deterministic_tags); save_run_metadata(run_dir, metadata)
+        print(f"Lock analysis tags: {', '.join(deterministic_tags)}", flush=True)
+
+    # Earlier runs showing the same suspects, stacks or talkers; resolved ones can stand in for the LLM
+    similar_run, reused = None, None
+    with timer.stage("fingerprint"):
+        metadata["incident_fingerprint"] = incident_fingerprint.fingerprint(incident_fingerprint.run_features(run_dir, metadata, mat_summary, tshark_summary))
+        if metadata["incident_fingerprint"]:
+            try: metadata["similar_resolved_runs"] = incident_fingerprint.IncidentIndex().find_similar(metadata["incident_fingerprint"]["minhash"], metadata["analysis_type"], os.path.dirname(os.path.abspath(run_dir)), exclude=os.path.basename(os.path.abspath(run_dir)))
+            except sqlite3.Error as e: print(f"Warning: Incident index unavailable: {e}", flush=True); metadata["similar_resolved_runs"] = []
+            for match in metadata["similar_resolved_runs"]: print(f"Similar resolved incident: run '{match['run']}' ({match['similarity']:.0%} similar).", flush=True)
+            similar_run = (metadata["similar_resolved_runs"] or [None])[0]
+    if similar_run and args.reuse_resolved:
+        reused = incident_fingerprint.reusable_analysis(os.path.join(os.path.dirname(os.path.abspath(run_dir)), similar_run["run"]))
+        if reused is None: print(f"Analysis of run '{similar_run['run']}' could not be read; asking the LLM instead.", flush=True)
+
+    with timer.stage("prompt_build"):
+        prompt_txt = (args.prompt or "Default prompt...").format(
+            thread_dump_details=thread_dump or "Not available.",
+            mat_summary=mat_summary or "Not available.",
+            tshark_summary=tshark_summary or "Not available."
+        )
     
-    llm_result = ask_ollama_model(prompt_txt, args.model, args.ollama_cmd, llm_parameters) 
+    def llm_stage():
+        with timer.stage("llm_call"): return ask_ollama_model(prompt_txt, args.model, args.ollama_cmd, llm_parameters, progress=progress)
+    # A changed model, prompt or evidence invalidates a previous answer
+    llm_key = analysis_cache.content_hasher(); llm_key.update(json.dumps([args.model, prompt_txt, llm_parameters]).encode("utf-8"))
+    if reused:
+        print(f"Reusing the analysis of resolved run '{similar_run['run']}'; no LLM call made.", flush=True)
+        metadata["llm_analysis_reused_from"] = similar_run
+        reused_text, reused_tags = reused
+        llm_result = f"TAGS: {', '.join(reused_tags)}\n{reused_text}" if reused_tags else reused_text
+    else: llm_result = checkpoints.run("llm_call", llm_stage, key=llm_key.hexdigest(), succeeded=bool)
     
     llm_tags = []
     if llm_result:
@@ -283,28 +617,36 @@ def main(argv_to_parse=None):
             llm_tags = [tag.strip() for tag in tag_line_match.group(1).split(',') if tag.strip()]
             llm_result = llm_result.replace(tag_line_match.group(0), "").strip()
     
-    metadata["llm_generated_tags"] = llm_tags
+    metadata["llm_generated_tags"] = deterministic_tags + [tag for tag in llm_tags if tag.lower() not in {t.lower() for t in deterministic_tags}]
 
     if not llm_result:
         print("Ollama analysis failed.", flush=True); metadata["status"] = "failed_ollama_analysis"
-        save_run_metadata(run_dir, metadata); sys.exit(1)
+        save_run_metadata(run_dir, metadata); return 1
 
     md_name = f"{base_name}_analysis_{args.model.replace(':','_')}.md"; md_path = os.path.join(run_dir, md_name)
     try:
-        with open(md_path, "w", encoding="utf-8") as f: 
+        with timer.stage("markdown_write"), open(md_path, "w", encoding="utf-8") as f: 
             f.write(f"# Analysis Report for {os.path.basename(args.input_file)}\n\n")
             f.write(f"* **Model Used:** {args.model}\n")
+            if reused: f.write(f"* **Reused Analysis:** from resolved run {similar_run['run']} ({similar_run['similarity']:.0%} similar); the LLM was not called\n")
             if is_hprof: f.write(f"* **MAT Report Type:** {args.mat_report_arg}\n")
             f.write(f"* **Timestamp (UTC):** {metadata['analysis_timestamp_utc']}\n\n")
             f.write(f"## LLM Parameters Used\n```json\n{json.dumps(llm_parameters, indent=2)}\n```\n\n")
-            f.write(md_content_header)
+            f.write(format_diagnostic_references(diagnostic_refs))
             f.write(f"### LLM Analysis:\n{llm_result}")
+        manifest.add(run_manifest.ROLE_ANALYSIS_MD, os.path.abspath(md_path))
         metadata.update({"llm_analysis_file": md_name, "status": "completed_ok"})
     except Exception as e: print(f"Err writing MD: {e}", flush=True); metadata["status"] = "failed_writing_analysis"
     
     save_run_metadata(run_dir, metadata)
-    print(f"--- Analysis Complete. Results are in {run_dir} ---")
-    sys.exit(0 if metadata["status"] == "completed_ok" else 1)
+    if metadata["status"] == "completed_ok" and metadata.get("incident_fingerprint"):
+        try: incident_fingerprint.IncidentIndex().add_run(run_dir)
+        except sqlite3.Error as e: print(f"Warning: Could not add the run to the incident index: {e}", flush=True)
+    print(f"--- Analysis Complete in {timer.total_wall_seconds()}s. Results are in {run_dir} ---")
+    return 0 if metadata["status"] == "completed_ok" else 1
+
+def main(argv_to_parse=None):
+    sys.exit(run_analysis(argv_to_parse))
 
 if __name__ == "__main__":
     try: main(None) 
@@ -20,19 +20,35 @@ def _log_error(msg):
         with open(LOG_FILE_OLLAMA_CLIENT, "a", encoding="utf-8") as f: f.write(full_msg)
     except Exception as log_e: print(f"CRIT_LOGGING_FAILURE_IN_OLLAMA_CLIENT: {log_e}", file=sys.stderr, flush=True)
 
+# Reused by every call in the process so a persistent worker keeps its connection to Ollama alive
+_session = requests.Session()
+
 def get_ollama_api_base_url():
     return os.environ.get("OLLAMA_HOST", "http://127.0.0.1:11434").rstrip('/')
 
-def ollama_api_generate(model_tag, prompt_text, llm_parameters, timeout=300):
+def _read_generate_stream(response_obj, on_token):
+    """Joins a streamed /api/generate reply; the last chunk carries the statistics a non-streamed reply has."""
+    pieces, response_data, tokens = [], {}, 0
+    for line in response_obj.iter_lines():
+        if not line: continue
+        response_data = json.loads(line)
+        if "error" in response_data: return response_data
+        if response_data.get("response"): pieces.append(response_data["response"]); tokens += 1; on_token(tokens)
+    # Ollama's own count replaces the one-token-per-chunk approximation
+    if response_data.get("eval_count"): on_token(response_data["eval_count"])
+    return {**response_data, "response": "".join(pieces)}
+
+def ollama_api_generate(model_tag, prompt_text, llm_parameters, timeout=300, on_token=None):
+    """on_token, when given, streams the reply and is called with the number of tokens generated so far."""
     ollama_api_url = f"{get_ollama_api_base_url()}/api/generate"
     headers = {"Content-Type": "application/json"}
-    payload = { "model": model_tag, "prompt": prompt_text, "stream": False, "options": llm_parameters or {} }
+    payload = { "model": model_tag, "prompt": prompt_text, "stream": on_token is not None, "options": llm_parameters or {} }
     console_encoding = sys.stdout.encoding if sys.stdout else 'utf-8'
     response_obj = None
     try:
-        response_obj = requests.post(ollama_api_url, headers=headers, json=payload, timeout=timeout)
+        response_obj = _session.post(ollama_api_url, headers=headers, json=payload, timeout=timeout, stream=on_token is not None)
         response_obj.raise_for_status()
-        response_data = response_obj.json()
+        response_data = _read_generate_stream(response_obj, on_token) if on_token else response_obj.json()
         if "response" in response_data: return response_data["response"].strip(), response_data
         else: _log_error(f"/api/generate Error: 'response' key missing. Full: {response_data}"); return None, response_data
     except requests.exceptions.Timeout:
@@ -56,7 +72,7 @@ def ollama_api_chat(model_tag, messages_history, llm_parameters, timeout=300):
     console_encoding = sys.stdout.encoding if sys.stdout else 'utf-8'
     response_obj = None
     try:
-        response_obj = requests.post(ollama_api_url, headers=headers, json=payload, timeout=timeout)
+        response_obj = _session.post(ollama_api_url, headers=headers, json=payload, timeout=timeout)
         response_obj.raise_for_status()
         response_data = response_obj.json()
         if "message" in response_data and "content" in response_data["message"]: return response_data["message"]["content"].strip(), response_data
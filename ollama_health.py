@@ -0,0 +1,102 @@
+# Filename: ollama_health.py
+import threading
+import time
+
+import requests
+from PySide6.QtCore import QObject, Signal
+
+import ollama_client
+
+PROBE_TIMEOUT_SECONDS = 3
+# Startup probes back off from the initial delay up to the maximum; analysis stays disabled if the
+# server has not answered within the startup timeout
+BACKOFF_INITIAL_SECONDS = 0.5
+BACKOFF_FACTOR = 2
+BACKOFF_MAX_SECONDS = 8
+STARTUP_TIMEOUT_SECONDS = 60
+# Once up, the server is probed this often to keep the status line current
+LIVE_INTERVAL_SECONDS = 10
+
+
+def backoff_delays(initial=BACKOFF_INITIAL_SECONDS, factor=BACKOFF_FACTOR, maximum=BACKOFF_MAX_SECONDS):
+    """Endless exponential backoff sequence capped at maximum."""
+    delay = initial
+    while True:
+        yield delay
+        delay = min(delay * factor, maximum)
+
+
+def probe(base_url=None, session=None, timeout=PROBE_TIMEOUT_SECONDS):
+    """Query /api/tags (installed models) and /api/ps (models loaded in memory).
+
+    Returns a status dict: ok, latency_ms of the /api/tags round trip, models, loaded and error.
+    """
+    base_url = (base_url or ollama_client.get_ollama_api_base_url()).rstrip("/")
+    session = session or requests
+    status = {"ok": False, "latency_ms": None, "models": [], "loaded": [], "error": None}
+    try:
+        started = time.perf_counter()
+        tags = session.get(f"{base_url}/api/tags", timeout=timeout)
+        status["latency_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        tags.raise_for_status()
+        status["models"] = sorted(m.get("name") or m.get("model") for m in tags.json().get("models", []))
+        ps = session.get(f"{base_url}/api/ps", timeout=timeout)
+        # Older servers have no /api/ps; the server is still usable
+        if ps.ok: status["loaded"] = sorted(m.get("name") or m.get("model") for m in ps.json().get("models", []))
+        status["ok"] = True
+    except (requests.exceptions.RequestException, ValueError) as e:
+        status["error"] = str(e)
+    return status
+
+
+class OllamaHealthMonitor(QObject):
+    """Probes the Ollama HTTP API on a worker thread.
+
+    Until the server first answers it retries with exponential backoff and emits failed() after
+    STARTUP_TIMEOUT_SECONDS; afterwards it keeps polling so statusChanged carries live latency and
+    loaded models. modelsChanged fires whenever the installed model list differs from the last one.
+    """
+    statusChanged = Signal(dict)
+    modelsChanged = Signal(list)
+    ready = Signal()
+    failed = Signal(str)
+    finished = Signal()
+
+    def __init__(self, base_url=None):
+        super().__init__()
+        self.base_url = base_url
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._resend_models = False
+
+    def stop(self):
+        self._stop.set(); self._wake.set()
+
+    def refresh(self):
+        """Probe again now and re-emit modelsChanged, e.g. after a model was pulled. Safe to call from any thread."""
+        self._resend_models = True; self._wake.set()
+
+    def run(self):
+        session = requests.Session()
+        delays = backoff_delays()
+        deadline = time.monotonic() + STARTUP_TIMEOUT_SECONDS
+        is_ready = False
+        models = None
+        try:
+            while not self._stop.is_set():
+                status = probe(self.base_url, session)
+                self.statusChanged.emit(status)
+                if status["ok"]:
+                    if status["models"] != models or self._resend_models:
+                        models = status["models"]; self._resend_models = False; self.modelsChanged.emit(models)
+                    if not is_ready: is_ready = True; self.ready.emit()
+                    delays = backoff_delays()
+                    delay = LIVE_INTERVAL_SECONDS
+                elif not is_ready and time.monotonic() >= deadline:
+                    self.failed.emit(status["error"] or "no response"); return
+                else:
+                    delay = next(delays)
+                self._wake.wait(delay); self._wake.clear()
+        finally:
+            session.close()
+            self.finished.emit()
@@ -29,6 +29,7 @@ EXCLUDE_PATTERNS = [
     "MAT",                  # MAT tool
     "models",               # LLM models (can be very large)
     "Resultat",             # Output directory
+    "cache",                # Cached analysis results (tshark tasks etc.)
     "__pycache__",          # Python bytecode cache
     ".git",                 # Git repository folder
     ".vscode",              # VSCode settings
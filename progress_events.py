@@ -0,0 +1,72 @@
+# Filename: progress_events.py
+"""Machine-readable progress of one analysis, separate from its human-readable console output.
+
+Events are flat JSON-able dicts with a "kind":
+  {"kind": "run", "analysis_type": "hprof", "input_bytes": 123}
+  {"kind": "stage", "stage": "mat_parse", "status": "started"}
+  {"kind": "stage", "stage": "mat_parse", "status": "finished", "wall_seconds": 12.3}
+  {"kind": "progress", "stage": "input_hash", "percent": 40.0, "bytes": 400, "total_bytes": 1000}
+  {"kind": "progress", "stage": "llm_call", "tokens": 57}
+monitor.py sends them to a callable sink (the analysis worker forwards them as protocol events)
+or, with --progress-fd, as JSON lines on that file descriptor.
+"""
+import json
+import os
+import threading
+import time
+
+# Progress updates within a stage are sent at most this often; stage changes are always sent
+MIN_INTERVAL_SECONDS = 0.25
+
+
+def fd_sink(fd):
+    """Sink writing one JSON object per line to an inherited file descriptor."""
+    stream = os.fdopen(fd, "w", encoding="utf-8", buffering=1, closefd=False)
+    lock = threading.Lock()
+
+    def write(event):
+        with lock:
+            try: stream.write(json.dumps(event) + "\n")
+            except (OSError, ValueError): pass  # the reader went away; the analysis carries on
+    return write
+
+
+class ProgressReporter:
+    """Sends progress events to a sink; without a sink every call is a no-op."""
+
+    def __init__(self, sink=None, min_interval=MIN_INTERVAL_SECONDS):
+        self.sink = sink
+        self.min_interval = min_interval
+        self._last_update = {}
+        self._lock = threading.Lock()
+
+    def emit(self, kind, **fields):
+        if self.sink is None: return
+        try: self.sink({"kind": kind, **fields})
+        except Exception: pass  # progress is best effort and never fails the analysis
+
+    def run_started(self, analysis_type, input_bytes=None):
+        self.emit("run", analysis_type=analysis_type, input_bytes=input_bytes)
+
+    def stage_started(self, stage):
+        self.emit("stage", stage=stage, status="started")
+
+    def stage_finished(self, stage, wall_seconds):
+        with self._lock: self._last_update.pop(stage, None)
+        self.emit("stage", stage=stage, status="finished", wall_seconds=round(wall_seconds, 3))
+
+    def update(self, stage, percent=None, bytes_done=None, total_bytes=None, tokens=None, force=False):
+        """Report progress within a stage; throttled unless force is set."""
+        if self.sink is None: return
+        now = time.monotonic()
+        with self._lock:
+            if not force and now - self._last_update.get(stage, float("-inf")) < self.min_interval: return
+            self._last_update[stage] = now
+        if percent is None and bytes_done is not None and total_bytes: percent = 100.0 * bytes_done / total_bytes
+        fields = {"percent": round(min(percent, 100.0), 1) if percent is not None else None, "bytes": bytes_done, "total_bytes": total_bytes, "tokens": tokens}
+        self.emit("progress", stage=stage, **{k: v for k, v in fields.items() if v is not None})
+
+    def bytes_callback(self, stage, total_bytes=None):
+        """Callable(bytes_done) for loops that read a file in chunks."""
+        if self.sink is None: return None
+        return lambda bytes_done: self.update(stage, bytes_done=bytes_done, total_bytes=total_bytes)
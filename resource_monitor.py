@@ -1,6 +1,8 @@
 import json
 import os
+import threading
 import time
+from collections import deque
 from pathlib import Path
 
 import psutil
@@ -9,19 +11,62 @@ PROJECT_ROOT = Path(__file__).resolve().parent
 RESULTAT_DIR = PROJECT_ROOT / "Resultat"
 
 
-def collect_metrics(output_file: str | os.PathLike):
-    """Collect basic system metrics and append as a JSON line."""
+SYSTEM_METRICS_FILE = "system_metrics.jsonl"
+# Samples kept in memory by MetricsSampler (an hour at the default interval) and written per batch
+RING_BUFFER_SIZE = 3600
+FLUSH_EVERY_SAMPLES = 10
+
+
+def _cpu_busy_and_total(times) -> tuple[float, float]:
+    total = sum(times)
+    idle = times.idle + getattr(times, "iowait", 0.0)
+    return total - idle, total
+
+
+def sample_metrics(previous: dict | None = None) -> dict:
+    """Take one system metrics sample without blocking.
+
+    CPU use and network rates are deltas since the previous sample; without one, CPU is the
+    average since boot and the rates are left out. The "_cpu" key carries what the next call
+    needs and is not meant to be stored.
+    """
+    now = time.time()
+    cpu = _cpu_busy_and_total(psutil.cpu_times())
+    net = psutil.net_io_counters()
     metrics = {
-        "timestamp": time.time(),
-        "cpu_percent": psutil.cpu_percent(interval=1),
+        "timestamp": now,
+        "cpu_percent": 0.0,
         "memory_percent": psutil.virtual_memory().percent,
         "disk_percent": psutil.disk_usage("/").percent,
-        "net_bytes_sent": psutil.net_io_counters().bytes_sent,
-        "net_bytes_recv": psutil.net_io_counters().bytes_recv,
+        "net_bytes_sent": net.bytes_sent,
+        "net_bytes_recv": net.bytes_recv,
+        "_cpu": cpu,
     }
-    os.makedirs(os.path.dirname(output_file), exist_ok=True)
+    base_cpu = previous["_cpu"] if previous else (0.0, 0.0)
+    busy, total = cpu[0] - base_cpu[0], cpu[1] - base_cpu[1]
+    if total > 0: metrics["cpu_percent"] = round(min(100.0, max(0.0, 100.0 * busy / total)), 1)
+    if previous:
+        elapsed = now - previous["timestamp"]
+        if elapsed > 0:
+            metrics["net_sent_per_s"] = round((net.bytes_sent - previous["net_bytes_sent"]) / elapsed, 1)
+            metrics["net_recv_per_s"] = round((net.bytes_recv - previous["net_bytes_recv"]) / elapsed, 1)
+    return metrics
+
+
+def _public(metrics: dict) -> dict:
+    return {k: v for k, v in metrics.items() if not k.startswith("_")}
+
+
+def _append_lines(output_file: str | os.PathLike, samples: list[dict]) -> None:
+    os.makedirs(os.path.dirname(os.path.abspath(output_file)), exist_ok=True)
     with open(output_file, "a", encoding="utf-8") as f:
-        f.write(json.dumps(metrics) + "\n")
+        f.write("".join(json.dumps(_public(m)) + "\n" for m in samples))
+
+
+def collect_metrics(output_file: str | os.PathLike):
+    """Collect basic system metrics and append as a JSON line."""
+    metrics = _public(sample_metrics())
+    _append_lines(output_file, [metrics])
     return metrics
 
 
@@ -29,7 +74,7 @@ def collect_once_in_resultat(run_name: str):
     """Convenience wrapper to collect metrics to a run subdirectory."""
     run_dir = RESULTAT_DIR / run_name
     os.makedirs(run_dir, exist_ok=True)
-    out_path = run_dir / "system_metrics.jsonl"
+    out_path = run_dir / SYSTEM_METRICS_FILE
     return collect_metrics(str(out_path))
 
 
@@ -55,10 +100,113 @@ def collect_metrics_periodically(
         A list of metrics dictionaries in the order they were collected.
     """
 
-    results = []
+    samples, previous = [], None
     for i in range(iterations):
-        results.append(collect_metrics(output_file))
+        previous = sample_metrics(previous)
+        samples.append(previous)
         if i < iterations - 1:
             time.sleep(max(0.0, interval_seconds))
-    return results
+    # One append for the whole series
+    if samples: _append_lines(output_file, samples)
+    return [_public(m) for m in samples]
+
+
+class MetricsSampler:
+    """Sample system metrics in a background thread for as long as an analysis runs.
+
+    The latest samples are kept in a ring buffer of buffer_size entries. With an output_file they
+    are also appended as JSON lines, every flush_every samples and on stop().
+    """
+
+    def __init__(self, output_file: str | os.PathLike | None = None, interval_seconds: float = 1.0,
+                 buffer_size: int = RING_BUFFER_SIZE, flush_every: int = FLUSH_EVERY_SAMPLES):
+        self.output_file = output_file
+        self.interval_seconds = interval_seconds
+        self.flush_every = max(1, flush_every)
+        self._buffer = deque(maxlen=buffer_size)
+        self._pending = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="metrics-sampler", daemon=True)
+
+    def _run(self) -> None:
+        previous = None
+        while True:
+            try: previous = sample_metrics(previous)
+            except (psutil.Error, OSError): pass
+            else:
+                with self._lock:
+                    self._buffer.append(_public(previous)); self._pending.append(previous)
+                    due = len(self._pending) >= self.flush_every
+                if due: self.flush()
+            if self._stop.wait(self.interval_seconds): break
+
+    def start(self) -> "MetricsSampler":
+        self._thread.start()
+        return self
+
+    def flush(self) -> None:
+        """Append the samples taken since the last flush to output_file."""
+        with self._lock:
+            pending, self._pending = self._pending, []
+        if not pending or self.output_file is None: return
+        try: _append_lines(self.output_file, pending)
+        except OSError: pass  # metrics are best effort and never fail the analysis
+
+    def samples(self) -> list[dict]:
+        """The samples still in the ring buffer, oldest first."""
+        with self._lock:
+            return list(self._buffer)
+
+    def latest(self) -> dict | None:
+        with self._lock:
+            return self._buffer[-1] if self._buffer else None
+
+    def stop(self) -> list[dict]:
+        """Stop sampling, write the remaining samples and return the ring buffer's contents."""
+        self._stop.set()
+        if self._thread.is_alive(): self._thread.join()
+        self.flush()
+        return self.samples()
+
+
+def process_tree_rss(pid: int) -> int:
+    """Resident memory in bytes of a process and all its children, 0 if it is gone."""
+    try:
+        process = psutil.Process(pid)
+        processes = [process] + process.children(recursive=True)
+    except psutil.Error:
+        return 0
+    rss = 0
+    for proc in processes:
+        try:
+            rss += proc.memory_info().rss
+        except psutil.Error:
+            pass
+    return rss
+
+
+class PeakRssSampler:
+    """Sample the resident memory of a process tree in a background thread and keep the peak."""
+
+    def __init__(self, pid: int, interval_seconds: float = 1.0):
+        self.pid = pid
+        self.interval_seconds = interval_seconds
+        self.peak_rss_bytes = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"rss-sampler-{pid}", daemon=True)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self.peak_rss_bytes = max(self.peak_rss_bytes, process_tree_rss(self.pid))
+            self._stop.wait(self.interval_seconds)
+
+    def start(self) -> "PeakRssSampler":
+        self._thread.start()
+        return self
 
+    def stop(self) -> int:
+        """Stop sampling and return the peak RSS in bytes."""
+        self._stop.set()
+        self._thread.join()
+        return self.peak_rss_bytes
@@ -0,0 +1,78 @@
+# Filename: run_manifest.py
+import json
+import os
+from pathlib import Path
+
+import analysis_cache
+
+MANIFEST_FILE = "manifest.json"
+MANIFEST_VERSION = 1
+# Artifacts up to this size are hashed when recorded; larger ones (heap dumps) only when the hash is already known
+HASH_SIZE_LIMIT = 64 * 1024 * 1024
+
+# Artifact roles written by monitor.py
+ROLE_INPUT = "input"
+ROLE_MAT_REPORT = "mat_report"  # keyed by MAT report argument, path is the report's index.html
+ROLE_THREADS = "threads"
+ROLE_THREADS_JSON = "threads_json"
+ROLE_TRIAGE_REPORT = "triage_report"
+ROLE_TRIAGE_JSON = "triage_json"
+ROLE_TSHARK_SUMMARY = "tshark_summary"
+ROLE_RAW_DIAGNOSTIC = "raw_diagnostic"
+ROLE_ANALYSIS_MD = "analysis_md"
+
+
+class RunManifest:
+    """Index of a run folder's artifacts by role (and optional key), kept in <run_dir>/manifest.json.
+
+    Every artifact records its path relative to the run folder, its size and, when cheap or
+    already known, its content hash. The file is rewritten on each add so a failed run still
+    lists what it produced.
+    """
+
+    def __init__(self, run_dir, artifacts=None):
+        self.run_dir = Path(run_dir).absolute()
+        self._artifacts = {}
+        for entry in artifacts or []:
+            self._artifacts[(entry["role"], entry.get("key"))] = entry
+
+    @classmethod
+    def load(cls, run_dir):
+        """The run's manifest, or None for runs made before manifests existed."""
+        try:
+            with open(Path(run_dir) / MANIFEST_FILE, "r", encoding="utf-8") as f:
+                return cls(run_dir, json.load(f).get("artifacts", []))
+        except (OSError, ValueError):
+            return None
+
+    def add(self, role, path, key=None, content_hash=None):
+        """Record an artifact given by absolute path or path relative to the run folder.
+
+        Files outside the run folder are not artifacts of the run and are ignored.
+        """
+        path = Path(path)
+        if not path.is_absolute(): path = self.run_dir / path
+        if not path.is_file() or not path.is_relative_to(self.run_dir): return None
+        size = path.stat().st_size
+        if content_hash is None and size <= HASH_SIZE_LIMIT: content_hash = analysis_cache.hash_file(path)
+        entry = {"role": role, "key": key, "path": path.relative_to(self.run_dir).as_posix(), "size": size, "hash": content_hash}
+        self._artifacts[(role, key)] = entry
+        self.save()
+        return entry
+
+    def get(self, role, key=None):
+        return self._artifacts.get((role, key))
+
+    def path(self, role, key=None):
+        """Absolute path of an artifact, or None when the run did not produce it."""
+        entry = self._artifacts.get((role, key))
+        return self.run_dir / entry["path"] if entry else None
+
+    def entries(self, role=None):
+        return [entry for entry in self._artifacts.values() if role is None or entry["role"] == role]
+
+    def save(self):
+        tmp_path = self.run_dir / (MANIFEST_FILE + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": MANIFEST_VERSION, "artifacts": list(self._artifacts.values())}, f, indent=2)
+        os.replace(tmp_path, self.run_dir / MANIFEST_FILE)
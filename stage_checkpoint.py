@@ -0,0 +1,93 @@
+# Filename: stage_checkpoint.py
+import json
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+
+CHECKPOINT_DIR = ".checkpoints"
+ARGS_FILE = "args.json"
+# Arguments that describe one invocation rather than the run, so they are never replayed on resume
+NON_REPLAYED_ARGS = ("resume", "ingest_seconds", "progress_fd")
+# Metadata keys owned by the run as a whole, never restored from a stage checkpoint
+RUN_LEVEL_KEYS = ("timings", "stage_status", "status")
+
+
+def _write_json(path, data):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def _read_json(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def save_args(run_dir, args_dict):
+    """Remember the arguments a run was started with so `--resume` can replay them."""
+    _write_json(Path(run_dir) / CHECKPOINT_DIR / ARGS_FILE, {k: v for k, v in args_dict.items() if k not in NON_REPLAYED_ARGS})
+
+
+def load_args(run_dir):
+    return _read_json(Path(run_dir) / CHECKPOINT_DIR / ARGS_FILE)
+
+
+def is_resumable(run_dir):
+    return (Path(run_dir) / CHECKPOINT_DIR / ARGS_FILE).is_file()
+
+
+class StageCheckpoints:
+    """Persists each stage's result and the metadata it produced under <run_dir>/.checkpoints.
+
+    With resume=True a stage whose checkpoint completed with the same key is not run again:
+    its result is returned and its metadata restored. Results must be JSON serialisable.
+    """
+
+    def __init__(self, run_dir, metadata, resume=False):
+        self.dir = Path(run_dir) / CHECKPOINT_DIR
+        self.metadata = metadata
+        self.resume = resume
+        self.status = metadata.setdefault("stage_status", {})
+
+    def _path(self, name):
+        return self.dir / f"{name}.json"
+
+    def completed(self, name, key=None):
+        record = _read_json(self._path(name)) if self.resume else None
+        if record and record.get("status") == "completed" and record.get("key") == _normalise(key):
+            return record
+        return None
+
+    def run(self, name, fn, key=None, succeeded=lambda result: True):
+        record = self.completed(name, key)
+        if record:
+            self.metadata.update(record["metadata"]); self.status[name] = "reused"
+            print(f"Resume: reusing completed stage '{name}'.", flush=True)
+            return record["result"]
+        before = dict(self.metadata)
+        try:
+            result = fn()
+        except Exception as e:
+            self._record_failure(name, key, str(e)); raise
+        if not succeeded(result):
+            self._record_failure(name, key, "stage returned no result"); return result
+        produced = {k: v for k, v in self.metadata.items() if k not in RUN_LEVEL_KEYS and (k not in before or before[k] != v)}
+        _write_json(self._path(name), {"status": "completed", "key": _normalise(key), "result": result, "metadata": produced,
+                                       "completed_utc": datetime.now(timezone.utc).isoformat()})
+        self.status[name] = "completed"
+        return result
+
+    def _record_failure(self, name, key, error):
+        self.status[name] = "failed"
+        _write_json(self._path(name), {"status": "failed", "key": _normalise(key), "error": error,
+                                       "failed_utc": datetime.now(timezone.utc).isoformat()})
+
+
+def _normalise(key):
+    # Keys are compared after a JSON round trip, so tuples and lists match
+    return json.loads(json.dumps(key))
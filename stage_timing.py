@@ -0,0 +1,137 @@
+# Filename: stage_timing.py
+import json
+import os
+import statistics
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import resource_monitor
+
+MB = 1024 * 1024
+# Fast enough to catch short-lived child processes, cheap enough to leave on for every stage
+RSS_SAMPLE_INTERVAL_SECONDS = 0.25
+
+
+def _cpu_seconds():
+    # Includes children that have been waited for (MAT, tshark); Windows reports no child times
+    t = os.times()
+    return t.user + t.system + t.children_user + t.children_system
+
+
+class StageTimer:
+    """Times named pipeline stages: wall time, CPU time and the peak RSS of this process tree.
+
+    `stages` maps stage name to its measurements in the order the stages ran, ready to be
+    stored as the `timings` block of run_metadata.json. A stage that runs twice accumulates.
+    A progress_events.ProgressReporter, when given, is told when each stage starts and ends.
+    """
+
+    def __init__(self, pid=None, progress=None):
+        self.pid = pid or os.getpid()
+        self.progress = progress
+        self.stages = {}
+
+    @contextmanager
+    def stage(self, name):
+        sampler = resource_monitor.PeakRssSampler(self.pid, RSS_SAMPLE_INTERVAL_SECONDS).start()
+        wall_started, cpu_started = time.perf_counter(), _cpu_seconds()
+        if self.progress: self.progress.stage_started(name)
+        try:
+            yield
+        finally:
+            wall_seconds = time.perf_counter() - wall_started
+            self.record(name, wall_seconds, _cpu_seconds() - cpu_started, sampler.stop())
+            if self.progress: self.progress.stage_finished(name, wall_seconds)
+
+    def record(self, name, wall_seconds, cpu_seconds=None, peak_rss_bytes=None):
+        entry = self.stages.setdefault(name, {"wall_seconds": 0.0, "cpu_seconds": None, "peak_rss_mb": None})
+        entry["wall_seconds"] = round(entry["wall_seconds"] + wall_seconds, 3)
+        if cpu_seconds is not None: entry["cpu_seconds"] = round((entry["cpu_seconds"] or 0.0) + cpu_seconds, 3)
+        if peak_rss_bytes is not None: entry["peak_rss_mb"] = max(entry["peak_rss_mb"] or 0, peak_rss_bytes // MB)
+        return entry
+
+    def total_wall_seconds(self):
+        return round(sum(entry["wall_seconds"] for entry in self.stages.values()), 3)
+
+
+def _percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))]
+
+
+def stage_profile(timings_list):
+    """Median wall seconds per stage, in the order stages run, for calibrating ETA estimates."""
+    walls, positions = {}, {}
+    for timings in timings_list:
+        for position, (name, entry) in enumerate((timings or {}).items()):
+            walls.setdefault(name, []).append(entry.get("wall_seconds") or 0.0)
+            positions.setdefault(name, []).append(position / max(1, len(timings) - 1))
+    # Runs skip different stages, so stages are ordered by their average relative position
+    order = sorted(walls, key=lambda name: statistics.fmean(positions[name]))
+    return {name: statistics.median(walls[name]) for name in order}
+
+
+def run_timings(run_dir, analysis_type=None):
+    """The `timings` block of a run that completed successfully (of analysis_type, when given), else None."""
+    try:
+        with open(Path(run_dir) / "run_metadata.json", "r", encoding="utf-8") as f: metadata = json.load(f)
+    except (OSError, ValueError): return None
+    if metadata.get("status") != "completed_ok" or (analysis_type and metadata.get("analysis_type") != analysis_type): return None
+    return metadata.get("timings") or None
+
+
+def recent_timings(resultat_dir, analysis_type, limit):
+    """`timings` of up to limit of the newest completed runs of an analysis type, newest first.
+
+    Only the 4 * limit most recently modified run folders are read, so old history costs nothing.
+    """
+    run_dirs = []
+    try:
+        for run_dir in Path(resultat_dir).iterdir():
+            try:
+                if run_dir.is_dir(): run_dirs.append((run_dir.stat().st_mtime, run_dir))
+            except OSError: continue
+    except OSError: return []
+    run_dirs.sort(reverse=True)
+    timings_list = []
+    for _, run_dir in run_dirs[:limit * 4]:
+        timings = run_timings(run_dir, analysis_type)
+        if timings: timings_list.append(timings)
+        if len(timings_list) >= limit: break
+    return timings_list
+
+
+def estimate_remaining_seconds(profile, current_stage=None, current_elapsed=0.0, current_percent=None, started_stages=()):
+    """Seconds left in a run, from a stage_profile() of past runs of the same type.
+
+    Stages ordered before the latest started one are taken as done or skipped. The current
+    stage uses its measured percent when it reports one, else its typical duration. Returns
+    None when the profile knows nothing about this run's stages.
+    """
+    if not profile: return None
+    order = list(profile)
+    started = [order.index(s) for s in started_stages if s in profile]
+    if current_stage in profile: started.append(order.index(current_stage))
+    remaining = sum(profile[s] for s in order[max(started) + 1:]) if started else sum(profile.values())
+    if current_stage:
+        if current_percent: remaining += current_elapsed * (100.0 - current_percent) / current_percent
+        else: remaining += max(0.0, profile.get(current_stage, 0.0) - current_elapsed)
+    return remaining
+
+
+def aggregate_stage_timings(timings_list):
+    """Summarise `timings` blocks from many runs into per-stage latency statistics."""
+    per_stage = {}
+    for timings in timings_list:
+        for name, entry in (timings or {}).items():
+            per_stage.setdefault(name, []).append(entry)
+    summary = []
+    for name, entries in per_stage.items():
+        walls = sorted(e.get("wall_seconds") or 0.0 for e in entries)
+        cpus = [e["cpu_seconds"] for e in entries if e.get("cpu_seconds") is not None]
+        rss = [e["peak_rss_mb"] for e in entries if e.get("peak_rss_mb") is not None]
+        summary.append({"stage": name, "runs": len(entries), "mean_wall_seconds": round(statistics.fmean(walls), 3),
+                        "median_wall_seconds": round(statistics.median(walls), 3), "p95_wall_seconds": round(_percentile(walls, 0.95), 3),
+                        "max_wall_seconds": round(walls[-1], 3), "mean_cpu_seconds": round(statistics.fmean(cpus), 3) if cpus else None,
+                        "max_peak_rss_mb": max(rss) if rss else None})
+    return sorted(summary, key=lambda row: row["mean_wall_seconds"], reverse=True)
@@ -0,0 +1,90 @@
+import importlib.util
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+
+spec_ac = importlib.util.spec_from_file_location("analysis_cache", ROOT_DIR / "analysis_cache.py")
+analysis_cache = importlib.util.module_from_spec(spec_ac)
+spec_ac.loader.exec_module(analysis_cache)
+
+
+def test_hash_file_is_content_based(tmp_path: Path):
+    a = tmp_path / "a.pcap"
+    b = tmp_path / "b.pcap"
+    a.write_bytes(b"same bytes" * 1000)
+    b.write_bytes(b"same bytes" * 1000)
+    assert analysis_cache.hash_file(a) == analysis_cache.hash_file(b, chunk_size=7)
+    b.write_bytes(b"other bytes")
+    assert analysis_cache.hash_file(a) != analysis_cache.hash_file(b)
+
+
+def test_tshark_task_round_trip(tmp_path: Path, monkeypatch):
+    monkeypatch.setattr(analysis_cache, "TSHARK_CACHE_DIR", tmp_path / "tshark")
+    assert analysis_cache.load_tshark_task("abc", "tcp_conv", "4.2.5") is None
+    assert analysis_cache.store_tshark_task("abc", "tcp_conv", "4.2.5", "--- TCP ---\nrows\n")
+    assert analysis_cache.load_tshark_task("abc", "tcp_conv", "4.2.5") == "--- TCP ---\nrows\n"
+    # A different tshark version must not reuse the cached output
+    assert analysis_cache.load_tshark_task("abc", "tcp_conv", "4.4.0") is None
+
+
+def test_unknown_tshark_version_is_not_cached(tmp_path: Path, monkeypatch):
+    monkeypatch.setattr(analysis_cache, "TSHARK_CACHE_DIR", tmp_path / "tshark")
+    assert not analysis_cache.store_tshark_task("abc", "dns_stats", analysis_cache.UNKNOWN_VERSION, "out")
+    assert analysis_cache.get_tshark_version(tmp_path / "missing-tshark") == analysis_cache.UNKNOWN_VERSION
+
+
+def _mat_install(root: Path, version: str):
+    plugins = root / "plugins"
+    plugins.mkdir(parents=True)
+    (plugins / f"org.eclipse.mat.api_{version}.jar").write_bytes(b"")
+    launcher = plugins / "org.eclipse.equinox.launcher_1.6.400.jar"
+    launcher.write_bytes(b"")
+    return launcher
+
+
+def test_mat_index_and_reports_are_restored_for_another_run(tmp_path: Path, monkeypatch):
+    monkeypatch.setattr(analysis_cache, "MAT_CACHE_DIR", tmp_path / "mat")
+    launcher = _mat_install(tmp_path / "mat-1.14", "1.14.0.202306060944")
+    first_run, second_run = tmp_path / "run1", tmp_path / "run2"
+    first_run.mkdir(); second_run.mkdir()
+    (first_run / "app.hprof").write_bytes(b"heap")
+    for name in ("app.index", "app.o2c.index", "app.threads", "app_threads.json"):
+        (first_run / name).write_text(name)
+    (first_run / "app_Leak_Suspects.zip").write_bytes(b"zip")
+
+    assert not analysis_cache.restore_mat_index("h1", launcher, second_run / "copy.hprof")
+    assert analysis_cache.store_mat_index("h1", launcher, first_run / "app.hprof")
+    assert analysis_cache.store_mat_report("h1", launcher, "org.eclipse.mat.api:suspects", first_run / "app_Leak_Suspects.zip")
+
+    (second_run / "copy.hprof").write_bytes(b"heap")
+    assert analysis_cache.restore_mat_index("h1", launcher, second_run / "copy.hprof")
+    assert sorted(p.name for p in second_run.iterdir()) == ["copy.hprof", "copy.index", "copy.o2c.index", "copy.threads"]
+    assert (second_run / "copy.threads").read_text() == "app.threads"
+    assert analysis_cache.load_mat_report("h1", launcher, "org.eclipse.mat.api:suspects", second_run / "copy_Leak_Suspects.zip")
+    assert not analysis_cache.load_mat_report("h1", launcher, "org.eclipse.mat.api:dominator_tree", second_run / "copy_dominator_tree.zip")
+    # A different MAT release keeps its own index cache, though its launcher jar has the same name
+    assert not analysis_cache.restore_mat_index("h1", _mat_install(tmp_path / "mat-1.15", "1.15.0.202311291328"), second_run / "copy.hprof")
+
+
+def test_restored_index_is_a_copy_and_later_indexes_are_added(tmp_path: Path, monkeypatch):
+    monkeypatch.setattr(analysis_cache, "MAT_CACHE_DIR", tmp_path / "mat")
+    launcher = _mat_install(tmp_path / "mat", "1.15.0")
+    run = tmp_path / "run"
+    run.mkdir()
+    (run / "app.hprof").write_bytes(b"heap")
+    (run / "app.index").write_text("main")
+    assert analysis_cache.store_mat_index("h1", launcher, run / "app.hprof")
+
+    # MAT rewrites an index and builds the dominator tree for a later report
+    (run / "app.index").write_text("changed in the run folder")
+    (run / "app.domOut.index").write_text("dominators")
+    assert analysis_cache.store_mat_index("h1", launcher, run / "app.hprof")
+    assert not analysis_cache.store_mat_index("h1", launcher, run / "app.hprof")
+
+    other = tmp_path / "other"
+    other.mkdir()
+    assert analysis_cache.restore_mat_index("h1", launcher, other / "copy.hprof")
+    assert (other / "copy.index").read_text() == "main" and (other / "copy.domOut.index").read_text() == "dominators"
+    (other / "copy.index").write_text("changed again")
+    assert analysis_cache.restore_mat_index("h1", launcher, tmp_path / "third.hprof")
+    assert (tmp_path / "third.index").read_text() == "main"
@@ -0,0 +1,57 @@
+import importlib.util
+import io
+import json
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+
+spec_aw = importlib.util.spec_from_file_location("analysis_worker", ROOT_DIR / "analysis_worker.py")
+analysis_worker = importlib.util.module_from_spec(spec_aw)
+spec_aw.loader.exec_module(analysis_worker)
+
+
+def _serve(requests):
+    out = io.StringIO()
+    analysis_worker.serve(io.StringIO("".join(json.dumps(r) + "\n" for r in requests)), out)
+    return [json.loads(line) for line in out.getvalue().splitlines()]
+
+
+def test_jobs_run_in_order_and_stream_output(monkeypatch):
+    calls = []
+
+    def fake_run_analysis(argv, progress_sink=None):
+        calls.append(argv)
+        progress_sink({"kind": "stage", "stage": "threads_extraction", "status": "started"})
+        print(f"analysing {argv[-1]}")
+        print("partial line", end="")
+        return 0 if argv[-1] == "a.txt" else 1
+
+    monkeypatch.setattr(analysis_worker.monitor, "run_analysis", fake_run_analysis)
+    events = _serve([{"id": "job-1", "argv": ["a.txt"]}, {"id": "job-2", "argv": ["b.txt"]},
+                     {"command": "shutdown"}, {"id": "job-3", "argv": ["c.txt"]}])
+
+    assert events[0]["event"] == "ready"
+    assert calls == [["a.txt"], ["b.txt"]]
+    assert [e for e in events if e["event"] == "finished"] == [
+        {"event": "finished", "id": "job-1", "exit_code": 0}, {"event": "finished", "id": "job-2", "exit_code": 1}]
+    job_one_lines = [e["line"] for e in events if e["event"] == "output" and e["id"] == "job-1"]
+    assert job_one_lines == ["analysing a.txt", "partial line"]
+    assert [e for e in events if e["event"] == "progress"][0] == {
+        "event": "progress", "id": "job-1", "kind": "stage", "stage": "threads_extraction", "status": "started"}
+
+
+def test_bad_arguments_and_crashes_do_not_kill_the_worker(monkeypatch):
+    events = _serve([{"id": "bad-args", "argv": ["--model"]}])
+    assert events[-1] == {"event": "finished", "id": "bad-args", "exit_code": 2}
+
+    def crashing_run_analysis(argv, progress_sink=None):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(analysis_worker.monitor, "run_analysis", crashing_run_analysis)
+    monkeypatch.setattr(analysis_worker.monitor, "log_monitor_error", lambda msg: None)
+    out = io.StringIO()
+    analysis_worker.serve(io.StringIO('not json\n{"id": "crash", "argv": []}\n'), out)
+    events = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert events[1]["event"] == "error"
+    assert any("RuntimeError: boom" in e.get("line", "") for e in events)
+    assert events[-1] == {"event": "finished", "id": "crash", "exit_code": 2}
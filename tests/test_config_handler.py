@@ -61,3 +61,16 @@ def test_save_settings(tmp_path, monkeypatch):
     with cfg_path.open(encoding='utf-8') as f:
         data = json.load(f)
     assert data == {'foo': 'bar'}
+
+
+def test_load_settings_adds_new_report_options(tmp_path, monkeypatch):
+    mod = load_module(tmp_path)
+    cfg_path = tmp_path / 'config.json'
+    custom = {'name': 'Custom', 'id': 'custom', 'mat_arg': 'org.example:custom'}
+    with cfg_path.open('w', encoding='utf-8') as f:
+        json.dump({'mat_report_options': [custom]}, f)
+    monkeypatch.setattr(mod, 'CONFIG_FILE_PATH', cfg_path)
+    settings = mod.load_settings()
+    ids = [r['id'] for r in settings['mat_report_options']]
+    assert ids[0] == 'custom'
+    assert 'triage' in ids
@@ -0,0 +1,42 @@
+import importlib.util
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+
+spec_gl = importlib.util.spec_from_file_location("guard_ledger", ROOT_DIR / "guard_ledger.py")
+guard_ledger = importlib.util.module_from_spec(spec_gl)
+spec_gl.loader.exec_module(guard_ledger)
+
+
+def test_ledger_survives_restarts_and_tracks_file_versions(tmp_path: Path):
+    db = tmp_path / "ledger.db"
+    dump = str(tmp_path / "heap.hprof")
+    ledger = guard_ledger.GuardLedger(db)
+    assert ledger.should_process(dump, 10, 1)
+    ledger.record(dump, 10, 1)
+    ledger.update(dump, status=guard_ledger.STATUS_RUNNING, run_name="heap_20250101-000000", content_hash="abc")
+    # Interrupted mid-run: picked up again after a restart
+    assert guard_ledger.GuardLedger(db).should_process(dump, 10, 1)
+
+    ledger.update(dump, status=guard_ledger.STATUS_DONE)
+    reopened = guard_ledger.GuardLedger(db)
+    assert not reopened.should_process(dump, 10, 1)
+    assert reopened.should_process(dump, 11, 2)
+    entry = reopened.get(dump)
+    assert (entry["status"], entry["run_name"], entry["content_hash"]) == ("done", "heap_20250101-000000", "abc")
+
+    reopened.record(dump, 11, 2)
+    assert reopened.get(dump)["run_name"] is None
+    reopened.update(dump, status=guard_ledger.STATUS_FAILED)
+    assert not reopened.should_process(dump, 11, 2)
+
+
+def test_entries_can_be_cleared_individually_or_all(tmp_path: Path):
+    ledger = guard_ledger.GuardLedger(tmp_path / "ledger.db")
+    for name in ("a.txt", "b.txt", "c.txt"):
+        ledger.record(tmp_path / name, 1, 1, status=guard_ledger.STATUS_DONE)
+    ledger.remove([tmp_path / "a.txt"])
+    assert sorted(Path(e["path"]).name for e in ledger.entries()) == ["b.txt", "c.txt"]
+    assert ledger.should_process(tmp_path / "a.txt", 1, 1)
+    ledger.clear()
+    assert ledger.entries() == []
@@ -0,0 +1,92 @@
+import importlib.util
+import os
+import sys
+import time
+from pathlib import Path
+
+from PySide6.QtCore import QCoreApplication, QThread
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+
+for name in ("analysis_cache", "ingest", "guard_watcher"):
+    spec = importlib.util.spec_from_file_location(name, ROOT_DIR / f"{name}.py")
+    module = importlib.util.module_from_spec(spec)
+    sys.modules.setdefault(name, module)
+    spec.loader.exec_module(module)
+guard_watcher = sys.modules["guard_watcher"]
+
+
+def test_files_are_handed_over_once_after_they_stop_changing(tmp_path: Path):
+    tracker = guard_watcher.StabilityTracker(stable_after=4, closed_stable_after=1)
+    growing = tmp_path / "heap.hprof"
+    growing.write_bytes(b"a")
+    closed = tmp_path / "jstack.txt"
+    closed.write_text("threads")
+
+    tracker.observe(str(growing), now=0)
+    tracker.observe(str(closed), now=0, closed=True)
+    assert tracker.poll(now=1) == [str(closed)]
+    growing.write_bytes(b"ab")
+    assert tracker.poll(now=3) == []
+    assert tracker.poll(now=6) == []
+    assert tracker.poll(now=7) == [str(growing)]
+
+    # Seen again unchanged: not handed over twice; modified: handed over again
+    tracker.observe(str(growing), now=8)
+    assert tracker.poll(now=20) == []
+    os.utime(growing, ns=(0, 10**9))
+    tracker.observe(str(growing), now=21)
+    assert tracker.poll(now=25) == [str(growing)]
+
+    growing.unlink()
+    tracker.observe(str(growing), now=26)
+    assert tracker.poll(now=40) == [] and str(growing) not in tracker.handed_over
+
+
+def test_watcher_emits_ready_files_from_its_own_thread(tmp_path: Path, monkeypatch):
+    monkeypatch.setattr(guard_watcher, "STABLE_AFTER_SECONDS", 0.2)
+    monkeypatch.setattr(guard_watcher, "CLOSED_STABLE_AFTER_SECONDS", 0.1)
+    monkeypatch.setattr(guard_watcher, "TICK_SECONDS", 0.05)
+    (tmp_path / "notes.md").write_text("ignored")
+    (tmp_path / "existing.pcap").write_bytes(b"\xd4\xc3\xb2\xa1")
+    watcher = guard_watcher.GuardWatcher(str(tmp_path), rescan_seconds=0.3)
+    watcher.tracker = guard_watcher.StabilityTracker(stable_after=0.2, closed_stable_after=0.1)
+    app = QCoreApplication.instance() or QCoreApplication([])
+    thread = QThread()
+    watcher.moveToThread(thread)
+    ready = []
+    watcher.fileReady.connect(ready.append)
+    watcher.finished.connect(thread.quit)
+    thread.started.connect(watcher.run)
+    thread.start()
+    try:
+        (tmp_path / "new.txt").write_text("threads")
+        deadline = time.monotonic() + 10
+        while len(ready) < 2 and time.monotonic() < deadline: app.processEvents(); time.sleep(0.05)
+    finally:
+        watcher.stop(); thread.quit(); thread.wait(10000)
+    assert sorted(os.path.basename(p) for p in ready) == ["existing.pcap", "new.txt"]
+
+
+def test_watcher_without_notifications_polls_between_rescans(tmp_path: Path, monkeypatch):
+    monkeypatch.setattr(guard_watcher, "Observer", None)
+    monkeypatch.setattr(guard_watcher, "POLL_SECONDS", 0.1)
+    monkeypatch.setattr(guard_watcher, "TICK_SECONDS", 0.05)
+    watcher = guard_watcher.GuardWatcher(str(tmp_path), rescan_seconds=3600)
+    watcher.tracker = guard_watcher.StabilityTracker(stable_after=0.2, closed_stable_after=0.1)
+    app = QCoreApplication.instance() or QCoreApplication([])
+    thread = QThread()
+    watcher.moveToThread(thread)
+    ready = []
+    watcher.fileReady.connect(ready.append)
+    watcher.finished.connect(thread.quit)
+    thread.started.connect(watcher.run)
+    thread.start()
+    try:
+        time.sleep(0.3)
+        (tmp_path / "late.hprof").write_bytes(b"JAVA PROFILE 1.0.2\0")
+        deadline = time.monotonic() + 10
+        while not ready and time.monotonic() < deadline: app.processEvents(); time.sleep(0.05)
+    finally:
+        watcher.stop(); thread.quit(); thread.wait(10000)
+    assert [os.path.basename(p) for p in ready] == ["late.hprof"]
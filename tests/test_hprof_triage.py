@@ -0,0 +1,121 @@
+import importlib.util
+import struct
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+
+spec_ht = importlib.util.spec_from_file_location("hprof_triage", ROOT_DIR / "hprof_triage.py")
+hprof_triage = importlib.util.module_from_spec(spec_ht)
+# Worker processes look the scan function up by module name
+sys.modules["hprof_triage"] = hprof_triage
+spec_ht.loader.exec_module(hprof_triage)
+
+
+def _record(tag, body):
+    return struct.pack(">BII", tag, 0, len(body)) + body
+
+
+def _ids(*values):
+    return b"".join(struct.pack(">Q", v) for v in values)
+
+
+def _write_sample_hprof(path: Path):
+    strings = {1: "java/lang/String", 2: "[Ljava/lang/Object;", 3: "com/example/Cache", 4: "get", 5: "()V",
+               6: "Cache.java", 7: "main", 8: "java/lang/Object"}
+    out = b"JAVA PROFILE 1.0.2\0" + struct.pack(">IQ", 8, 0)
+    for sid, text in strings.items():
+        out += _record(0x01, _ids(sid) + text.encode())
+    for serial, (class_id, name_sid) in enumerate([(100, 1), (200, 2), (300, 3), (400, 8)], start=1):
+        out += _record(0x02, struct.pack(">I", serial) + _ids(class_id) + struct.pack(">I", 0) + _ids(name_sid))
+    out += _record(0x04, _ids(900, 4, 5, 6) + struct.pack(">Ii", 3, 42))
+    out += _record(0x05, struct.pack(">III", 1, 5, 1) + _ids(900))
+
+    class_dump = bytes([0x20]) + _ids(300) + struct.pack(">I", 0) + _ids(400, 0, 0, 0, 0, 0) + struct.pack(">I", 16)
+    class_dump += struct.pack(">H", 1) + struct.pack(">HB", 1, 10) + struct.pack(">i", 7)
+    class_dump += struct.pack(">H", 1) + _ids(4) + bytes([2]) + _ids(0)
+    class_dump += struct.pack(">H", 2) + _ids(5) + bytes([2]) + _ids(6) + bytes([10])
+
+    def instance(obj_id, class_id, nbytes):
+        return bytes([0x21]) + _ids(obj_id) + struct.pack(">I", 0) + _ids(class_id) + struct.pack(">I", nbytes) + b"\0" * nbytes
+
+    def byte_array(obj_id, data):
+        return bytes([0x23]) + _ids(obj_id) + struct.pack(">II", 0, len(data)) + bytes([8]) + data
+
+    segment_one = bytes([0xFF]) + _ids(1) + bytes([0x08]) + _ids(2) + struct.pack(">II", 5, 1) + class_dump
+    segment_one += instance(10, 100, 12) + instance(11, 300, 16) + byte_array(20, b"hello world")
+    segment_two = instance(12, 100, 12) + byte_array(21, b"hello world") + byte_array(22, b"unique")
+    segment_two += bytes([0x22]) + _ids(30) + struct.pack(">II", 0, 2) + _ids(200, 10, 12)
+    out += _record(0x1C, segment_one) + _record(0x1C, segment_two) + _record(0x2C, b"")
+    path.write_bytes(out)
+
+
+def test_histogram_traces_and_duplicates(tmp_path: Path):
+    hprof = tmp_path / "sample.hprof"
+    _write_sample_hprof(hprof)
+    result = hprof_triage.analyze_hprof(str(hprof), workers=1)
+
+    rows = {row["class"]: row for row in result["histogram"]}
+    assert rows["java.lang.String"]["instances"] == 2
+    assert rows["java.lang.String"]["shallow_bytes"] == 2 * 32  # 16 byte header + 12 bytes, aligned
+    assert rows["com.example.Cache"]["instances"] == 1
+    assert rows["java.lang.Object[]"]["instances"] == 1
+    assert rows["byte[]"]["instances"] == 3
+    assert result["total_objects"] == 7 and result["heap_segments"] == 2
+
+    dup = result["duplicate_strings"]
+    assert dup["duplicated_copies"] == 1
+    assert dup["top"][0]["preview"] == "hello world" and dup["top"][0]["copies"] == 2
+
+    assert result["stack_traces"] == [{"thread": "Thread serial 5", "trace_serial": 1, "frames": ["\tat com.example.Cache.get(Cache.java:42)"]}]
+    assert "com.example.Cache.get(Cache.java:42)" in hprof_triage.render_stack_traces(result)
+    assert "Duplicate strings" in hprof_triage.format_triage_report(result)
+
+
+def test_segments_scanned_in_parallel_match_sequential(tmp_path: Path):
+    hprof = tmp_path / "sample.hprof"
+    _write_sample_hprof(hprof)
+    sequential = hprof_triage.analyze_hprof(str(hprof), workers=1)
+    parallel = hprof_triage.analyze_hprof(str(hprof), workers=2, task_target_bytes=1)
+    assert parallel["worker_tasks"] == 2 and parallel["workers"] == 2
+    assert parallel["histogram"] == sequential["histogram"]
+    assert parallel["duplicate_strings"] == sequential["duplicate_strings"]
+
+
+def test_rejects_non_hprof(tmp_path: Path):
+    bogus = tmp_path / "bogus.hprof"
+    bogus.write_bytes(b"not a heap dump at all")
+    try:
+        hprof_triage.analyze_hprof(str(bogus), workers=1)
+    except hprof_triage.HprofFormatError:
+        pass
+    else:
+        raise AssertionError("expected HprofFormatError")
+
+
+def test_truncated_dump_is_reported_not_raised(tmp_path: Path):
+    hprof = tmp_path / "sample.hprof"
+    _write_sample_hprof(hprof)
+    data = hprof.read_bytes()
+    cut = tmp_path / "cut.hprof"
+    pos, cut_points = 31, []
+    while pos < len(data):
+        _, _, length = struct.unpack_from(">BII", data, pos)
+        # Cuts inside a record; at a record boundary the file is just a shorter, valid dump
+        cut_points += range(pos + 1, pos + 9 + length)
+        pos += 9 + length
+    for length in cut_points:
+        cut.write_bytes(data[:length])
+        assert hprof_triage.analyze_hprof(str(cut), workers=1)["truncated"], length
+    assert not hprof_triage.analyze_hprof(str(hprof), workers=1)["truncated"]
+
+
+def test_rejects_empty_file(tmp_path: Path):
+    empty = tmp_path / "empty.hprof"
+    empty.write_bytes(b"")
+    try:
+        hprof_triage.analyze_hprof(str(empty), workers=1)
+    except hprof_triage.HprofFormatError:
+        pass
+    else:
+        raise AssertionError("expected HprofFormatError")
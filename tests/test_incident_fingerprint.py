@@ -0,0 +1,64 @@
+import importlib.util
+import json
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+
+for name in ("thread_dump_parser", "incident_fingerprint"):
+    spec = importlib.util.spec_from_file_location(name, ROOT_DIR / f"{name}.py")
+    module = importlib.util.module_from_spec(spec)
+    sys.modules.setdefault(name, module)
+    spec.loader.exec_module(module)
+incident_fingerprint = sys.modules["incident_fingerprint"]
+
+CONVERSATIONS = """
+================================================================================
+TCP Conversations
+10.0.0.5:51234           <-> 10.0.0.9:5432               120 90 kB
+10.0.0.5:443             <-> 192.168.1.20:60001           80 40 kB
+"""
+
+
+def _blocked_groups(lambda_id):
+    return [{"state": "BLOCKED", "frames": [f"at com.acme.Cache.lambda$get$0(Cache.java:{40 + lambda_id})",
+                                            f"at com.acme.Cache$$Lambda${lambda_id}/0x000000080012ab40.apply(Unknown Source)",
+                                            "at com.acme.OrderService.load(OrderService.java:88)"]},
+            {"state": "RUNNABLE", "frames": ["at sun.nio.ch.EPoll.wait(Native Method)"]}]
+
+
+def _run(resultat, name, features, user_status="pending", analysis_type="threaddump"):
+    run_dir = resultat / name
+    run_dir.mkdir(parents=True)
+    (run_dir / "a.md").write_text("# Analysis Report\n\n### LLM Analysis:\nCache lock contention.", encoding="utf-8")
+    metadata = {"status": "completed_ok", "analysis_type": analysis_type, "user_status": user_status, "llm_analysis_file": "a.md",
+                "llm_generated_tags": ["ThreadContention"], "incident_fingerprint": incident_fingerprint.fingerprint(features)}
+    (run_dir / "run_metadata.json").write_text(json.dumps(metadata), encoding="utf-8")
+    return run_dir
+
+
+def test_features_ignore_line_numbers_generated_classes_and_client_ports():
+    first = incident_fingerprint.dominant_stacks(_blocked_groups(1))
+    assert first == incident_fingerprint.dominant_stacks(_blocked_groups(7)) and first[0].startswith("BLOCKED|")
+    talkers = incident_fingerprint.talker_features(CONVERSATIONS)
+    assert talkers == ["talker:10.0.0.5:*<->10.0.0.9:5432", "talker:10.0.0.5:443<->192.168.1.20:*"]
+    suspects = incident_fingerprint.suspect_chain_features("One instance of com.acme.cache.LruCache loaded by java.lang.ClassLoader holds com.acme.cache.LruCache")
+    assert suspects == ["suspect:com.acme.cache.LruCache", "suspect:java.lang.ClassLoader", "suspect_chain:com.acme.cache.LruCache>java.lang.ClassLoader"]
+    assert incident_fingerprint.fingerprint([]) is None
+
+
+def test_similar_resolved_runs_are_found_through_the_lsh_index(tmp_path: Path):
+    resultat = tmp_path / "Resultat"
+    base = [f"stack:BLOCKED|frame{i}" for i in range(20)]
+    _run(resultat, "resolved_twin", base + ["stack:extra"], user_status="resolved")
+    _run(resultat, "pending_twin", base)
+    _run(resultat, "unrelated", [f"stack:RUNNABLE|other{i}" for i in range(20)], user_status="resolved")
+    _run(resultat, "heap_twin", base, user_status="resolved", analysis_type="hprof")
+    index = incident_fingerprint.IncidentIndex(tmp_path / "incidents.db")
+    assert index.sync(resultat) == 4
+
+    signature = incident_fingerprint.minhash(base)
+    matches = index.find_similar(signature, "threaddump", resultat)
+    assert [m["run"] for m in matches] == ["resolved_twin"] and matches[0]["similarity"] >= 0.7
+    assert {m["run"] for m in index.find_similar(signature, "threaddump", resultat, resolved_only=False)} == {"resolved_twin", "pending_twin"}
+    assert incident_fingerprint.reusable_analysis(resultat / "resolved_twin") == ("Cache lock contention.", ["ThreadContention"])
@@ -0,0 +1,91 @@
+import errno
+import gzip
+import importlib.util
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+
+spec_ac = importlib.util.spec_from_file_location("analysis_cache", ROOT_DIR / "analysis_cache.py")
+analysis_cache = importlib.util.module_from_spec(spec_ac)
+spec_ac.loader.exec_module(analysis_cache)
+sys.modules.setdefault("analysis_cache", analysis_cache)
+
+spec_in = importlib.util.spec_from_file_location("ingest", ROOT_DIR / "ingest.py")
+ingest = importlib.util.module_from_spec(spec_in)
+spec_in.loader.exec_module(ingest)
+
+
+def test_supported_inputs_include_compressed_variants():
+    assert ingest.split_compression("/dumps/app.HPROF.gz") == ("app.HPROF", ".gz")
+    assert ingest.is_supported_input("capture.pcapng.zst")
+    assert ingest.is_supported_input("jstack.txt")
+    assert not ingest.is_supported_input("notes.gz")
+    assert "*.hprof.gz" in ingest.file_dialog_filter()
+
+
+def test_gzip_input_is_decompressed_and_hashed_in_one_pass(tmp_path: Path):
+    payload = b"JAVA PROFILE 1.0.2\0" + bytes(range(256)) * 5000
+    source = tmp_path / "heap.hprof.gz"
+    with gzip.open(source, "wb") as f:
+        f.write(payload)
+    run_dir = tmp_path / "run"
+    run_dir.mkdir()
+    dest, content_hash = ingest.ingest_file(source, run_dir, chunk_size=4096)
+    assert dest == run_dir / "heap.hprof"
+    assert dest.read_bytes() == payload
+    assert content_hash == analysis_cache.hash_file(dest)
+    assert sorted(p.name for p in run_dir.iterdir()) == ["heap.hprof"]
+
+
+def test_corrupt_archive_leaves_no_partial_file(tmp_path: Path):
+    source = tmp_path / "broken.pcap.gz"
+    source.write_bytes(b"\x1f\x8b\x08\x00garbage")
+    run_dir = tmp_path / "run"
+    run_dir.mkdir()
+    with pytest.raises(ingest.IngestError):
+        ingest.ingest_file(source, run_dir)
+    assert list(run_dir.iterdir()) == []
+
+
+@pytest.mark.parametrize("strategy, method", [("hardlink", "hard-linked"), ("copy", "copied"), ("move", "moved")])
+def test_place_input_strategies_hash_the_destination(tmp_path: Path, strategy, method):
+    source = tmp_path / "inbox" / "heap.hprof"
+    source.parent.mkdir()
+    source.write_bytes(b"JAVA PROFILE 1.0.2\0" + bytes(range(256)) * 100)
+    expected_hash = analysis_cache.hash_file(source)
+    run_dir = tmp_path / "run"
+    run_dir.mkdir()
+    dest, content_hash, used = ingest.place_input(source, run_dir, strategy)
+    assert (dest, content_hash, used) == (run_dir / "heap.hprof", expected_hash, method)
+    assert source.exists() == (strategy != "move")
+    if strategy == "hardlink": assert dest.stat().st_ino == source.stat().st_ino
+
+
+def test_place_input_falls_back_when_links_are_unsupported(tmp_path: Path, monkeypatch):
+    def cross_device(*args):
+        raise OSError(errno.EXDEV, "Invalid cross-device link")
+    monkeypatch.setattr(os, "link", cross_device)
+    monkeypatch.setattr(ingest, "KERNEL_COPY_CHUNK_SIZE", 1000)
+    source = tmp_path / "capture.pcap"
+    source.write_bytes(bytes(range(256)) * 20)
+    run_dir = tmp_path / "run"
+    run_dir.mkdir()
+    dest, content_hash, used = ingest.place_input(source, run_dir)
+    assert used in ("reflinked", "copied (copy_file_range)", "copied")
+    assert dest.read_bytes() == source.read_bytes() and content_hash == analysis_cache.hash_file(source)
+    assert sorted(p.name for p in run_dir.iterdir()) == ["capture.pcap"]
+    with pytest.raises(ingest.IngestError):
+        ingest.place_input(source, run_dir, "teleport")
+
+
+def test_known_hash_is_reused_for_links_but_not_copies(tmp_path: Path):
+    source = tmp_path / "heap.hprof"
+    source.write_bytes(b"JAVA PROFILE 1.0.2\0" + bytes(range(256)))
+    for strategy, expected in (("hardlink", "known"), ("copy", analysis_cache.hash_file(source))):
+        run_dir = tmp_path / strategy
+        run_dir.mkdir()
+        assert ingest.place_input(source, run_dir, strategy, content_hash="known")[1] == expected
@@ -0,0 +1,45 @@
+import importlib.util
+import json
+import shutil
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+
+spec_ii = importlib.util.spec_from_file_location("input_index", ROOT_DIR / "input_index.py")
+input_index = importlib.util.module_from_spec(spec_ii)
+spec_ii.loader.exec_module(input_index)
+
+
+def _make_run(resultat, name, content_hash, status="completed_ok", size=None):
+    run_dir = resultat / name
+    run_dir.mkdir(parents=True)
+    (run_dir / "heap.hprof").write_bytes(b"x" * 10)
+    metadata = {"input_file": "heap.hprof", "analysis_type": "hprof", "status": status, "input_content_hash": content_hash}
+    if size is not None: metadata["input_size_bytes"] = size
+    (run_dir / "run_metadata.json").write_text(json.dumps(metadata), encoding="utf-8")
+    return run_dir
+
+
+def test_completed_runs_are_found_by_content_and_size(tmp_path: Path):
+    resultat = tmp_path / "Resultat"
+    _make_run(resultat, "heap_1", "abc")
+    _make_run(resultat, "heap_2", "abc", status="failed_llm")
+    _make_run(resultat, "other_1", "def", size=99)
+    index = input_index.InputIndex(tmp_path / "index.db")
+
+    # Size falls back to the input file when the metadata predates input_size_bytes
+    assert index.sync(resultat) == 2
+    assert index.has_size(10) and not index.has_size(11)
+    assert index.find("abc", 10, resultat) == "heap_1"
+    assert index.find("abc", 11, resultat) is None and index.find("def", 99, resultat) == "other_1"
+
+    # The failed run is looked at again once it completes; the deleted one is forgotten
+    (resultat / "heap_2" / "run_metadata.json").write_text(json.dumps({"input_file": "heap.hprof", "status": "completed_ok", "input_content_hash": "abc", "input_size_bytes": 10}), encoding="utf-8")
+    shutil.rmtree(resultat / "other_1")
+    assert index.sync(resultat) == 1 and not index.has_size(99)
+
+    # A run folder removed behind the index's back is skipped and dropped on lookup
+    shutil.rmtree(resultat / "heap_2")
+    assert index.find("abc", 10, resultat) == "heap_1"
+    shutil.rmtree(resultat / "heap_1")
+    assert index.find("abc", 10, resultat) is None and not index.has_size(10)
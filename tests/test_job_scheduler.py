@@ -0,0 +1,97 @@
+import importlib.util
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+
+for name in ("analysis_cache", "ingest", "job_queue", "job_scheduler"):
+    spec = importlib.util.spec_from_file_location(name, ROOT_DIR / f"{name}.py")
+    module = importlib.util.module_from_spec(spec)
+    sys.modules.setdefault(name, module)
+    spec.loader.exec_module(module)
+job_queue = sys.modules["job_queue"]
+job_scheduler = sys.modules["job_scheduler"]
+
+
+def test_slot_classes_and_costs():
+    assert job_scheduler.slot_for_file("a.hprof") == job_scheduler.SLOT_HEAVY
+    assert job_scheduler.slot_for_file("cap.PCAPNG.gz") == job_scheduler.SLOT_MEDIUM
+    assert job_scheduler.slot_for_file("jstack.txt") == job_scheduler.SLOT_LIGHT
+    assert job_scheduler.estimate_cost("a.hprof", 100) == 1000
+    assert job_scheduler.estimate_cost("t.txt.zst", 100) == 500
+    assert job_scheduler.normalise_slots({"heavy": 0, "light": "8", "bogus": 3}) == {"heavy": 1, "medium": 2, "light": 8}
+
+
+def test_text_jobs_do_not_wait_behind_a_heap_dump():
+    scheduler = job_scheduler.JobScheduler({"heavy": 1, "medium": 1, "light": 2})
+    big = scheduler.submit("big.hprof", size=10_000)
+    small = scheduler.submit("small.hprof", size=50)
+    texts = [scheduler.submit(f"t{i}.txt", size=size) for i, size in enumerate((300, 100, 200))]
+
+    started = []
+    while (job := scheduler.next_runnable()): started.append(job["id"])
+    # One heavy slot goes to the smaller dump, both light slots to the two shortest thread dumps
+    assert started == [texts[1]["id"], texts[2]["id"], small["id"]]
+    assert scheduler.counts()["running"] == 3 and scheduler.free_slots("light") == 0
+
+    scheduler.finish(texts[1]["id"])
+    assert scheduler.next_runnable()["id"] == texts[0]["id"]
+    scheduler.finish(small["id"], job_scheduler.STATE_FAILED)
+    assert scheduler.next_runnable()["id"] == big["id"]
+    assert scheduler.next_runnable() is None and not scheduler.is_idle()
+
+    for job_id in (big["id"], texts[0]["id"], texts[2]["id"]): scheduler.finish(job_id)
+    assert scheduler.is_idle() and scheduler.finish(big["id"]) is None
+    assert len(scheduler.clear_finished()) == 5 and scheduler.jobs == {}
+
+
+def test_queue_survives_restart_with_priorities_cancel_and_retry(tmp_path: Path):
+    db = tmp_path / "queue.db"
+    scheduler = job_scheduler.JobScheduler({"light": 1}, job_queue.JobQueue(db))
+    first, second, third = (scheduler.submit(f"t{i}.txt", size=10) for i in range(3))
+    assert scheduler.move_to_front(third["id"])["priority"] == 1
+    assert scheduler.next_runnable()["id"] == third["id"]
+    third["run_dir"] = "/runs/t2"; scheduler.save(third)
+    scheduler.cancel(second["id"])
+    assert scheduler.set_priority(second["id"], 5) is None
+
+    # Crash: the running job is requeued as a second attempt, the queued one kept, the cancelled one not restored
+    restored = job_scheduler.JobScheduler({"light": 1}, job_queue.JobQueue(db))
+    requeued, failed = restored.restore()
+    assert [(j["id"], j["attempts"], j["run_dir"]) for j in requeued] == [(first["id"], 0, None), (third["id"], 1, "/runs/t2")]
+    assert failed == [] and restored.submit("t3.txt")["id"] == "job-4"
+    assert restored.next_runnable()["id"] == third["id"]
+    restored.finish(third["id"], job_scheduler.STATE_FAILED)
+    assert restored.retry(third["id"], argv=["--resume", "--run-dir", "/runs/t2"])["attempts"] == 2
+    assert restored.active_for_path("t2.txt")["state"] == job_scheduler.STATE_QUEUED
+
+    # Interrupted a third time: given up on
+    restored.next_runnable(); restored.next_runnable()
+    _, failed = job_scheduler.JobScheduler(store=job_queue.JobQueue(db)).restore()
+    assert [j["id"] for j in failed] == [third["id"]]
+    assert job_queue.JobQueue(db).load(job_scheduler.FINISHED_STATES)[-1]["state"] == job_scheduler.STATE_FAILED
+
+
+def test_duplicate_link_is_persisted(tmp_path: Path):
+    db = tmp_path / "queue.db"
+    scheduler = job_scheduler.JobScheduler(store=job_queue.JobQueue(db))
+    job = scheduler.submit("heap.hprof", size=10)
+    scheduler.next_runnable()
+    job["duplicate_of"] = "heap_20240101-120000"
+    scheduler.finish(job["id"], job_scheduler.STATE_DUPLICATE)
+    assert job_queue.read_entries(db)[0]["duplicate_of"] == "heap_20240101-120000"
+    assert scheduler.retry(job["id"])["duplicate_of"] is None
+    assert job_queue.read_entries(db)[0]["duplicate_of"] is None
+
+
+def test_job_numbers_are_not_reused_and_readers_do_not_write(tmp_path: Path):
+    db = tmp_path / "queue.db"
+    assert job_queue.read_entries(db) == [] and not db.exists()
+    scheduler = job_scheduler.JobScheduler(store=job_queue.JobQueue(db))
+    for name in ("a.txt", "b.txt"): scheduler.finish(scheduler.submit(name)["id"])
+    scheduler.clear_finished()
+    assert job_scheduler.JobScheduler(store=job_queue.JobQueue(db)).submit("c.txt")["id"] == "job-3"
+
+    before = db.stat().st_mtime_ns
+    assert [job["id"] for job in job_queue.read_entries(db)] == ["job-3"]
+    assert db.stat().st_mtime_ns == before
@@ -0,0 +1,62 @@
+import importlib.util
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+
+spec_tp = importlib.util.spec_from_file_location("thread_dump_parser", ROOT_DIR / "thread_dump_parser.py")
+thread_dump_parser = importlib.util.module_from_spec(spec_tp)
+spec_tp.loader.exec_module(thread_dump_parser)
+
+spec_lg = importlib.util.spec_from_file_location("lock_graph", ROOT_DIR / "lock_graph.py")
+lock_graph = importlib.util.module_from_spec(spec_lg)
+spec_lg.loader.exec_module(lock_graph)
+
+
+def _thread(name, tid, state, frames):
+    header = f'"{name}" #1 prio=5 os_prio=0 tid={tid} nid=0x1 waiting\n   java.lang.Thread.State: {state}\n'
+    return header + "".join(f"\t{line}\n" for line in frames) + "\n"
+
+
+def _analyze(text):
+    builder = lock_graph.LockGraphBuilder()
+    for record in thread_dump_parser.iter_thread_records(text.splitlines()):
+        builder.add(record)
+    return builder.analyze()
+
+
+def test_detects_monitor_and_ownable_synchronizer_deadlock():
+    dump = _thread("A", "0x1", "BLOCKED (on object monitor)", [
+        "at com.example.A.run(A.java:1)", "- waiting to lock <0x10> (a java.lang.Object)",
+        "at com.example.A.outer(A.java:2)", "- locked <0x20> (a java.lang.Object)"])
+    dump += _thread("B", "0x2", "WAITING (parking)", [
+        "at jdk.internal.misc.Unsafe.park(Native Method)",
+        "- parking to wait for  <0x30> (a java.util.concurrent.locks.ReentrantLock$NonfairSync)",
+        "at com.example.B.run(B.java:1)", "- locked <0x10> (a java.lang.Object)"])
+    dump += _thread("C", "0x3", "BLOCKED (on object monitor)", [
+        "at com.example.C.run(C.java:1)", "- waiting to lock <0x20> (a java.lang.Object)"])
+    dump = dump.rstrip("\n") + "\n\n   Locked ownable synchronizers:\n\t- <0x30> (a java.util.concurrent.locks.ReentrantLock$NonfairSync)\n"
+
+    findings = _analyze(dump)
+    assert len(findings["deadlocks"]) == 1
+    assert sorted(edge["thread"] for edge in findings["deadlocks"][0]) == ["A", "B", "C"]
+    assert "Deadlock" in findings["tags"]
+    assert "Deadlock 1:" in lock_graph.format_lock_findings(findings)
+
+
+def test_contention_without_deadlock_and_object_wait_is_not_ownership():
+    dump = _thread("owner", "0x1", "RUNNABLE", ["at com.example.Cache.put(Cache.java:1)", "- locked <0xaa> (a com.example.Cache)"])
+    for i in range(3):
+        dump += _thread(f"worker-{i}", f"0x{i + 10}", "BLOCKED (on object monitor)", [
+            "at com.example.Cache.get(Cache.java:2)", "- waiting to lock <0xaa> (a com.example.Cache)"])
+    dump += _thread("waiter", "0x20", "WAITING (on object monitor)", [
+        "at java.lang.Object.wait(Native Method)", "- waiting on <0xbb> (a java.lang.Object)",
+        "at com.example.Queue.take(Queue.java:3)", "- locked <0xbb> (a java.lang.Object)"])
+    dump += _thread("poller", "0x21", "BLOCKED (on object monitor)", [
+        "at com.example.Queue.put(Queue.java:4)", "- waiting to lock <0xbb> (a java.lang.Object)"])
+
+    findings = _analyze(dump)
+    assert findings["deadlocks"] == []
+    top = findings["contended_monitors"][0]
+    assert (top["lock"], top["waiters"], top["owner"]) == ("0xaa", 3, "owner")
+    assert next(m for m in findings["contended_monitors"] if m["lock"] == "0xbb")["owner"] is None
+    assert findings["tags"] == ["ThreadContention", "BlockedThreads"]
@@ -0,0 +1,47 @@
+import importlib.util
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+
+spec_rm = importlib.util.spec_from_file_location("resource_monitor", ROOT_DIR / "resource_monitor.py")
+resource_monitor = importlib.util.module_from_spec(spec_rm)
+spec_rm.loader.exec_module(resource_monitor)
+sys.modules.setdefault("resource_monitor", resource_monitor)
+
+spec_ma = importlib.util.spec_from_file_location("memory_admission", ROOT_DIR / "memory_admission.py")
+memory_admission = importlib.util.module_from_spec(spec_ma)
+spec_ma.loader.exec_module(memory_admission)
+
+MB = memory_admission.MB
+
+
+def test_heap_is_sized_from_dump_and_capped_by_physical_memory(monkeypatch):
+    assert memory_admission.estimate_mat_heap_mb(10 * MB) == memory_admission.MIN_MAT_HEAP_MB
+    assert memory_admission.estimate_mat_heap_mb(8192 * MB) == 10240
+    assert memory_admission.estimate_mat_heap_mb(8192 * MB, index_cached=True) == 6144
+    monkeypatch.setattr(memory_admission.os.path, "getsize", lambda path: 20 * 1024 * MB)
+    assert memory_admission.choose_mat_heap_mb("big.hprof", total_mb=16384) == 16384 - 2048 - 512
+
+
+def test_jobs_wait_while_another_reservation_holds_the_memory(tmp_path: Path):
+    sleeper = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(30)"])
+    try:
+        reservations = tmp_path / memory_admission.RESERVATIONS_FILE
+        reservations.write_text(json.dumps({str(sleeper.pid): {"mb": 10 ** 9, "label": "other", "since": 0}}))
+        assert not memory_admission.try_reserve(1024, "mine", admission_dir=tmp_path)
+    finally:
+        sleeper.kill(); sleeper.wait()
+    # Reservations of processes that have exited are dropped
+    assert memory_admission.try_reserve(1024, "mine", admission_dir=tmp_path)
+    assert list(json.loads(reservations.read_text())) == [str(os.getpid())]
+    memory_admission.release(admission_dir=tmp_path)
+    assert json.loads(reservations.read_text()) == {}
+
+
+def test_peak_rss_sampler_reports_memory_of_process_tree():
+    sampler = resource_monitor.PeakRssSampler(os.getpid(), interval_seconds=0.01).start()
+    assert sampler.stop() > 0
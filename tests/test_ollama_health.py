@@ -0,0 +1,50 @@
+import importlib.util
+import itertools
+import json
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT_DIR))
+
+spec_oh = importlib.util.spec_from_file_location("ollama_health", ROOT_DIR / "ollama_health.py")
+ollama_health = importlib.util.module_from_spec(spec_oh)
+spec_oh.loader.exec_module(ollama_health)
+
+
+class _FakeOllama(BaseHTTPRequestHandler):
+    routes = {"/api/tags": {"models": [{"name": "mistral:latest"}, {"name": "llama3:8b"}]},
+              "/api/ps": {"models": [{"name": "llama3:8b"}]}}
+
+    def do_GET(self):
+        body = self.routes.get(self.path)
+        self.send_response(200 if body is not None else 404)
+        self.end_headers()
+        if body is not None: self.wfile.write(json.dumps(body).encode())
+
+    def log_message(self, *args):
+        pass
+
+
+def test_probe_reports_installed_and_loaded_models():
+    server = HTTPServer(("127.0.0.1", 0), _FakeOllama)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        status = ollama_health.probe(f"http://127.0.0.1:{server.server_port}")
+    finally:
+        server.shutdown(); server.server_close()
+    assert status["ok"] and status["error"] is None
+    assert status["models"] == ["llama3:8b", "mistral:latest"]
+    assert status["loaded"] == ["llama3:8b"]
+    assert status["latency_ms"] >= 0
+
+    # Nothing listening any more
+    down = ollama_health.probe(f"http://127.0.0.1:{server.server_port}", timeout=1)
+    assert not down["ok"] and down["error"] and down["models"] == []
+
+
+def test_backoff_doubles_up_to_the_cap():
+    delays = list(itertools.islice(ollama_health.backoff_delays(0.5, 2, 4), 6))
+    assert delays == [0.5, 1, 2, 4, 4, 4]
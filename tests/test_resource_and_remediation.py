@@ -1,4 +1,5 @@
 import json
+import time
 from pathlib import Path
 import importlib.util
 
@@ -35,6 +36,19 @@ def test_collect_metrics_periodically(tmp_path: Path):
 
 
 
+def test_metrics_sampler_keeps_a_ring_buffer_and_writes_in_batches(tmp_path: Path):
+    out_file = tmp_path / "run" / "metrics.jsonl"
+    sampler = resource_monitor.MetricsSampler(out_file, interval_seconds=0.005, buffer_size=4, flush_every=1000).start()
+    time.sleep(0.2)
+    # Nothing is written until a batch is full or the sampler stops
+    assert not out_file.exists()
+    kept = sampler.stop()
+    lines = [json.loads(line) for line in out_file.read_text().splitlines()]
+    assert len(kept) == 4 and len(lines) >= 6 and lines[-4:] == kept
+    assert all(0.0 <= m["cpu_percent"] <= 100.0 and "_cpu" not in m for m in lines)
+    assert "net_recv_per_s" in lines[1] and sampler.latest() == kept[-1]
+
+
 def test_generate_remediation(tmp_path: Path):
     out_file = tmp_path / "rem.json"
     suggestions = generate_remediation(["OutdatedPackages", "Unknown"], out_file)
@@ -0,0 +1,49 @@
+import importlib.util
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+
+spec_ac = importlib.util.spec_from_file_location("analysis_cache", ROOT_DIR / "analysis_cache.py")
+analysis_cache = importlib.util.module_from_spec(spec_ac)
+spec_ac.loader.exec_module(analysis_cache)
+sys.modules.setdefault("analysis_cache", analysis_cache)
+
+spec_rm = importlib.util.spec_from_file_location("run_manifest", ROOT_DIR / "run_manifest.py")
+run_manifest = importlib.util.module_from_spec(spec_rm)
+spec_rm.loader.exec_module(run_manifest)
+
+
+def test_artifacts_are_recorded_and_reloaded(tmp_path: Path):
+    report_dir = tmp_path / "dump_Leak_Suspects"
+    report_dir.mkdir()
+    (report_dir / "index.html").write_text("<html></html>")
+    (tmp_path / "dump.threads").write_text("thread dump")
+
+    manifest = run_manifest.RunManifest(tmp_path)
+    manifest.add(run_manifest.ROLE_MAT_REPORT, report_dir / "index.html", key="org.eclipse.mat.api:suspects")
+    entry = manifest.add(run_manifest.ROLE_THREADS, "dump.threads")
+    assert entry == {"role": "threads", "key": None, "path": "dump.threads", "size": 11,
+                     "hash": analysis_cache.hash_file(tmp_path / "dump.threads")}
+
+    reloaded = run_manifest.RunManifest.load(tmp_path)
+    assert reloaded.get(run_manifest.ROLE_MAT_REPORT, "org.eclipse.mat.api:suspects")["path"] == "dump_Leak_Suspects/index.html"
+    assert reloaded.path(run_manifest.ROLE_THREADS) == tmp_path / "dump.threads"
+    assert reloaded.path(run_manifest.ROLE_ANALYSIS_MD) is None
+    assert len(reloaded.entries()) == 2
+
+
+def test_missing_outside_and_large_files(tmp_path: Path, monkeypatch):
+    run_dir = tmp_path / "run"
+    run_dir.mkdir()
+    outside = tmp_path / "elsewhere.txt"
+    outside.write_text("x")
+    manifest = run_manifest.RunManifest(run_dir)
+    assert manifest.add(run_manifest.ROLE_INPUT, "missing.hprof") is None
+    assert manifest.add(run_manifest.ROLE_INPUT, outside) is None
+
+    monkeypatch.setattr(run_manifest, "HASH_SIZE_LIMIT", 4)
+    (run_dir / "big.hprof").write_bytes(b"0123456789")
+    assert manifest.add(run_manifest.ROLE_INPUT, "big.hprof")["hash"] is None
+    assert manifest.add(run_manifest.ROLE_INPUT, "big.hprof", content_hash="known")["hash"] == "known"
+    assert run_manifest.RunManifest.load(tmp_path) is None
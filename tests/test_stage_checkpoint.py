@@ -0,0 +1,62 @@
+import importlib.util
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+
+spec_sc = importlib.util.spec_from_file_location("stage_checkpoint", ROOT_DIR / "stage_checkpoint.py")
+stage_checkpoint = importlib.util.module_from_spec(spec_sc)
+spec_sc.loader.exec_module(stage_checkpoint)
+
+
+def test_resume_reuses_completed_stages_and_reruns_failed(tmp_path: Path):
+    calls = []
+
+    def parse():
+        calls.append("parse"); metadata["thread_dump_json"] = "td_threads.json"; return ["compact text", None]
+
+    metadata = {"status": "started"}
+    first = stage_checkpoint.StageCheckpoints(tmp_path, metadata)
+    assert first.run("threads_extraction", parse) == ["compact text", None]
+    assert first.run("llm_call", lambda: calls.append("llm") or None, key="k1", succeeded=bool) is None
+    assert metadata["stage_status"] == {"threads_extraction": "completed", "llm_call": "failed"}
+
+    metadata = {"status": "started"}
+    resumed = stage_checkpoint.StageCheckpoints(tmp_path, metadata, resume=True)
+    text, _ = resumed.run("threads_extraction", parse)
+    answer = resumed.run("llm_call", lambda: calls.append("llm") or "analysis", key="k1", succeeded=bool)
+    assert (text, answer) == ("compact text", "analysis")
+    assert metadata["thread_dump_json"] == "td_threads.json"
+    assert metadata["stage_status"] == {"threads_extraction": "reused", "llm_call": "completed"}
+    assert calls == ["parse", "llm", "llm"]
+
+
+def test_changed_key_or_fresh_run_invalidates_checkpoint(tmp_path: Path):
+    calls = []
+    stage_checkpoint.StageCheckpoints(tmp_path, {}).run("mat", lambda: calls.append(1) or {"a": "dir"}, key=["suspects"])
+    stage_checkpoint.StageCheckpoints(tmp_path, {}, resume=True).run("mat", lambda: calls.append(2) or {}, key=("suspects", "dominator"))
+    stage_checkpoint.StageCheckpoints(tmp_path, {}).run("mat", lambda: calls.append(3) or {}, key=("suspects", "dominator"))
+    assert calls == [1, 2, 3]
+
+
+def test_failing_stage_is_recorded_and_reraised(tmp_path: Path):
+    metadata = {}
+    checkpoints = stage_checkpoint.StageCheckpoints(tmp_path, metadata)
+
+    def boom():
+        raise RuntimeError("MAT died")
+
+    try:
+        checkpoints.run("mat", boom)
+    except RuntimeError:
+        pass
+    else:
+        raise AssertionError("expected RuntimeError")
+    assert metadata["stage_status"]["mat"] == "failed"
+    assert checkpoints.completed("mat") is None
+
+
+def test_args_round_trip_without_per_invocation_flags(tmp_path: Path):
+    assert not stage_checkpoint.is_resumable(tmp_path)
+    stage_checkpoint.save_args(tmp_path, {"input_file": "x.hprof", "model": "m", "resume": True, "ingest_seconds": 1.0})
+    assert stage_checkpoint.is_resumable(tmp_path)
+    assert stage_checkpoint.load_args(tmp_path) == {"input_file": "x.hprof", "model": "m"}
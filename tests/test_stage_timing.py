@@ -0,0 +1,99 @@
+import importlib.util
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+
+spec_rm = importlib.util.spec_from_file_location("resource_monitor", ROOT_DIR / "resource_monitor.py")
+resource_monitor = importlib.util.module_from_spec(spec_rm)
+spec_rm.loader.exec_module(resource_monitor)
+sys.modules.setdefault("resource_monitor", resource_monitor)
+
+spec_pe = importlib.util.spec_from_file_location("progress_events", ROOT_DIR / "progress_events.py")
+progress_events = importlib.util.module_from_spec(spec_pe)
+spec_pe.loader.exec_module(progress_events)
+
+spec_st = importlib.util.spec_from_file_location("stage_timing", ROOT_DIR / "stage_timing.py")
+stage_timing = importlib.util.module_from_spec(spec_st)
+spec_st.loader.exec_module(stage_timing)
+
+
+def test_stages_record_wall_cpu_and_rss_in_order():
+    timer = stage_timing.StageTimer()
+    timer.record("ingest", 1.5)
+    with timer.stage("parse"):
+        sum(i * i for i in range(200000))
+    with timer.stage("llm_call"):
+        time.sleep(0.05)
+    with timer.stage("parse"):
+        pass
+
+    assert list(timer.stages) == ["ingest", "parse", "llm_call"]
+    assert timer.stages["ingest"] == {"wall_seconds": 1.5, "cpu_seconds": None, "peak_rss_mb": None}
+    assert timer.stages["parse"]["cpu_seconds"] > 0 and timer.stages["parse"]["peak_rss_mb"] > 0
+    assert timer.stages["llm_call"]["wall_seconds"] >= 0.05
+    assert timer.total_wall_seconds() >= 1.55
+
+
+def test_stage_is_recorded_when_it_raises():
+    timer = stage_timing.StageTimer()
+    try:
+        with timer.stage("mat_parse"):
+            raise RuntimeError("MAT failed")
+    except RuntimeError:
+        pass
+    assert "mat_parse" in timer.stages
+
+
+def test_aggregate_stage_timings():
+    runs = [{"llm_call": {"wall_seconds": 10.0, "cpu_seconds": 0.5, "peak_rss_mb": 80}, "ingest": {"wall_seconds": 1.0, "cpu_seconds": None, "peak_rss_mb": None}},
+            {"llm_call": {"wall_seconds": 30.0, "cpu_seconds": 1.5, "peak_rss_mb": 120}},
+            {}]
+    rows = stage_timing.aggregate_stage_timings(runs)
+    assert [row["stage"] for row in rows] == ["llm_call", "ingest"]
+    llm = rows[0]
+    assert llm["runs"] == 2 and llm["mean_wall_seconds"] == 20.0 and llm["p95_wall_seconds"] == 30.0
+    assert llm["mean_cpu_seconds"] == 1.0 and llm["max_peak_rss_mb"] == 120
+    assert rows[1]["mean_cpu_seconds"] is None
+
+
+def test_stage_events_and_throttled_progress_reach_the_sink():
+    events = []
+    progress = progress_events.ProgressReporter(events.append, min_interval=60)
+    timer = stage_timing.StageTimer(progress=progress)
+    with timer.stage("input_hash"):
+        report = progress.bytes_callback("input_hash", total_bytes=200)
+        report(50); report(100)
+        progress.update("input_hash", bytes_done=200, total_bytes=200, force=True)
+    assert [e["kind"] for e in events] == ["stage", "progress", "progress", "stage"]
+    assert events[1] == {"kind": "progress", "stage": "input_hash", "percent": 25.0, "bytes": 50, "total_bytes": 200}
+    assert events[2]["percent"] == 100.0 and events[3]["status"] == "finished"
+    assert progress_events.ProgressReporter().bytes_callback("input_hash") is None
+
+
+def test_eta_from_past_stage_timings():
+    runs = [{"ingest": {"wall_seconds": 1}, "mat_parse": {"wall_seconds": 100}, "llm_call": {"wall_seconds": 20}},
+            {"ingest": {"wall_seconds": 3}, "hprof_triage": {"wall_seconds": 4}, "mat_parse": {"wall_seconds": 60}, "llm_call": {"wall_seconds": 40}}]
+    profile = stage_timing.stage_profile(runs)
+    assert list(profile) == ["ingest", "hprof_triage", "mat_parse", "llm_call"]
+    assert profile["mat_parse"] == 80
+    assert stage_timing.estimate_remaining_seconds(profile) == 2 + 4 + 80 + 30
+    # 20s into MAT without a percent: its typical remainder plus the LLM call; triage was skipped
+    assert stage_timing.estimate_remaining_seconds(profile, "mat_parse", 20.0, started_stages=["ingest"]) == 60 + 30
+    # A measured percent wins over the typical duration
+    assert stage_timing.estimate_remaining_seconds(profile, "mat_parse", 20.0, 50.0) == 20 + 30
+    assert stage_timing.estimate_remaining_seconds({}, "mat_parse") is None
+
+
+def test_recent_timings_reads_newest_completed_runs_of_a_type(tmp_path: Path):
+    for i, (analysis_type, status) in enumerate([("hprof", "completed_ok"), ("hprof", "failed_llm"), ("threaddump", "completed_ok"), ("hprof", "completed_ok")]):
+        run_dir = tmp_path / f"run{i}"
+        run_dir.mkdir()
+        (run_dir / "run_metadata.json").write_text(json.dumps({"analysis_type": analysis_type, "status": status, "timings": {"llm_call": {"wall_seconds": i}}}))
+        os.utime(run_dir, (1000 + i, 1000 + i))
+    assert stage_timing.recent_timings(tmp_path, "hprof", 5) == [{"llm_call": {"wall_seconds": 3}}, {"llm_call": {"wall_seconds": 0}}]
+    assert stage_timing.recent_timings(tmp_path, "hprof", 1) == [{"llm_call": {"wall_seconds": 3}}]
+    assert stage_timing.run_timings(tmp_path / "run1") is None and stage_timing.recent_timings(tmp_path / "missing", "hprof", 5) == []
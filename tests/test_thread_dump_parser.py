@@ -0,0 +1,109 @@
+import importlib.util
+import json
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+
+spec_tp = importlib.util.spec_from_file_location("thread_dump_parser", ROOT_DIR / "thread_dump_parser.py")
+thread_dump_parser = importlib.util.module_from_spec(spec_tp)
+spec_tp.loader.exec_module(thread_dump_parser)
+
+JSTACK_SAMPLE = """2024-01-01 10:00:00
+Full thread dump OpenJDK 64-Bit Server VM (17.0.2+8 mixed mode):
+
+"worker-1" #12 daemon prio=5 os_prio=0 cpu=1.00ms elapsed=10.00s tid=0x00007f0001 nid=0x101 waiting for monitor entry  [0x0000]
+   java.lang.Thread.State: BLOCKED (on object monitor)
+\tat com.example.Cache.get(Cache.java:42)
+\t- waiting to lock <0x00000000aa> (a java.lang.Object)
+\tat com.example.Handler.run(Handler.java:10)
+
+"worker-2" #13 prio=5 os_prio=0 cpu=1.00ms elapsed=10.00s tid=0x00007f0002 nid=0x102 runnable  [0x0000]
+   java.lang.Thread.State: RUNNABLE
+\tat com.example.Cache.put(Cache.java:50)
+\t- locked <0x00000000aa> (a java.lang.Object)
+
+   Locked ownable synchronizers:
+\t- <0x00000000bb> (a java.util.concurrent.locks.ReentrantLock$NonfairSync)
+
+"VM Thread" os_prio=0 cpu=5.00ms elapsed=10.00s tid=0x00007f0003 nid=0x103 runnable
+
+Found one Java-level deadlock:
+=============================
+"worker-1":
+  waiting to lock monitor 0x0000 (object 0x00000000aa, a java.lang.Object),
+  which is held by "worker-2"
+
+Java stack information for the threads listed above:
+===================================================
+"worker-1":
+\tat com.example.Cache.get(Cache.java:42)
+"""
+
+MAT_SAMPLE = """Thread 0x7e4a1c8a8
+  at java.lang.Object.wait(J)V (Native Method)
+  at java.lang.ref.ReferenceQueue.remove(J)Ljava/lang/ref/ReferenceQueue$Reference; (ReferenceQueue.java:155)
+  locals:
+    objectId=0x7e4a1c9e0, line=1
+
+Thread 0x7e4a1c000
+  at java.lang.Thread.run()V (Thread.java:829)
+"""
+
+
+def test_parses_jstack_threads_and_ignores_deadlock_report():
+    records = list(thread_dump_parser.iter_thread_records(JSTACK_SAMPLE.splitlines(True)))
+    assert [r["name"] for r in records] == ["worker-1", "worker-2", "VM Thread"]
+    blocked, runnable, vm = records
+    assert blocked["state"] == "BLOCKED" and blocked["daemon"] is True and blocked["tid"] == "0x00007f0001"
+    assert blocked["waiting_on"] == {"id": "0x00000000aa", "class": "java.lang.Object", "kind": "lock"}
+    assert blocked["frames"] == ["com.example.Cache.get(Cache.java:42)", "com.example.Handler.run(Handler.java:10)"]
+    assert [lock["id"] for lock in runnable["held_locks"]] == ["0x00000000aa", "0x00000000bb"]
+    assert vm["state"] == "RUNNABLE" and vm["frames"] == []
+
+
+def test_parses_mat_threads_format():
+    records = list(thread_dump_parser.iter_thread_records(MAT_SAMPLE.splitlines(True)))
+    assert [r["tid"] for r in records] == ["0x7e4a1c8a8", "0x7e4a1c000"]
+    assert len(records[0]["frames"]) == 2
+
+
+def test_write_threads_json_and_bounded_render(tmp_path: Path):
+    dump = tmp_path / "dump.txt"
+    dump.write_text(JSTACK_SAMPLE * 50, encoding="utf-8")
+    out = tmp_path / "dump_threads.json"
+    summary = thread_dump_parser.write_threads_json(dump, out)
+    assert summary["thread_count"] == 150
+    assert summary["state_counts"] == {"BLOCKED": 50, "RUNNABLE": 100}
+    doc = json.loads(out.read_text(encoding="utf-8"))
+    assert len(doc["threads"]) == 150 and doc["summary"] == summary
+
+    text = thread_dump_parser.render_thread_records(doc["threads"], max_chars=500)
+    assert len(text) < 1000
+    assert "more thread(s) omitted" in text
+
+
+def test_identical_stacks_are_grouped_and_interesting_groups_first():
+    parked = ('"pool-1-thread-%d" #%d prio=5 tid=0x%x nid=0x1 waiting on condition\n'
+              '   java.lang.Thread.State: WAITING (parking)\n'
+              '\tat jdk.internal.misc.Unsafe.park(java.base@17/Native Method)\n'
+              '\t- parking to wait for  <0x00000000c%d> (a java.util.concurrent.locks.AbstractQueuedSynchronizer$ConditionObject)\n'
+              '\tat java.util.concurrent.LinkedBlockingQueue.take(LinkedBlockingQueue.java:%d)\n\n')
+    dump = "".join(parked % (i, i, i, i, 400 + i) for i in range(30)) + JSTACK_SAMPLE
+    grouper = thread_dump_parser.StackSignatureGrouper()
+    for record in thread_dump_parser.iter_thread_records(dump.splitlines(True)):
+        grouper.add(record)
+    groups = grouper.ranked_groups()
+    # The 30 parked workers differ only in lock address and line number
+    assert sum(g["count"] for g in groups) == 33 and len(groups) == 4
+    assert groups[0]["state"] == "BLOCKED"
+    assert groups[1]["contended_locks"][0]["id"] == "0x00000000aa"
+    assert groups[2]["count"] == 30
+
+    text = thread_dump_parser.render_stack_groups(groups)
+    assert "30 threads in WAITING share this stack" in text
+    assert text.index("BLOCKED") < text.index("30 threads")
+
+
+def test_normalize_frame_drops_volatile_parts():
+    assert thread_dump_parser.normalize_frame("a.B.c(B.java:12)") == "a.B.c(B.java)"
+    assert thread_dump_parser.normalize_frame("a.B$$Lambda$123/0x0000000800c0b840.run(Unknown Source)") == "a.B$$Lambda.run(Unknown Source)"
@@ -0,0 +1,61 @@
+import importlib.util
+import json
+import os
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+
+spec_tr = importlib.util.spec_from_file_location("tool_resolver", ROOT_DIR / "tool_resolver.py")
+tool_resolver = importlib.util.module_from_spec(spec_tr)
+spec_tr.loader.exec_module(tool_resolver)
+
+
+def _use_project(monkeypatch, root: Path):
+    monkeypatch.setattr(tool_resolver, "PROJECT_ROOT", root)
+    monkeypatch.setattr(tool_resolver, "TOOLS_DIR", root / "tools")
+    monkeypatch.setattr(tool_resolver, "TOOLS_MANIFEST_PATH", root / "tools.json")
+    monkeypatch.setattr(tool_resolver, "LEGACY_MAT_PATH", root / "mat")
+    monkeypatch.setenv("PATH", "")
+    tool_resolver.invalidate()
+
+
+def test_mat_launcher_is_cached_until_the_installation_changes(tmp_path: Path, monkeypatch):
+    _use_project(monkeypatch, tmp_path)
+    platform = tool_resolver.current_platform()
+    (tmp_path / "tools.json").write_text(json.dumps({"tools": [
+        {"id": "mat", "platform": platform, "install_path": "tools/mat", "launcher_relative_path": "plugins/org.eclipse.equinox.launcher_*.jar"}]}))
+    assert tool_resolver.resolve("mat").path is None
+
+    plugins = tmp_path / "tools" / "mat" / "plugins"
+    plugins.mkdir(parents=True)
+    launcher = plugins / "org.eclipse.equinox.launcher_1.0.jar"
+    launcher.write_text("jar")
+    first = tool_resolver.resolve("mat")
+    assert (first.path, first.cached) == (str(launcher), False)
+    assert tool_resolver.resolve("mat") == (str(launcher), first.source, True)
+
+    # The launcher was replaced by an update
+    os.utime(launcher, ns=(0, 0))
+    assert not tool_resolver.resolve("mat").cached
+    assert tool_resolver.resolve("mat").cached
+    tool_resolver.invalidate("mat")
+    assert not tool_resolver.resolve("mat").cached
+
+    # A legacy installation appearing takes precedence once the cache notices
+    (tmp_path / "mat" / "plugins").mkdir(parents=True)
+    legacy = tmp_path / "mat" / "plugins" / "org.eclipse.equinox.launcher_0.9.jar"
+    legacy.write_text("jar")
+    assert tool_resolver.resolve("mat").path == str(legacy)
+
+    legacy.unlink()
+    assert tool_resolver.resolve("mat").path == str(launcher)
+
+
+def test_tshark_found_in_tools_folder(tmp_path: Path, monkeypatch):
+    _use_project(monkeypatch, tmp_path)
+    binary = "tshark.exe" if os.name == "nt" else "tshark"
+    install = tmp_path / "tools" / f"wireshark-4.2.5-{tool_resolver.current_platform()}" / "bin"
+    install.mkdir(parents=True)
+    (install / binary).write_text("")
+    assert tool_resolver.resolve("wireshark").path == str(install / binary)
+    assert tool_resolver.resolve("unknown") == (None, None, False)
@@ -0,0 +1,273 @@
+# Filename: thread_dump_parser.py
+import json
+import os
+import re
+from collections import Counter
+
+# Per-thread frame cap keeps a single pathological stack from growing a record without bound
+MAX_FRAMES_PER_THREAD = 256
+PROMPT_FRAMES_PER_THREAD = 20
+PROMPT_CHAR_BUDGET = 100_000
+
+JSTACK_HEADER_RE = re.compile(r'^"(?P<name>.*)"(?P<rest>\s.*)$')
+MAT_HEADER_RE = re.compile(r'^Thread (?P<tid>0x[0-9a-fA-F]+)\s*$')
+STATE_RE = re.compile(r'^\s*java\.lang\.Thread\.State:\s*(?P<state>[A-Z_]+)(?:\s*\((?P<detail>.*)\))?')
+LOCK_LINE_RE = re.compile(r'^\s*-\s*(?P<kind>locked|waiting to lock|waiting on|parking to wait for|eliminated|waiting to re-lock in wait\(\))\s*<(?P<id>[^>]+)>(?:\s*\(a (?P<cls>[^)]*)\))?')
+OWNABLE_RE = re.compile(r'^\s*-\s*<(?P<id>[^>]+)>\s*\(a (?P<cls>[^)]*)\)')
+TID_RE = re.compile(r'\btid=(0x[0-9a-fA-F]+)')
+NID_RE = re.compile(r'\bnid=(0x[0-9a-fA-F]+|\d+)')
+
+WAIT_KINDS = {"waiting to lock": "lock", "waiting to re-lock in wait()": "lock",
+              "waiting on": "wait", "parking to wait for": "park"}
+
+# Header text jstack prints when no explicit java.lang.Thread.State line follows (VM/GC threads)
+HEADER_STATE_HINTS = (
+    ("waiting for monitor entry", "BLOCKED"),
+    ("in Object.wait()", "WAITING"),
+    ("waiting on condition", "WAITING"),
+    ("sleeping", "TIMED_WAITING"),
+    ("runnable", "RUNNABLE"),
+)
+
+
+def _new_record(name, tid=None, nid=None, daemon=False, state="UNKNOWN"):
+    return {"name": name, "tid": tid, "nid": nid, "daemon": daemon, "state": state, "state_detail": None,
+            "frames": [], "frames_truncated": 0, "held_locks": [], "waiting_on": None}
+
+
+def _record_from_jstack_header(match):
+    rest = match.group("rest")
+    tid_match, nid_match = TID_RE.search(rest), NID_RE.search(rest)
+    state = next((s for hint, s in HEADER_STATE_HINTS if hint in rest), "UNKNOWN")
+    return _new_record(match.group("name"), tid_match.group(1) if tid_match else None,
+                       nid_match.group(1) if nid_match else None, " daemon " in f"{rest} ", state)
+
+
+def iter_thread_records(lines):
+    """Yield one compact record per thread from jstack or MAT `.threads` output.
+
+    Only the thread currently being parsed is held in memory, so arbitrarily large
+    dumps can be processed from a file object.
+    """
+    current, in_ownable = None, False
+    for raw_line in lines:
+        line = raw_line.rstrip("\r\n")
+        if not line.strip():
+            continue
+
+        header = JSTACK_HEADER_RE.match(line)
+        if header and ("tid=" in line or "prio=" in line or " #" in line):
+            if current: yield current
+            current, in_ownable = _record_from_jstack_header(header), False
+            continue
+        mat_header = MAT_HEADER_RE.match(line)
+        if mat_header:
+            if current: yield current
+            tid = mat_header.group("tid")
+            current, in_ownable = _new_record(tid, tid=tid), False
+            continue
+
+        if not line[0].isspace():
+            # Any other unindented line (deadlock report, JNI refs, banner) ends the thread block
+            if current: yield current
+            current, in_ownable = None, False
+            continue
+        if current is None:
+            continue
+
+        stripped = line.strip()
+        if stripped.startswith("at "):
+            if len(current["frames"]) < MAX_FRAMES_PER_THREAD: current["frames"].append(stripped[3:])
+            else: current["frames_truncated"] += 1
+            continue
+        state_match = STATE_RE.match(line)
+        if state_match:
+            current["state"], current["state_detail"] = state_match.group("state"), state_match.group("detail")
+            continue
+        if stripped.startswith("Locked ownable synchronizers"):
+            in_ownable = True
+            continue
+        lock_match = LOCK_LINE_RE.match(line)
+        if lock_match:
+            lock = {"id": lock_match.group("id"), "class": lock_match.group("cls")}
+            kind = lock_match.group("kind")
+            if kind == "locked":
+                current["held_locks"].append(lock)
+            elif kind in WAIT_KINDS and current["waiting_on"] is None:
+                current["waiting_on"] = dict(lock, kind=WAIT_KINDS[kind])
+            continue
+        if in_ownable:
+            ownable = OWNABLE_RE.match(line)
+            if ownable: current["held_locks"].append({"id": ownable.group("id"), "class": ownable.group("cls"), "ownable": True})
+    if current:
+        yield current
+
+
+def iter_thread_records_from_file(threads_filepath):
+    with open(threads_filepath, "r", encoding="utf-8", errors="ignore") as f:
+        yield from iter_thread_records(f)
+
+
+def write_threads_json(threads_filepath, json_path, observers=()):
+    """Stream-parse a thread dump into a JSON artifact and return its summary.
+
+    Records are written as they are parsed, so memory use does not grow with the
+    number of threads in the dump. Each observer's add() is called with every
+    record, letting aggregations run in the same pass.
+    """
+    state_counts, thread_count, daemon_count = Counter(), 0, 0
+    tmp_path = f"{json_path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as out:
+        out.write('{"format": 1, "source": %s, "threads": [' % json.dumps(os.path.basename(threads_filepath)))
+        for record in iter_thread_records_from_file(threads_filepath):
+            out.write(("," if thread_count else "") + "\n" + json.dumps(record, separators=(",", ":")))
+            thread_count += 1
+            daemon_count += record["daemon"]
+            state_counts[record["state"]] += 1
+            for observer in observers: observer.add(record)
+        summary = {"thread_count": thread_count, "daemon_count": daemon_count, "state_counts": dict(state_counts.most_common())}
+        out.write('\n], "summary": %s}\n' % json.dumps(summary))
+    os.replace(tmp_path, json_path)
+    return summary
+
+
+def load_threads_json(json_path):
+    with open(json_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _format_lock(lock):
+    return f"<{lock['id']}> ({lock['class']})" if lock.get("class") else f"<{lock['id']}>"
+
+
+def format_thread_record(record, max_frames=PROMPT_FRAMES_PER_THREAD):
+    """Render a record as a few compact lines suitable for prompts and reports."""
+    header = f'"{record["name"]}"'
+    if record.get("tid"): header += f" tid={record['tid']}"
+    header += f" {record['state']}" + (f" ({record['state_detail']})" if record.get("state_detail") else "")
+    lines = [header]
+    waiting = record.get("waiting_on")
+    if waiting:
+        verb = {"lock": "waiting to lock", "wait": "waiting on", "park": "parked on"}.get(waiting.get("kind"), "waiting on")
+        lines.append(f"  {verb} {_format_lock(waiting)}")
+    for lock in record.get("held_locks", []):
+        lines.append(f"  holds {_format_lock(lock)}")
+    frames = record.get("frames", [])
+    lines.extend(f"  at {frame}" for frame in frames[:max_frames])
+    omitted = len(frames) - max_frames + record.get("frames_truncated", 0)
+    if omitted > 0: lines.append(f"  ... {omitted} more frame(s)")
+    return "\n".join(lines)
+
+
+def render_thread_records(records, max_chars=PROMPT_CHAR_BUDGET, max_frames=PROMPT_FRAMES_PER_THREAD):
+    """Render records into a bounded block of text, noting how many threads were left out."""
+    parts, used, shown, omitted = [], 0, 0, 0
+    for record in records:
+        if used >= max_chars:
+            omitted += 1
+            continue
+        text = format_thread_record(record, max_frames)
+        parts.append(text)
+        used += len(text) + 2
+        shown += 1
+    if omitted:
+        parts.append(f"... {omitted} more thread(s) omitted ({shown} shown).")
+    return "\n\n".join(parts)
+
+
+FRAME_LINE_NUMBER_RE = re.compile(r"(\.(?:java|kt|scala|groovy)):\d+\)")
+FRAME_HEX_RE = re.compile(r"0x[0-9a-fA-F]+")
+FRAME_GENERATED_RE = re.compile(r"(\$\$Lambda|\$Proxy|GeneratedMethodAccessor|GeneratedConstructorAccessor|GeneratedSerializationConstructorAccessor|\$\$EnhancerBySpringCGLIB\$\$)(?:\$?[0-9a-f]*\d[0-9a-f]*)?(?:/0x[0-9a-fA-F]+)?")
+MAX_EXAMPLE_NAMES = 3
+
+
+def normalize_frame(frame):
+    """Strip line numbers, addresses and generated-class suffixes so equivalent frames compare equal."""
+    frame = FRAME_LINE_NUMBER_RE.sub(r"\1)", frame)
+    frame = FRAME_GENERATED_RE.sub(r"\1", frame)
+    return FRAME_HEX_RE.sub("0x?", frame)
+
+
+def stack_signature(record):
+    waiting = record.get("waiting_on")
+    wait_key = (waiting.get("kind"), waiting.get("class")) if waiting else None
+    return (record["state"], wait_key, tuple(normalize_frame(f) for f in record.get("frames", [])))
+
+
+class StackSignatureGrouper:
+    """Groups thread records by normalized stack signature.
+
+    Memory grows with the number of distinct stacks, not with the number of threads.
+    """
+    def __init__(self):
+        self.groups = {}
+        self.waited_lock_ids = set()
+
+    def add(self, record):
+        key = stack_signature(record)
+        group = self.groups.get(key)
+        if group is None:
+            group = self.groups[key] = {"state": record["state"], "waiting_on": record.get("waiting_on"),
+                                        "frames": list(record.get("frames", [])), "frames_truncated": record.get("frames_truncated", 0),
+                                        "count": 0, "example_names": [], "held_lock_ids": set(), "held_locks": {}}
+        group["count"] += 1
+        if len(group["example_names"]) < MAX_EXAMPLE_NAMES: group["example_names"].append(record["name"])
+        for lock in record.get("held_locks", []):
+            group["held_lock_ids"].add(lock["id"])
+            group["held_locks"].setdefault(lock["id"], lock)
+        waiting = record.get("waiting_on")
+        if waiting and waiting.get("kind") in ("lock", "park"):
+            self.waited_lock_ids.add(waiting["id"])
+
+    def ranked_groups(self):
+        """Groups ordered by interest (blocked or holding a contended lock) and then by thread count."""
+        ranked = []
+        for group in self.groups.values():
+            contended = sorted(group["held_lock_ids"] & self.waited_lock_ids)
+            interesting = group["state"] == "BLOCKED" or bool(contended)
+            ranked.append(dict(group, contended_locks=[group["held_locks"][lock_id] for lock_id in contended], interesting=interesting))
+        ranked.sort(key=lambda g: (not g["interesting"], -g["count"]))
+        return ranked
+
+
+def format_stack_group(group, max_frames=PROMPT_FRAMES_PER_THREAD):
+    noun = "thread" if group["count"] == 1 else "threads"
+    verb = "has" if group["count"] == 1 else "share"
+    names = ", ".join(f'"{name}"' for name in group["example_names"])
+    lines = [f"{group['count']} {noun} in {group['state']} {verb} this stack (e.g. {names}):"]
+    waiting = group.get("waiting_on")
+    if waiting:
+        verb = {"lock": "waiting to lock", "wait": "waiting on", "park": "parked on"}.get(waiting.get("kind"), "waiting on")
+        target = f"({waiting['class']})" if group["count"] > 1 and waiting.get("class") else _format_lock(waiting)
+        lines.append(f"  {verb} {target}")
+    for lock in group.get("contended_locks", []):
+        lines.append(f"  holds contended lock {_format_lock(lock)}")
+    frames = group["frames"]
+    lines.extend(f"  at {frame}" for frame in frames[:max_frames])
+    omitted = len(frames) - max_frames + group.get("frames_truncated", 0)
+    if omitted > 0: lines.append(f"  ... {omitted} more frame(s)")
+    return "\n".join(lines)
+
+
+def render_stack_groups(groups, max_chars=PROMPT_CHAR_BUDGET, max_frames=PROMPT_FRAMES_PER_THREAD):
+    """Render ranked stack groups into a bounded block of text."""
+    parts, used, omitted_groups, omitted_threads = [], 0, 0, 0
+    for group in groups:
+        if used >= max_chars:
+            omitted_groups += 1
+            omitted_threads += group["count"]
+            continue
+        text = format_stack_group(group, max_frames)
+        parts.append(text)
+        used += len(text) + 2
+    if omitted_groups:
+        parts.append(f"... {omitted_groups} more distinct stack(s) covering {omitted_threads} thread(s) omitted.")
+    return "\n\n".join(parts)
+
+
+def render_grouped_thread_dump(records, max_chars=PROMPT_CHAR_BUDGET):
+    """Group records by stack signature and render the compact form used for prompts."""
+    grouper = StackSignatureGrouper()
+    for record in records:
+        grouper.add(record)
+    return render_stack_groups(grouper.ranked_groups(), max_chars)
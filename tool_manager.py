@@ -6,6 +6,7 @@ import zipfile
 from pathlib import Path
 import requests
 
+import tool_resolver
 from PySide6.QtCore import QObject, Signal, QThread, Qt
 from PySide6.QtWidgets import (
     QDialog, QVBoxLayout, QTableWidget, QTableWidgetItem, QHeaderView,
@@ -14,9 +15,9 @@ from PySide6.QtWidgets import (
 
 # This allows the script to find the project root, even when imported by another script
 PROJECT_ROOT = Path(__file__).resolve().parent
-TOOLS_DIR = PROJECT_ROOT / "tools"
-TOOLS_MANIFEST_PATH = PROJECT_ROOT / "tools.json"
-LEGACY_MAT_PATH = PROJECT_ROOT / "mat"
+TOOLS_DIR = tool_resolver.TOOLS_DIR
+TOOLS_MANIFEST_PATH = tool_resolver.TOOLS_MANIFEST_PATH
+LEGACY_MAT_PATH = tool_resolver.LEGACY_MAT_PATH
 
 
 class DownloadWorker(QObject):
@@ -175,6 +176,8 @@ class ToolManagerDialog(QDialog):
         self.load_tools()
 
     def on_download_finished(self, message):
+        # Launcher lookups cached before the install may point at an older version
+        tool_resolver.invalidate()
         QMessageBox.information(self, "Success", message)
         self.cleanup_thread()
         self.load_tools()
@@ -0,0 +1,113 @@
+# Filename: tool_resolver.py
+import glob
+import json
+import os
+import shutil
+import sys
+import threading
+from collections import namedtuple
+from pathlib import Path
+
+# This allows the script to find the project root, even when imported by another script
+PROJECT_ROOT = Path(__file__).resolve().parent
+TOOLS_DIR = PROJECT_ROOT / "tools"
+TOOLS_MANIFEST_PATH = PROJECT_ROOT / "tools.json"
+LEGACY_MAT_PATH = PROJECT_ROOT / "mat"
+
+TOOL_MAT = "mat"
+TOOL_WIRESHARK = "wireshark"
+
+# path is None when the tool was not found; cached tells whether the lookup was answered from memory
+Resolution = namedtuple("Resolution", "path source cached")
+
+_resolved = {}  # tool_id -> (path, source, signature)
+_lock = threading.Lock()
+
+
+def current_platform():
+    return "win64" if sys.platform == "win32" else "macos-aarch64" if sys.platform == "darwin" else "linux-x86_64"
+
+
+def _mtime_ns(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def _signature(path):
+    """Everything a cached answer depends on: installing, removing or updating a tool changes one of these."""
+    return (_mtime_ns(path), _mtime_ns(TOOLS_MANIFEST_PATH), _mtime_ns(TOOLS_DIR), _mtime_ns(LEGACY_MAT_PATH / "plugins"),
+            os.environ.get("PATH", ""))
+
+
+def _manifest_tools(tool_id):
+    if not TOOLS_MANIFEST_PATH.exists(): return []
+    try:
+        with open(TOOLS_MANIFEST_PATH, "r") as f: manifest = json.load(f)
+    except (OSError, ValueError):
+        return []
+    platform = current_platform()
+    return [t for t in manifest.get("tools", []) if t.get("id") == tool_id and t.get("platform") == platform]
+
+
+def _find_wireshark():
+    binary = "tshark.exe" if sys.platform == "win32" else "tshark"
+    # Any installed version in the tools directory
+    for path in TOOLS_DIR.glob(f"wireshark-*-{current_platform()}"):
+        if (path / binary).is_file(): return str(path / binary), "Wireshark installation"
+        nested = next(path.rglob(binary), None)
+        if nested: return str(nested), "Wireshark installation"
+    # The manifest-defined location
+    for tool in _manifest_tools(TOOL_WIRESHARK):
+        install_path = PROJECT_ROOT / tool.get("install_path")
+        launcher_path = install_path / tool.get("launcher_relative_path")
+        if launcher_path.is_file(): return str(launcher_path), "managed Wireshark (tshark)"
+        nested = next(install_path.rglob(binary), None) if install_path.is_dir() else None
+        if nested: return str(nested), "managed Wireshark (tshark)"
+    # Last resort: system PATH
+    tshark_path = shutil.which("tshark")
+    return (tshark_path, "system tshark") if tshark_path else (None, None)
+
+
+def _find_mat():
+    legacy_launchers = sorted((LEGACY_MAT_PATH / "plugins").glob("org.eclipse.equinox.launcher_*.jar"))
+    if legacy_launchers: return str(legacy_launchers[0]), "legacy MAT installation"
+    for tool in _manifest_tools(TOOL_MAT):
+        install_path = PROJECT_ROOT / tool.get("install_path")
+        if not install_path.is_dir(): continue
+        found_launchers = sorted(glob.glob(str(install_path / tool.get("launcher_relative_path"))))
+        if found_launchers: return found_launchers[0], "managed MAT installation"
+    return None, None
+
+
+_FINDERS = {TOOL_WIRESHARK: _find_wireshark, TOOL_MAT: _find_mat}
+
+
+def resolve(tool_id):
+    """Return the launcher for a tool ("mat" or "wireshark") as a Resolution.
+
+    A found launcher is remembered and reused while it still exists and neither it, tools.json,
+    the tools folder, the legacy MAT plugins nor PATH changed. Misses are not remembered, so a tool
+    installed later is found on the next call.
+    """
+    finder = _FINDERS.get(tool_id)
+    if finder is None: return Resolution(None, None, False)
+    with _lock:
+        entry = _resolved.get(tool_id)
+        if entry and os.path.exists(entry[0]) and _signature(entry[0]) == entry[2]: return Resolution(entry[0], entry[1], True)
+        path, source = finder()
+        if path: _resolved[tool_id] = (path, source, _signature(path))
+        else: _resolved.pop(tool_id, None)
+        return Resolution(path, source, False)
+
+
+def resolve_path(tool_id):
+    return resolve(tool_id).path
+
+
+def invalidate(tool_id=None):
+    """Forget resolved launchers, e.g. after the Tool Manager installed something."""
+    with _lock:
+        if tool_id is None: _resolved.clear()
+        else: _resolved.pop(tool_id, None)